@@ -6,14 +6,30 @@ Generic file
 # import
 import xml.etree.ElementTree as et
 import os.path
-from typing import Union, Optional
+import io
+import mmap
+import sys
+from array import array
+from functools import lru_cache
+from typing import Union, Optional, Iterator, Dict, Tuple
 import struct
 
 
+# functions
+@lru_cache(maxsize=None)
+def get_struct(fmt: str) -> struct.Struct:
+    """ Compile a struct format once and reuse it. """
+    return struct.Struct(fmt)
+
+
 # class
 class BinaryFile:
+    # Bytes scanned per read while looking for a string terminator
+    STRZ_WINDOW: int = 256
+    
     def __init__(self, file):
         self.file = file
+        self.strings: Dict[bytes, bytes] = {}
     
     def __enter__(self):
         self.file = self.file.__enter__()
@@ -50,6 +66,23 @@ class BinaryFile:
         self.file.seek(0)
         return self.file.read1()
     
+    def read_at(self, offset: int, n: int):
+        """ Read 'n' bytes at 'offset' without moving the cursor """
+        position: int = self.tell()
+        self.seek(offset)
+        buffer: bytes = self.read(n)
+        self.seek(position)
+        return buffer
+    
+    def window(self, offset: int, n: int) -> Tuple["BinaryFile", int]:
+        """
+        'n' bytes at 'offset' in a single read, or the rest of the file for a negative 'n'.
+        Returns a file over them and the offset its positions are relative to. Interned strings are shared.
+        """
+        window = MappedBinaryFile(self.read_at(offset, n))
+        window.strings = self.strings
+        return window, offset
+    
     def read_fmt(self, fmt: str, length: int, num: int = 1):
         """ Read 'x' bytes 'y' amount of times then format """
         total_len: int = length * num
@@ -57,34 +90,57 @@ class BinaryFile:
         if len(buffer) != total_len:
             return None
         
+        values = get_struct(fmt * num).unpack(buffer)
         if num != 1:
-            return struct.unpack(fmt * num, buffer)
-        return struct.unpack(fmt, buffer)[0]
+            return values
+        return values[0]
+    
+    def read_struct(self, st: struct.Struct) -> tuple:
+        """ Read a single fixed-size record """
+        return st.unpack(self.read(st.size))
+    
+    def iter_struct(self, st: struct.Struct, num: int) -> Iterator[tuple]:
+        """ Read 'num' consecutive fixed-size records """
+        return st.iter_unpack(self.read(st.size * num))
+    
+    def intern(self, value: bytes) -> bytes:
+        """ Share a single bytes object between repeated strings """
+        return self.strings.setdefault(value, value)
     
-    def read_strz(self, delimiter: bytes = b'\00'):
+    def read_strz(self, delimiter: bytes = b'\00', intern: bool = False):
         """ Read till delimiter reached """
-        buffer: bytes = b''
+        start: int = self.tell()
+        buffer: bytearray = bytearray()
         while True:
-            this: bytes = self.read(1)
-            if len(this) == 0:
+            window: bytes = self.read(self.STRZ_WINDOW)
+            end: int = window.find(delimiter)
+            if end != -1:
+                buffer += window[:end]
+                self.seek(start + len(buffer) + len(delimiter))
                 break
-            elif this == delimiter:
+            buffer += window
+            if len(window) < self.STRZ_WINDOW:
                 break
-            else:
-                buffer += this
-        return buffer
+        
+        value: bytes = bytes(buffer)
+        return self.intern(value) if intern else value
     
     def read_c8(self, num: int = 1):
         """ Read a single char """
         return self.read_fmt('c', 1, num)
     
-    def read_strl(self, num: int = 1):
+    def read_strl(self, num: int = 1, intern: bool = False):
         """ Read a list of chars (str) """
-        val = self.read_c8(num)
-        if isinstance(val, tuple):
-            bytes_val = [bytes(x) for x in val]
-            return b''.join(bytes_val)
-        return val
+        value: bytes = bytes(self.read(num))
+        return self.intern(value) if intern else value
+    
+    def read_array(self, typecode: str, num: int) -> array:
+        """ Bulk read 'num' little-endian items into an array.array """
+        values: array = array(typecode)
+        values.frombytes(self.read(values.itemsize * num))
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
     
     def read_strl_u32(self, num: int = 1):
         """ Read multiple strings? """
@@ -139,31 +195,53 @@ class BinaryFile:
     def pad(self, num: int = 1, delim: bytes = b""):
         """ Pad the file by a variable amount. """
         if delim == b"":
-            pad_bytes = [bytes("P", 'utf-8') for _ in range(num)]
-        else:
-            pad_bytes = [delim for _ in range(num)]
-        buffer = struct.pack('c' * num, *pad_bytes)
-        self.file.write(buffer)
+            delim = b"P"
+        self.write(delim * num)
     
     def write_fmt(self, fmt: str, data):
         """ Write formatted bytes. """
         if isinstance(data, list) or isinstance(data, tuple):
-            buffer = struct.pack(fmt * len(data), *data)
+            buffer = get_struct(fmt * len(data)).pack(*data)
         else:
-            buffer = struct.pack(fmt, data)
+            buffer = get_struct(fmt).pack(data)
         
-        self.file.write(buffer)
+        self.write(buffer)
+    
+    def reserve(self, fmt: str) -> "Slot":
+        """ Reserve a fixed-size field to be patched once its value is known. """
+        slot: Slot = Slot(get_struct(fmt), self.tell())
+        self.write(bytes(slot.struct.size))
+        return slot
+    
+    def reserve_u32(self) -> "Slot":
+        """ Reserve an unsigned int32 """
+        return self.reserve('I')
+    
+    def patch(self, slot: "Slot", value):
+        """ Fill in a reserved field. """
+        position: int = self.tell()
+        self.seek(slot.offset)
+        self.write(slot.struct.pack(value))
+        self.seek(position)
+    
+    def write_array(self, values: array):
+        """ Bulk write an array.array as little-endian items """
+        if sys.byteorder != "little":
+            values = array(values.typecode, values)
+            values.byteswap()
+        self.write(memoryview(values).cast('B'))
     
     def write_c8(self, data):
         """ Write a single char """
         return self.write_fmt('c', data)
     
-    def write_strl(self, data: str, delim: bool = False, delimiter: bytes = b'\00'):
+    def write_strl(self, data: Union[str, bytes], delim: bool = False, delimiter: bytes = b'\00'):
         """ A string """
-        data_ = [bytes(c, 'utf-8') for c in data]
-        self.write_c8(data_)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.write(data)
         if delim:
-            self.write_fmt('c', delimiter)
+            self.write(delimiter)
     
     def write_s8(self, data):
         """ Signed char """
@@ -206,6 +284,182 @@ class BinaryFile:
         return self.write_fmt('d', data)
 
 
+class Slot:
+    """ A reserved field within a BinaryFile, patched in place once its value is known. """
+    def __init__(self, st: struct.Struct, offset: int):
+        self.struct: struct.Struct = st
+        self.offset: int = offset
+    
+    def __str__(self):
+        return f"Slot: '{self.struct.format}' at {self.offset}"
+
+
+class BinaryBuilder(BinaryFile):
+    """
+    Write-only BinaryFile backed by a growable bytearray.
+    Reserved slots are patched in place and the result is flushed to the target in a single write.
+    A known final 'size' preallocates the buffer zero filled, writes then land in place.
+    """
+    def __init__(self, size: int = 0):
+        super().__init__(None)
+        self.buffer: bytearray = bytearray(size)
+        self.pos: int = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, t, value, traceback):
+        pass
+    
+    def __len__(self):
+        return len(self.buffer)
+    
+    # in-built
+    def seek(self, pos):
+        self.pos = pos
+        return pos
+    
+    def tell(self):
+        return self.pos
+    
+    def read(self, n: int = None):
+        raise io.UnsupportedOperation("BinaryBuilder is write-only")
+    
+    def write(self, blk):
+        end: int = self.pos + len(blk)
+        if self.pos == len(self.buffer):
+            self.buffer += blk
+        else:
+            if self.pos > len(self.buffer):
+                # Seeking past the end and writing fills the gap with zeros, as a real file would
+                self.buffer += bytes(self.pos - len(self.buffer))
+            self.buffer[self.pos:end] = blk
+        self.pos = end
+        return len(blk)
+    
+    def read_all(self) -> bytes:
+        return bytes(self.buffer)
+    
+    def getvalue(self) -> memoryview:
+        return memoryview(self.buffer)
+    
+    def flush(self, f):
+        """ Write the whole buffer to a file object or BinaryFile in one go. """
+        f.write(self.buffer)
+    
+    # write
+    def patch(self, slot: Slot, value):
+        slot.struct.pack_into(self.buffer, slot.offset, value)
+
+
+class MappedBinaryFile(BinaryFile):
+    """
+    Read-only BinaryFile over a memory-mapped file or an in-memory buffer.
+    Values are decoded in place with struct.unpack_from and read() returns memoryview slices, not copies.
+    """
+    def __init__(self, buffer=b""):
+        super().__init__(None)
+        if not hasattr(buffer, "find"):
+            buffer = bytes(buffer)
+        self.buffer = buffer
+        self.view: memoryview = memoryview(buffer)
+        self.pos: int = 0
+    
+    @classmethod
+    def from_path(cls, file_path: str):
+        """ Memory-map a file from disk. """
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls(b"")
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, t, value, traceback):
+        self.close()
+    
+    def __len__(self):
+        return len(self.view)
+    
+    def close(self):
+        self.view.release()
+        if isinstance(self.buffer, mmap.mmap):
+            try:
+                self.buffer.close()
+            except BufferError:
+                # Slices are still referenced elsewhere, the map is freed once they are collected.
+                pass
+    
+    # in-built
+    def seek(self, pos):
+        self.pos = pos
+        return pos
+    
+    def tell(self):
+        return self.pos
+    
+    def read(self, n: int = None):
+        start: int = self.pos
+        if n is None or n < 0:
+            self.pos = len(self.view)
+        else:
+            self.pos = min(start + n, len(self.view))
+        return self.view[start:self.pos]
+    
+    def write(self, blk):
+        raise io.UnsupportedOperation("MappedBinaryFile is read-only")
+    
+    # read
+    def read_all(self) -> bytes:
+        self.pos = len(self.view)
+        return bytes(self.view)
+    
+    def read_at(self, offset: int, n: int) -> memoryview:
+        """ A zero-copy slice of 'n' bytes at 'offset', the cursor is left untouched """
+        return self.view[offset:offset + n]
+    
+    def window(self, offset: int, n: int) -> Tuple["BinaryFile", int]:
+        """ Already in memory, positions stay absolute. """
+        return self, 0
+    
+    def read_fmt(self, fmt: str, length: int, num: int = 1):
+        """ Unpack 'x' bytes 'y' amount of times at the cursor """
+        total_len: int = length * num
+        if self.pos + total_len > len(self.view):
+            self.pos = len(self.view)
+            return None
+        
+        values = get_struct(fmt * num).unpack_from(self.view, self.pos)
+        self.pos += total_len
+        if num != 1:
+            return values
+        return values[0]
+    
+    def read_struct(self, st: struct.Struct) -> tuple:
+        """ Unpack a single fixed-size record at the cursor """
+        values = st.unpack_from(self.view, self.pos)
+        self.pos += st.size
+        return values
+    
+    def iter_struct(self, st: struct.Struct, num: int) -> Iterator[tuple]:
+        """ Unpack 'num' consecutive fixed-size records without copying """
+        return st.iter_unpack(self.read(st.size * num))
+    
+    def read_strz(self, delimiter: bytes = b'\00', intern: bool = False):
+        """ Read till delimiter reached, a single find over the mapped buffer """
+        end: int = self.buffer.find(delimiter, self.pos)
+        if end == -1:
+            end = len(self.view)
+            next_pos: int = end
+        else:
+            next_pos: int = end + len(delimiter)
+        
+        value: bytes = self.view[self.pos:end].tobytes()
+        self.pos = next_pos
+        return self.intern(value) if intern else value
+
+
 class SharedHeader:
     def __init__(self):
         self.four_cc: bytes = b""
@@ -256,7 +510,7 @@ class SharedFile:
         if None in [self.file_path, self.file_name, self.extension]:
             raise ValueError("File information is none, need to run 'get_file_details' first")
         
-        with BinaryFile(open(self.get_file_path(), "rb")) as f:
+        with MappedBinaryFile.from_path(self.get_file_path()) as f:
             self.header = self.header_type()
             self.header.deserialize(f)
 
@@ -265,7 +519,7 @@ class SharedFile:
         if self.header is None:
             self.get_header()
 
-        with BinaryFile(open(self.get_file_path(), 'rb')) as file:
+        with MappedBinaryFile.from_path(self.get_file_path()) as file:
             # Seek past header.
             file.seek(self.header.length)
             self.deserialize(file=file)
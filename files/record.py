@@ -0,0 +1,63 @@
+"""
+Fixed-size record layouts
+"""
+
+
+# imports
+import struct
+from typing import Tuple, Iterator, Dict, Any
+
+from files.file import BinaryFile, Slot, get_struct
+
+
+# class
+class Record:
+    """
+    Declarative little-endian record layout.
+    Fields are compiled once into a single struct.Struct so a whole record is decoded or encoded in one call.
+    """
+    def __init__(self, *fields: Tuple[str, str]):
+        self.names: Tuple[str, ...] = tuple(name for name, _ in fields)
+        self.struct: struct.Struct = get_struct("<" + "".join(fmt for _, fmt in fields))
+        self.size: int = self.struct.size
+        
+        self.fields: Dict[str, Tuple[int, struct.Struct]] = {}
+        offset: int = 0
+        for name, fmt in fields:
+            field_struct: struct.Struct = get_struct(f"<{fmt}")
+            self.fields[name] = (offset, field_struct)
+            offset += field_struct.size
+    
+    def __str__(self):
+        return f"Record: {', '.join(self.names)} ({self.size} bytes)"
+    
+    def as_dict(self, values: tuple) -> Dict[str, Any]:
+        return dict(zip(self.names, values))
+    
+    # unpack
+    def unpack(self, buffer, offset: int = 0) -> tuple:
+        return self.struct.unpack_from(buffer, offset)
+    
+    def iter_unpack(self, buffer) -> Iterator[tuple]:
+        return self.struct.iter_unpack(buffer)
+    
+    def read(self, f: BinaryFile) -> tuple:
+        """ Read a single record. """
+        return f.read_struct(self.struct)
+    
+    def read_many(self, f: BinaryFile, num: int) -> Iterator[tuple]:
+        """ Read 'num' consecutive records in bulk. """
+        return f.iter_struct(self.struct, num)
+    
+    # pack
+    def pack(self, *values) -> bytes:
+        return self.struct.pack(*values)
+    
+    def write(self, f: BinaryFile, *values):
+        """ Write a single record. """
+        f.write(self.struct.pack(*values))
+    
+    def slot(self, name: str, record_offset: int) -> Slot:
+        """ A patchable Slot for one field of a record written at 'record_offset'. """
+        offset, field_struct = self.fields[name]
+        return Slot(field_struct, record_offset + offset)
@@ -4,9 +4,10 @@
 
 
 # import
-from typing import Dict
+from typing import Dict, Optional
 
 from files.file import BinaryFile
+from misc.dehash import DehashSource
 
 
 # class
@@ -29,6 +30,9 @@ class Binary_Manager:
     def __init__(self, **kwargs):
         super().__init__()
         self.file_path: str = kwargs.get("file_path")
+        self.dehash: Optional[DehashSource] = kwargs.get("dehash")
+        # formats.cache.TreeCache, trees are parsed from the file itself without one
+        self.cache = kwargs.get("cache")
         self.version: int = 0
     
     def load_header(self):
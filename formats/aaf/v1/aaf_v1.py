@@ -4,11 +4,12 @@ Avalanche Archive Format v1
 
 
 # imports
-import io
+from typing import Union
 
-from files.file import SharedFile, BinaryFile
+from files.file import SharedFile, BinaryFile, MappedBinaryFile
 from formats.aaf.v1.aaf_v1_types import AAF_Header_v1, AAF_Block_v1
 from formats.sarc.v2.sarc_v2 import SARC_v2
+from misc.errors import IncorrectFileSize
 
 
 # class
@@ -22,7 +23,7 @@ class AAF_v1(SharedFile):
         super().__init__(file_path)
         self.version = 1
         self.header_type = AAF_Header_v1
-        self.stream: bytes = b""
+        self.stream: Union[bytes, bytearray] = b""
         self.sarc_type = SARC_v2
         self.sarc_processor = self.sarc_type(file_path)
 
@@ -38,12 +39,24 @@ class AAF_v1(SharedFile):
     # io
     def deserialize(self, **kwargs):
         f: BinaryFile = kwargs.get("file")
+        # Blocks decompress into a single buffer, SARC entries then reference slices of it
+        self.stream = bytearray(self.header.uncompressed_size)
+        position: int = 0
         for i in range(self.header.block_count):
             block: AAF_Block_v1 = AAF_Block_v1()
             block.deserialize(f)
-            self.stream += block.data
+            # AAF_Block_v1 checks its data against its size, a block past the end would resize the buffer
+            if position + block.uncompressed_size > self.header.uncompressed_size:
+                raise IncorrectFileSize(position + block.uncompressed_size, self.header.uncompressed_size,
+                                        self.file_path, message=f"Block {i} overruns the uncompressed size")
+            self.stream[position:position + block.uncompressed_size] = block.data
+            position += block.uncompressed_size
+            block.data = b""
+        if position != self.header.uncompressed_size:
+            raise IncorrectFileSize(position, self.header.uncompressed_size, self.file_path,
+                                    message="Incorrect uncompressed size")
         
-        f: BinaryFile = BinaryFile(io.BytesIO(self.stream))
+        f: BinaryFile = MappedBinaryFile(self.stream)
         self.sarc_processor.load_stream(file=f)
 
     def export(self, **kwargs):
@@ -69,10 +82,11 @@ class AAF_v1(SharedFile):
             self.file_name = file_name
         file_path = self.get_file_path()
         self.header = self.header_type()
-        stream_file: BinaryFile = BinaryFile(io.BytesIO(self.stream))
+        stream_file: BinaryFile = MappedBinaryFile(self.stream)
         self.header.update(len(self.stream))
         
         total_compressed_size: int = 0
+        # Blocks are compressed straight to the file, only the header's compressed size is patched afterwards
         with BinaryFile(open(file_path, "wb")) as aaf_file:
             self.header.serialize(aaf_file)
             chunk: bytes = stream_file.read(self.header.max_block_size)
@@ -82,6 +96,6 @@ class AAF_v1(SharedFile):
                 block.serialize(aaf_file)
                 total_compressed_size += block.compressed_size
                 chunk = stream_file.read(self.header.max_block_size)
-
+            
             self.header.compressed_size = total_compressed_size
             self.header.write(aaf_file)
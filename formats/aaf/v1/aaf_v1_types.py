@@ -5,8 +5,10 @@ Avalanche Archive Format v1 types
 # imports
 import math
 import zlib
+from typing import Optional
 
-from files.file import SharedHeader, BinaryFile
+from files.file import SharedHeader, BinaryFile, Slot
+from files.record import Record
 
 # class
 from misc.errors import PropertyDoesNotMatch
@@ -35,7 +37,7 @@ class AAF_Header_v1(SharedHeader):
         # 33554432 is 32MB, the maximum size of a single block
         self.max_block_size: int = 33554432
         
-        self.base_pos: int = 0
+        self.offset_slot: Optional[Slot] = None
     
     def __str__(self):
         return f"AAF_Header: {self.four_cc} version {self.version} comment {self.comment}"
@@ -55,19 +57,19 @@ class AAF_Header_v1(SharedHeader):
         super().serialize(f)
         f.write_strl("AVALANCHEARCHIVEFORMATISCOOL")
         f.write_u32(self.uncompressed_size)
-        self.base_pos = f.tell()
-        f.write(b"FFFF")
+        self.offset_slot = f.reserve_u32()
         f.write_u32(self.block_count)
     
     def write(self, f: BinaryFile):
-        f.seek(self.base_pos)
-        f.write_u32(self.compressed_size)
+        f.patch(self.offset_slot, self.compressed_size)
 
 
 class AAF_Block_v1:
     """
     Each block is 32MB or less uncompressed.
     """
+    HEADER: Record = Record(("compressed_size", "I"), ("uncompressed_size", "I"), ("next_block_offset", "I"),
+                            ("four_cc", "4s"))
     
     def __init__(self):
         self.compressed_size: int = 0
@@ -78,11 +80,8 @@ class AAF_Block_v1:
     
     def deserialize(self, f: BinaryFile):
         original_pos: int = f.tell()
-        self.compressed_size = f.read_u32()
-        self.uncompressed_size = f.read_u32()
-        self.data_offset = f.tell()
-        next_block_offset = f.read_u32()
-        four_cc = f.read_strl(4)
+        self.compressed_size, self.uncompressed_size, next_block_offset, four_cc = self.HEADER.read(f)
+        self.data_offset = original_pos + 8
         if four_cc != self.four_cc:
             raise PropertyDoesNotMatch(str(four_cc), str(self.four_cc), property_name="Block four cc")
         
@@ -98,13 +97,9 @@ class AAF_Block_v1:
     def serialize(self, f: BinaryFile):
         c_buffer = zlib.compress(self.data, 6)
         self.compressed_size = len(c_buffer)
-        f.write_u32(self.compressed_size)
-        
         self.uncompressed_size = len(self.data)
-        f.write_u32(self.uncompressed_size)
-
-        self.data_offset = f.tell()
-        f.write_u32(self.data_offset + self.compressed_size)
-        f.write(self.four_cc)
+        self.data_offset = f.tell() + 8
+        self.HEADER.write(f, self.compressed_size, self.uncompressed_size, self.data_offset + self.compressed_size,
+                          self.four_cc)
         
         f.write(c_buffer)
@@ -0,0 +1,484 @@
+"""
+On-disk cache of parsed and dehashed RTPC/IRTPC trees
+"""
+
+
+# imports
+import gc
+import hashlib
+import os
+import struct
+import tempfile
+from array import array
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple, Union, Any, Iterator, Callable
+
+from files.file import BinaryBuilder, MappedBinaryFile
+from files.record import Record
+from formats.inline_runtime.v1.irtpc_v1 import IRTPC_v1
+from formats.inline_runtime.v1.irtpc_v1_types import IRT_Root_v4, IRT_Container_v1, IRT_Property_v1, \
+    IRTPC_v1_MetaType
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, RT_Property_v1, RT_MetaType_v1, \
+    RT_v1_MetaType_Typecode
+from misc.dehash import get_stamp
+
+
+# settings
+CACHE_DIRECTORY: str = os.path.join(os.path.expanduser("~"), ".cache", "apex_engine_tools", "trees")
+CACHE_SIZE_MIB: int = 2048  # Least recently used entries are evicted past this size
+EXTENSION: str = ".tree"
+HASH_CHUNK_SIZE: int = 1 << 20
+
+# Value encodings, each stored in its own columns
+NONE, INT, FLOAT, FLOATS, ARRAY, EVENT, STRING = range(7)
+
+RT_KINDS: Dict[int, int] = {
+    RT_MetaType_v1.Unassigned: NONE,
+    RT_MetaType_v1.UInteger32: INT,
+    RT_MetaType_v1.Float32: FLOAT,
+    RT_MetaType_v1.String: STRING,
+    RT_MetaType_v1.Vec2: FLOATS,
+    RT_MetaType_v1.Vec3: FLOATS,
+    RT_MetaType_v1.Vec4: FLOATS,
+    RT_MetaType_v1.Mat3x3: FLOATS,
+    RT_MetaType_v1.Mat4x4: FLOATS,
+    RT_MetaType_v1.UInteger32Array: ARRAY,
+    RT_MetaType_v1.Float32Array: ARRAY,
+    RT_MetaType_v1.ByteArray: ARRAY,
+    RT_MetaType_v1.ObjectID: INT,
+    RT_MetaType_v1.Event: EVENT,
+}
+IRT_KINDS: Dict[int, int] = {
+    IRTPC_v1_MetaType.Unassigned: NONE,
+    IRTPC_v1_MetaType.UInteger32: INT,
+    IRTPC_v1_MetaType.Float32: FLOAT,
+    IRTPC_v1_MetaType.String: STRING,
+    IRTPC_v1_MetaType.Vec2: FLOATS,
+    IRTPC_v1_MetaType.Vec3: FLOATS,
+    IRTPC_v1_MetaType.Vec4: FLOATS,
+    IRTPC_v1_MetaType.Mat3x4: FLOATS,
+    IRTPC_v1_MetaType.Event: EVENT,
+}
+ARRAY_TYPECODES: Tuple[str, ...] = ("I", "f", "B")
+
+# Source formats
+RTPC, IRTPC = 1, 2
+
+
+# class
+class TreeColumns:
+    """
+    A tree flattened into typed columns, containers in depth-first pre-order with their properties in order.
+    Values are grouped by encoding so every column is written and read back in bulk, nothing is pickled.
+    """
+    __slots__ = ("names", "name_index", "container_hashes", "container_names", "container_extras",
+                 "property_counts", "child_counts", "property_hashes", "property_names", "property_types",
+                 "property_raws", "ints", "floats", "float_counts", "float_values", "array_counts", "array_values",
+                 "event_counts", "event_values", "string_counts", "strings")
+    
+    def __init__(self):
+        self.names: List[str] = [""]
+        self.name_index: Dict[str, int] = {"": 0}
+        self.container_hashes: array = array("i")
+        self.container_names: array = array("I")
+        # RTPC: data_offset. IRTPC: unknown_01, unknown_02
+        self.container_extras: array = array("I")
+        self.property_counts: array = array("I")
+        self.child_counts: array = array("I")
+        self.property_hashes: array = array("i")
+        self.property_names: array = array("I")
+        self.property_types: array = array("B")
+        self.property_raws: array = array("I")
+        self.ints: array = array("Q")
+        self.floats: array = array("f")
+        self.float_counts: array = array("I")
+        self.float_values: array = array("f")
+        self.array_counts: array = array("I")
+        self.array_values: Dict[str, array] = {typecode: array(typecode) for typecode in ARRAY_TYPECODES}
+        self.event_counts: array = array("I")
+        self.event_values: array = array("I")
+        self.string_counts: array = array("I")
+        self.strings: bytearray = bytearray()
+    
+    def columns(self) -> Iterator[array]:
+        """ Every numeric column, in file order. """
+        yield from (self.container_hashes, self.container_names, self.container_extras, self.property_counts,
+                    self.child_counts, self.property_hashes, self.property_names, self.property_types,
+                    self.property_raws, self.ints, self.floats, self.float_counts, self.float_values,
+                    self.array_counts)
+        yield from (self.array_values[typecode] for typecode in ARRAY_TYPECODES)
+        yield from (self.event_counts, self.event_values, self.string_counts)
+    
+    def get_name(self, name: Optional[str]) -> int:
+        name = name or ""
+        if name not in self.name_index:
+            self.name_index[name] = len(self.names)
+            self.names.append(name)
+        return self.name_index[name]
+    
+    # encode
+    def add_container(self, name_hash: int, name: str, extras: Tuple[int, ...], property_count: int,
+                      child_count: int):
+        self.container_hashes.append(name_hash or 0)
+        self.container_names.append(self.get_name(name))
+        self.container_extras.extend(extras)
+        self.property_counts.append(property_count)
+        self.child_counts.append(child_count)
+    
+    def add_property(self, name_hash: int, name: str, meta_type: int, raw_data: int, kind: int, value: Any):
+        self.property_hashes.append(name_hash)
+        self.property_names.append(self.get_name(name))
+        self.property_types.append(meta_type)
+        self.property_raws.append(raw_data if isinstance(raw_data, int) else 0)
+        if kind == INT:
+            self.ints.append(int(value))
+        elif kind == FLOAT:
+            self.floats.append(value)
+        elif kind == FLOATS:
+            self.float_counts.append(len(value))
+            self.float_values.extend(value)
+        elif kind == ARRAY:
+            self.array_counts.append(len(value))
+            self.array_values[value.typecode].extend(value)
+        elif kind == EVENT:
+            self.event_counts.append(len(value))
+            self.event_values.extend(x for pair in value for x in pair)
+        elif kind == STRING:
+            value = value if isinstance(value, (bytes, bytearray)) else str(value).encode("utf-8")
+            self.string_counts.append(len(value))
+            self.strings += value
+    
+    # decode
+    def float_lists(self) -> List[List[float]]:
+        values: List[float] = self.float_values.tolist()
+        result: List[List[float]] = []
+        position: int = 0
+        for count in self.float_counts:
+            result.append(values[position:position + count])
+            position += count
+        return result
+    
+    def event_lists(self) -> List[List[Tuple[int, int]]]:
+        values: List[int] = self.event_values.tolist()
+        pairs: List[Tuple[int, int]] = list(zip(values[0::2], values[1::2]))
+        result: List[List[Tuple[int, int]]] = []
+        position: int = 0
+        for count in self.event_counts:
+            result.append(pairs[position:position + count])
+            position += count
+        return result
+    
+    def string_values(self) -> List[bytes]:
+        interned: Dict[bytes, bytes] = {}
+        result: List[bytes] = []
+        view = memoryview(self.strings)
+        position: int = 0
+        for count in self.string_counts:
+            value: bytes = view[position:position + count].tobytes()
+            result.append(interned.setdefault(value, value))
+            position += count
+        return result
+
+
+class TreeCache:
+    """
+    Parsed, dehashed trees cached on disk, so reloading a file skips both the deserialize and the dehash.
+    Entries are keyed by the source's size, mtime and content hash, and by the database its names came from.
+    The least recently used entries are evicted once the directory grows past 'max_size_mib'.
+    
+    Entry layout, little-endian:
+    1) Header: four_cc, version, source format, names resolved, source size, mtime and content hash
+    2) Names: u32 count, u32 lengths, UTF-8 blob
+    3) Columns: u32 count then the items, for each column of TreeColumns
+    4) Strings: u32 size, blob
+    """
+    HEADER = Record(("four_cc", "4s"), ("version", "I"), ("source_format", "B"), ("names_resolved", "B"),
+                    ("source_size", "Q"), ("source_mtime", "q"), ("source_hash", "16s"))
+    FOUR_CC: bytes = b"TREE"
+    VERSION: int = 1
+    
+    def __init__(self, directory: str = CACHE_DIRECTORY, max_size_mib: int = CACHE_SIZE_MIB):
+        self.directory: str = os.path.abspath(directory)
+        self.max_size: int = max_size_mib * 1024 * 1024
+        self.hits: int = 0
+        self.misses: int = 0
+    
+    def __str__(self):
+        return f"TreeCache: '{self.directory}', {self.hits} hits, {self.misses} misses"
+    
+    # keys
+    @staticmethod
+    def source_hash(file_path: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.digest()
+    
+    def get_key(self, file: Union[RTPC_v1, IRTPC_v1]) -> Tuple[str, int, int, bytes]:
+        """ Entry path, source size, mtime and content hash. """
+        stat = os.stat(file.get_file_path())
+        content_hash: bytes = self.source_hash(file.get_file_path())
+        key: str = f"{type(file).__name__}:{stat.st_size}:{stat.st_mtime_ns}:{content_hash.hex()}"
+        if os.path.exists(file.db):
+            # Names are only as good as the database they were looked up in, writes may only reach its log
+            db_mtime, wal_mtime = get_stamp(file.db)
+            key += f":{os.path.abspath(file.db)}:{os.path.getsize(file.db)}:{db_mtime}:{wal_mtime}"
+        entry: str = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{entry}{EXTENSION}"), stat.st_size, stat.st_mtime_ns, content_hash
+    
+    # io
+    def load_file(self, file: Union[RTPC_v1, IRTPC_v1]):
+        """ Load and dehash 'file' from its cache entry, or the file itself then fill the entry. """
+        if getattr(file, "lazy", False):
+            # Lazy trees decode from their mapped source on access, there is nothing to cache
+            file.load()
+            return
+        
+        entry, size, mtime, content_hash = self.get_key(file)
+        if os.path.exists(entry):
+            try:
+                self.read(file, entry, (size, mtime, content_hash))
+                self.hits += 1
+                # Modification time is the recency for the LRU, access times are often not kept
+                os.utime(entry)
+                return
+            except (ValueError, EOFError, IndexError, struct.error):
+                os.remove(entry)
+        
+        self.misses += 1
+        file.load()
+        file.resolve_names()
+        self.write(file, entry, (size, mtime, content_hash))
+        self.evict()
+    
+    def read(self, file: Union[RTPC_v1, IRTPC_v1], entry: str, stamp: Tuple[int, int, bytes]):
+        with open(entry, "rb") as f:
+            buffer: bytes = f.read()
+        if len(buffer) < self.HEADER.size:
+            raise EOFError(f"Truncated tree cache entry: '{entry}'")
+        four_cc, version, source_format, names_resolved, *source = self.HEADER.unpack(buffer)
+        expected: int = RTPC if isinstance(file, RTPC_v1) else IRTPC
+        if four_cc != self.FOUR_CC or version != self.VERSION or source_format != expected or tuple(source) != stamp:
+            raise ValueError(f"Stale tree cache entry: '{entry}'")
+        
+        f = MappedBinaryFile(buffer)
+        f.seek(self.HEADER.size)
+        columns: TreeColumns = TreeColumns()
+        name_lengths: array = f.read_array("I", f.read_u32())
+        blob: bytes = f.read(sum(name_lengths)).tobytes()
+        columns.names = []
+        position: int = 0
+        for length in name_lengths:
+            columns.names.append(blob[position:position + length].decode("utf-8"))
+            position += length
+        for column in columns.columns():
+            count: int = f.read_u32()
+            values: array = f.read_array(column.typecode, count)
+            if len(values) != count:
+                raise EOFError(f"Truncated tree cache entry: '{entry}'")
+            column.extend(values)
+        columns.strings = bytearray(f.read(f.read_u32()))
+        
+        file.get_header()
+        # Nothing built here can form a cycle, collections triggered by the many new nodes would only rescan them
+        enabled: bool = gc.isenabled()
+        gc.disable()
+        try:
+            if source_format == RTPC:
+                file.container = self.decode_rtpc(columns)
+            else:
+                file.container = self.decode_irtpc(columns)
+        finally:
+            if enabled:
+                gc.enable()
+        # The IRTPC root has no name hash of its own
+        file.hashes = set(columns.container_hashes[0 if source_format == RTPC else 1:])
+        file.hashes.update(columns.property_hashes)
+        file.names_resolved = bool(names_resolved)
+    
+    def write(self, file: Union[RTPC_v1, IRTPC_v1], entry: str, stamp: Tuple[int, int, bytes]):
+        """ Written aside then moved in place, so readers in other processes never see half an entry. """
+        if isinstance(file, RTPC_v1):
+            source_format, columns = RTPC, self.encode_rtpc(file.container)
+        else:
+            source_format, columns = IRTPC, self.encode_irtpc(file.container)
+        
+        f = BinaryBuilder()
+        self.HEADER.write(f, self.FOUR_CC, self.VERSION, source_format, int(file.names_resolved), *stamp)
+        names: List[bytes] = [name.encode("utf-8") for name in columns.names]
+        f.write_u32(len(names))
+        f.write_array(array("I", map(len, names)))
+        f.write(b"".join(names))
+        for column in columns.columns():
+            f.write_u32(len(column))
+            f.write_array(column)
+        f.write_u32(len(columns.strings))
+        f.write(columns.strings)
+        
+        os.makedirs(self.directory, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        with os.fdopen(handle, "wb") as out:
+            f.flush(out)
+        os.replace(temp_path, entry)
+    
+    def evict(self):
+        """ Remove the least recently used entries until the cache fits. """
+        entries: List[Tuple[float, int, str]] = []
+        for name in os.listdir(self.directory):
+            if name.endswith(EXTENSION):
+                path: str = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total: int = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+    
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(EXTENSION):
+                os.remove(os.path.join(self.directory, name))
+    
+    # encode
+    @staticmethod
+    def encode_rtpc(root: RT_Container_v1) -> TreeColumns:
+        columns: TreeColumns = TreeColumns()
+        stack: List[RT_Container_v1] = [root]
+        while len(stack) > 0:
+            container = stack.pop()
+            columns.add_container(container.name_hash, container.name, (container.data_offset or 0,),
+                                  len(container.properties), len(container.containers))
+            for prop in container.properties:
+                columns.add_property(prop.name_hash, prop.name, prop.type, prop.raw_data, RT_KINDS[prop.type],
+                                     prop.value)
+            stack.extend(reversed(container.containers))
+        return columns
+    
+    @staticmethod
+    def encode_irtpc(root: IRT_Root_v4) -> TreeColumns:
+        columns: TreeColumns = TreeColumns()
+        stack: List[IRT_Container_v1] = [root]
+        while len(stack) > 0:
+            container = stack.pop()
+            properties: List[IRT_Property_v1] = [obj for obj in container.objects if isinstance(obj, IRT_Property_v1)]
+            children: List[IRT_Container_v1] = [obj for obj in container.objects if isinstance(obj, IRT_Container_v1)]
+            columns.add_container(container.name_hash, container.name,
+                                  (container.unknown_01 or 0, container.unknown_02 or 0), len(properties),
+                                  len(children))
+            for prop in properties:
+                columns.add_property(prop.name_hash, prop.name, prop.type, 0, IRT_KINDS[prop.type], prop.value)
+            stack.extend(reversed(children))
+        return columns
+    
+    # decode
+    @staticmethod
+    def decode_values(columns: TreeColumns, kinds: Dict[int, int], as_tuples: bool = False) -> List[Any]:
+        """ Every property value in order. Each column is decoded in bulk, then values are taken in turn. """
+        meta_types: List[int] = columns.property_types.tolist()
+        float_lists = columns.float_lists()
+        if as_tuples:
+            float_lists = [tuple(values) for values in float_lists]
+        
+        arrays: List[array] = []
+        positions: Dict[str, int] = {typecode: 0 for typecode in ARRAY_TYPECODES}
+        array_types: List[int] = [meta_type for meta_type in meta_types if kinds[meta_type] == ARRAY]
+        for meta_type, count in zip(array_types, columns.array_counts):
+            typecode: str = RT_v1_MetaType_Typecode[meta_type]
+            start: int = positions[typecode]
+            arrays.append(columns.array_values[typecode][start:start + count])
+            positions[typecode] = start + count
+        
+        sources: Dict[int, Iterator] = {
+            NONE: repeat(None),
+            INT: iter(columns.ints.tolist()),
+            FLOAT: iter(columns.floats.tolist()),
+            FLOATS: iter(float_lists),
+            ARRAY: iter(arrays),
+            EVENT: iter(columns.event_lists()),
+            STRING: iter(columns.string_values()),
+        }
+        take: Dict[int, Callable] = {meta_type: sources[kind].__next__ for meta_type, kind in kinds.items()}
+        return [take[meta_type]() for meta_type in meta_types]
+    
+    @staticmethod
+    def build_tree(columns: TreeColumns, containers: List, properties: List, set_properties: Callable,
+                   add_child: Callable):
+        """ Hand each container its properties, then rebuild the nesting from the pre-order child counts. """
+        position: int = 0
+        for container, count in zip(containers, columns.property_counts):
+            set_properties(container, properties[position:position + count])
+            position += count
+        
+        # [parent, children still to come]
+        stack: List[List] = []
+        for container, child_count in zip(containers, columns.child_counts):
+            if len(stack) > 0:
+                add_child(stack[-1][0], container)
+                stack[-1][1] -= 1
+                if stack[-1][1] == 0:
+                    stack.pop()
+            if child_count > 0:
+                stack.append([container, child_count])
+    
+    @classmethod
+    def decode_rtpc(cls, columns: TreeColumns) -> RT_Container_v1:
+        names: List[str] = columns.names
+        meta_types: List[RT_MetaType_v1] = list(RT_MetaType_v1)
+        properties: List[RT_Property_v1] = list(map(
+            RT_Property_v1, columns.property_hashes.tolist(), columns.property_raws.tolist(),
+            [meta_types[meta_type] for meta_type in columns.property_types], cls.decode_values(columns, RT_KINDS)))
+        for prop, name in zip(properties, columns.property_names.tolist()):
+            prop.name = names[name]
+        
+        containers: List[RT_Container_v1] = []
+        for name_hash, name, data_offset, property_count, child_count in zip(
+                columns.container_hashes, columns.container_names, columns.container_extras,
+                columns.property_counts, columns.child_counts):
+            container = RT_Container_v1()
+            container.name_hash, container.name, container.data_offset = name_hash, names[name], data_offset
+            container.property_count, container.instance_count = property_count, child_count
+            containers.append(container)
+        
+        def set_properties(container: RT_Container_v1, values: List[RT_Property_v1]):
+            container.properties = values
+        
+        cls.build_tree(columns, containers, properties, set_properties,
+                       lambda parent, child: parent.containers.append(child))
+        return containers[0]
+    
+    @classmethod
+    def decode_irtpc(cls, columns: TreeColumns) -> IRT_Root_v4:
+        names: List[str] = columns.names
+        properties: List[IRT_Property_v1] = []
+        for name_hash, name, meta_type, value in zip(columns.property_hashes, columns.property_names,
+                                                     columns.property_types,
+                                                     cls.decode_values(columns, IRT_KINDS, as_tuples=True)):
+            prop = IRT_Property_v1()
+            prop.name_hash, prop.name, prop.type, prop.value = name_hash, names[name], IRTPC_v1_MetaType(meta_type), value
+            properties.append(prop)
+        
+        containers: List[IRT_Container_v1] = [IRT_Root_v4()]
+        containers.extend(IRT_Container_v1() for _ in range(len(columns.container_hashes) - 1))
+        extras = iter(columns.container_extras)
+        for container, name_hash, name in zip(containers, columns.container_hashes, columns.container_names):
+            container.name_hash, container.name = name_hash, names[name]
+            container.unknown_01, container.unknown_02 = next(extras), next(extras)
+        containers[0].name_hash = None
+        
+        # IRTPC containers keep their properties and sub-containers in a single list of objects
+        def set_objects(container: IRT_Container_v1, values: List[IRT_Property_v1]):
+            container.objects = values
+            container.object_count = len(values)
+        
+        def add_child(parent: IRT_Container_v1, child: IRT_Container_v1):
+            parent.objects.append(child)
+            parent.object_count = len(parent.objects)
+        
+        cls.build_tree(columns, containers, properties, set_objects, add_child)
+        return containers[0]
@@ -5,9 +5,11 @@
 # imports
 from typing import Dict
 
+from files.file import SharedFile, BinaryFile
 from formats import Binary_Manager
 from formats.inline_runtime.v1.irtpc_v1 import IRTPC_v1
 from formats.runtime import RTPC_XML_Manager
+from misc.errors import UnsupportedVersion
 
 
 # class
@@ -17,6 +19,32 @@ class IRTPC_XML_Manager(RTPC_XML_Manager):
     }
 
 
-# TODO: Implement this properly
 class IRTPC_Manager(Binary_Manager):
-    pass
+    VERSIONS: Dict = {
+        1: IRTPC_v1
+    }
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.file_path: str = kwargs.get("file_path")
+        self.db_path: str = kwargs.get("db_path", "")
+        self.version: int = 0
+    
+    def load_header(self):
+        # No four_cc, the file starts with its version
+        with BinaryFile(open(self.file_path, "rb")) as f:
+            self.version = f.read_u8()
+    
+    def preprocess(self, **kwargs):
+        super().preprocess(**kwargs)
+        if self.version not in self.VERSIONS.keys():
+            raise UnsupportedVersion(str(self.version), list(self.VERSIONS.keys()), self.file_path)
+    
+    def do(self, **kwargs):
+        super().do(**kwargs)
+        file: SharedFile = self.VERSIONS[self.version](self.file_path, self.db_path, self.dehash)
+        if self.cache is not None:
+            self.cache.load_file(file)
+        else:
+            file.load()
+        file.export()
@@ -6,11 +6,13 @@ Inline Runtime Container v1
 # imports
 import xml.etree.ElementTree as et
 import os.path
-import sqlite3 as sql
+from typing import Optional, Set
 
 from misc import utils
-from files.file import SharedFile, BinaryFile
+from files.file import SharedFile, BinaryFile, BinaryBuilder
+from files.xml_writer import XMLWriter
 from formats.inline_runtime.v1.irtpc_v1_types import IRT_Root_v4, IRT_Header_v1
+from misc.dehash import DehashSource, get_dictionary
 from misc.errors import UnsupportedXMLTag, UnsupportedXMLVersion, MissingInvalidXMLVersion
 
 
@@ -23,7 +25,7 @@ class IRTPC_v1(SharedFile):
     """
     XML_TAG: str = "irtpc"
     
-    def __init__(self, file_path: str = "", db_path: str = ""):
+    def __init__(self, file_path: str = "", db_path: str = "", dehash: Optional[DehashSource] = None):
         super().__init__()
         self.version = 1
         self.container = IRT_Root_v4()
@@ -32,6 +34,9 @@ class IRTPC_v1(SharedFile):
             self.db = os.path.abspath("E:\\Projects\\Just Cause Tools\\Apex Engine Tools\\dbs\\global.db")
         else:
             self.db = db_path
+        self.dehash: Optional[DehashSource] = dehash
+        self.hashes: Set[int] = set()
+        self.names_resolved: bool = True
         if file_path != "":
             self.get_file_details(file_path)
     
@@ -69,9 +74,20 @@ class IRTPC_v1(SharedFile):
     def deserialize(self, **kwargs):
         """ Recursive containers deserialize each other. """
         f: BinaryFile = kwargs.get("file")
-        conn = sql.connect(self.db)
-        db_cursor = conn.cursor()
-        self.container.deserialize(f, db_cursor)
+        self.dehash = kwargs.get("dehash", self.dehash)
+        # Names are resolved in bulk from the unique hashes, only once they are needed
+        self.hashes = set()
+        self.container.deserialize(f, self.hashes)
+        self.names_resolved = False
+    
+    def resolve_names(self):
+        """ Dehash every unique hash of the file with a single bulk lookup. """
+        dehash: Optional[DehashSource] = self.dehash
+        if dehash is None:
+            dehash = get_dictionary(self.db, len(self.hashes))
+        if dehash is not None:
+            self.container.apply_names(dehash.lookup_many(self.hashes))
+        self.names_resolved = True
     
     def export(self, **kwargs):
         """ Export the file as an XML. """
@@ -80,15 +96,19 @@ class IRTPC_v1(SharedFile):
             file_path = f"{self.get_file_path_short()}.xml"
         else:
             file_path = os.path.abspath(file_path)
-        root = et.Element('irtpc')
-        root.attrib['extension'] = self.extension
-        root.attrib['version'] = str(self.header.version_01)
-        root.attrib['version_02'] = str(self.header.version_02)
-        root.append(self.container.export())
-        utils.indent(root)
+        if not self.names_resolved:
+            self.resolve_names()
         
-        root = et.ElementTree(root)
-        root.write(file_path, encoding='utf-8', xml_declaration=True)
+        # Streamed while walking the tree, same output as building the Elements and indenting them
+        with XMLWriter.open(file_path) as w:
+            w.declaration()
+            attrib = (("extension", self.extension), ("version", str(self.header.version_01)),
+                      ("version_02", str(self.header.version_02)))
+            w.start(self.XML_TAG, attrib)
+            w.indent(1)
+            self.container.export_stream(w, 1)
+            w.end(self.XML_TAG, 0)
+            w.indent(0)
     
     def import_(self, **kwargs):
         root = kwargs.get("root")
@@ -106,5 +126,7 @@ class IRTPC_v1(SharedFile):
         if file_path != "":
             self.file_name = file_path
         file_path = self.get_file_path()
-        with BinaryFile(open(file_path, 'wb')) as f:
-            self.container.serialize(f)
+        f: BinaryBuilder = BinaryBuilder()
+        self.container.serialize(f)
+        with open(file_path, 'wb') as file:
+            f.flush(file)
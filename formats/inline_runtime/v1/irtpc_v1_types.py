@@ -5,10 +5,12 @@ Inline Runtime Container v1 types
 
 # imports
 from enum import IntEnum
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Set, Tuple
 import xml.etree.ElementTree as et
 
 from files.file import SharedHeader, BinaryFile
+from files.record import Record
+from files.xml_writer import XMLWriter
 import misc.utils as u
 
 
@@ -67,15 +69,24 @@ class IRT_Header_v1(SharedHeader):
 
 class IRT_Base_v1:
     """ Shared Runtime Container base. """
+    __slots__ = ()
     
-    def deserialize(self, f: BinaryFile, db_cursor=None):
-        """ Deserialize a file. Optional sqlite3.cursor object for dehashing. """
+    def deserialize(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        """ Deserialize a file. Optionally collect every name hash into 'hashes' for a later dehash. """
+        raise NotImplementedError
+    
+    def apply_names(self, names: Dict[int, str]):
+        """ Set names from a bulk dehash of the file's hashes. """
         raise NotImplementedError
     
     def export(self):
         """ Export the container as an XML. """
         raise NotImplementedError
     
+    def export_stream(self, w: XMLWriter, level: int = 0):
+        """ Stream the XML export to a writer instead of building Elements. """
+        raise NotImplementedError
+    
     def import_(self, elem: et.Element):
         """ Import an XML and convert to this object type. """
         raise NotImplementedError
@@ -91,6 +102,9 @@ class IRT_Property_v1(IRT_Base_v1):
     2) Type
     3) Value
     """
+    __slots__ = ("name", "name_hash", "raw_data", "type", "value")
+    
+    HEADER: Record = Record(("name_hash", "i"), ("type", "B"))
     
     def __init__(self):
         self.name: str = ''
@@ -105,16 +119,15 @@ class IRT_Property_v1(IRT_Base_v1):
     def get_type_str(self) -> str:
         return IRTPC_v1_MetaType_String[self.type]
     
+    def apply_names(self, names: Dict[int, str]):
+        self.name = names.get(self.name_hash, "")
+    
     # io
-    def deserialize(self, f: BinaryFile, db_cursor=None):
-        self.name_hash = f.read_s32()
-        if db_cursor is not None:
-            db_cursor.execute(f"SELECT value FROM properties "
-                              f"WHERE hash = {self.name_hash}")
-            value = db_cursor.fetchone()
-            if value is not None:
-                self.name = value[0]
-        self.type = IRTPC_v1_MetaType(f.read_u8())
+    def deserialize(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        self.name_hash, meta_type = self.HEADER.read(f)
+        if hashes is not None:
+            hashes.add(self.name_hash)
+        self.type = IRTPC_v1_MetaType(meta_type)
         
         # Base data types
         if self.type == IRTPC_v1_MetaType.UInteger32:
@@ -123,7 +136,7 @@ class IRT_Property_v1(IRT_Base_v1):
             self.value = f.read_f32()
         elif self.type == IRTPC_v1_MetaType.String:
             length = f.read_u16()
-            self.value = f.read_strl(length)
+            self.value = f.read_strl(length, intern=True)
         elif self.type == IRTPC_v1_MetaType.Vec2:
             self.value = f.read_f32(2)
         elif self.type == IRTPC_v1_MetaType.Vec3:
@@ -141,20 +154,21 @@ class IRT_Property_v1(IRT_Base_v1):
             raise ValueError(f"Invalid IRTPC_v1_MetaType: {self.type}")
 
     def export(self):
-        elem = et.Element('property')
-        elem.attrib['hash'] = u.safe_hex(self.name_hash, fmt='i')
-        elem.attrib['type'] = f"{self.get_type_str()}"
-        if self.name is None:
-            elem.attrib['name'] = 'none'
-        else:
-            elem.attrib['name'] = self.name
-        
+        elem = et.Element('property', dict(self.export_attrib()))
+        elem.text = self.export_text()
+        return elem
+    
+    def export_attrib(self) -> Tuple[Tuple[str, str], ...]:
+        name: str = 'none' if self.name is None else self.name
+        return ("hash", u.safe_hex(self.name_hash, fmt='i')), ("type", f"{self.get_type_str()}"), ("name", name)
+    
+    def export_text(self) -> Optional[str]:
         if self.type == IRTPC_v1_MetaType.String:
-            elem.text = self.value.decode('utf-8')
+            return self.value.decode('utf-8')
         elif self.type == IRTPC_v1_MetaType.Float32:
-            elem.text = f"{u.f32_fmt(self.value)}"
+            return f"{u.f32_fmt(self.value)}"
         elif self.type in [IRTPC_v1_MetaType.Vec2, IRTPC_v1_MetaType.Vec3, IRTPC_v1_MetaType.Vec4]:
-            elem.text = ",".join(map(u.f32_fmt, self.value))
+            return ",".join(map(u.f32_fmt, self.value))
         elif self.type == IRTPC_v1_MetaType.Mat3x4:
             by_four = [
                 ",".join(map(u.f32_fmt, self.value[:3])),
@@ -162,17 +176,18 @@ class IRT_Property_v1(IRT_Base_v1):
                 ",".join(map(u.f32_fmt, self.value[6:9])),
                 ",".join(map(u.f32_fmt, self.value[9:]))
             ]
-            elem.text = " ".join(by_four)
+            return " ".join(by_four)
         elif self.type == IRTPC_v1_MetaType.Event:
             values = []
             for pair in self.value:
                 fmt_e01, fmt_e02 = u.safe_hex(pair[0]), u.safe_hex(pair[1])
                 values.append(f"{fmt_e01}={fmt_e02}")
-            elem.text = ", ".join(values)
+            return ", ".join(values)
         else:
-            elem.text = f"{self.value}"
-        
-        return elem
+            return f"{self.value}"
+    
+    def export_stream(self, w: XMLWriter, level: int = 0):
+        w.leaf("property", self.export_attrib(), self.export_text())
     
     def import_(self, elem: et.Element):
         self.name = elem.attrib['name']
@@ -208,8 +223,7 @@ class IRT_Property_v1(IRT_Base_v1):
         return None
 
     def serialize(self, f: BinaryFile):
-        f.write_s32(u.safe_dehex(self.name_hash, 'i'))
-        f.write_u8(self.type.value)
+        self.HEADER.write(f, u.safe_dehex(self.name_hash, 'i'), self.type.value)
         if self.type == IRTPC_v1_MetaType.UInteger32:
             f.write_u32(self.value)
         elif self.type == IRTPC_v1_MetaType.Float32:
@@ -237,6 +251,10 @@ class IRT_Container_v1(IRT_Base_v1):
     3) Unknown 02
     4) Object count
     """
+    __slots__ = ("name", "name_hash", "unknown_01", "unknown_02", "object_type", "object_count", "objects")
+    
+    HEADER: Record = Record(("name_hash", "i"), ("unknown_01", "B"), ("unknown_02", "H"), ("object_count", "H"))
+    XML_TAG: str = "container"
     
     def __init__(self):
         self.name: str = ''
@@ -255,46 +273,53 @@ class IRT_Container_v1(IRT_Base_v1):
                 return child
         return None
     
+    def apply_names(self, names: Dict[int, str]):
+        self.name = names.get(self.name_hash, "")
+        for obj in self.objects:
+            obj.apply_names(names)
+    
     def sort_objects(self):
         """ Sort properties by name then name_hash. """
         self.objects.sort(key=lambda x: (x.name == "", x.name.lower(), x.name_hash))
 
-    def load_objects(self, f: BinaryFile, db_cursor=None):
+    def load_objects(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
         objects = [self.object_type() for _ in range(self.object_count)]
         for i in range(self.object_count):
-            objects[i].deserialize(f, db_cursor)
+            objects[i].deserialize(f, hashes)
         self.objects = objects
 
     # io
-    def deserialize(self, f: BinaryFile, db_cursor=None):
-        self.name_hash = f.read_s32()
-        if db_cursor is not None:
-            db_cursor.execute(f"SELECT value FROM properties "
-                              f"WHERE hash = {self.name_hash}")
-            value = db_cursor.fetchone()
-            if value is not None:
-                self.name = value[0]
-        self.unknown_01 = f.read_u8()
-        self.unknown_02 = f.read_u16()
-        self.object_count = f.read_u16()
-        self.load_objects(f, db_cursor=db_cursor)
+    def deserialize(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        self.name_hash, self.unknown_01, self.unknown_02, self.object_count = self.HEADER.read(f)
+        if hashes is not None:
+            hashes.add(self.name_hash)
+        self.load_objects(f, hashes=hashes)
     
     def export(self):
-        elem = et.Element('container')
-        elem.attrib['hash'] = u.safe_hex(self.name_hash, 'i')
-        if self.name is None:
-            elem.attrib['name'] = 'none'
-        else:
-            elem.attrib['name'] = self.name
-        
-        elem.attrib['unk01'] = str(self.unknown_01)
-        elem.attrib['unk02'] = str(self.unknown_02)
-        
+        elem = et.Element('container', dict(self.export_attrib()))
         for obj in self.objects:
             elem.append(obj.export())
         
         return elem
     
+    def export_attrib(self) -> Tuple[Tuple[str, str], ...]:
+        name: str = 'none' if self.name is None else self.name
+        return ("hash", u.safe_hex(self.name_hash, 'i')), ("name", name), \
+            ("unk01", str(self.unknown_01)), ("unk02", str(self.unknown_02))
+    
+    def export_stream(self, w: XMLWriter, level: int = 0):
+        """ Stream the container to 'w', same output as export followed by utils.indent. """
+        tag: str = self.XML_TAG
+        if len(self.objects) == 0:
+            w.leaf(tag, self.export_attrib())
+            return
+        
+        w.start(tag, self.export_attrib())
+        for obj in self.objects:
+            w.indent(level + 1)
+            obj.export_stream(w, level + 1)
+        w.end(tag, level)
+    
     def import_(self, elem: et.Element):
         self.name_hash = elem.attrib['hash']
         self.unknown_01 = int(elem.attrib['unk01'])
@@ -306,10 +331,7 @@ class IRT_Container_v1(IRT_Base_v1):
             self.objects[i].import_(child)
     
     def serialize(self, f: BinaryFile):
-        f.write_s32(u.safe_dehex(self.name_hash, 'i'))
-        f.write_u8(self.unknown_01)
-        f.write_u16(self.unknown_02)
-        f.write_u16(self.object_count)
+        self.HEADER.write(f, u.safe_dehex(self.name_hash, 'i'), self.unknown_01, self.unknown_02, self.object_count)
         for child in self.objects:
             child.serialize(f)
 
@@ -320,6 +342,10 @@ class IRT_Root_v4(IRT_Container_v1):
     2) Unknown 02
     3) Object count
     """
+    __slots__ = ()
+    
+    HEADER: Record = Record(("unknown_01", "B"), ("unknown_02", "H"), ("object_count", "H"))
+    XML_TAG: str = "root"
     
     def __init__(self):
         super().__init__()
@@ -331,22 +357,20 @@ class IRT_Root_v4(IRT_Container_v1):
             obj.sort_objects()
     
     # io
-    def deserialize(self, f: BinaryFile, db_cursor=None):
-        self.unknown_01 = f.read_u8()
-        self.unknown_02 = f.read_u16()
-        self.object_count = f.read_u16()
-        self.load_objects(f, db_cursor=db_cursor)
+    def deserialize(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        self.unknown_01, self.unknown_02, self.object_count = self.HEADER.read(f)
+        self.load_objects(f, hashes=hashes)
     
     def export(self):
-        elem = et.Element('root')
-        elem.attrib['unk01'] = str(self.unknown_01)
-        elem.attrib['unk02'] = str(self.unknown_02)
-        
+        elem = et.Element('root', dict(self.export_attrib()))
         for obj in self.objects:
             elem.append(obj.export())
         
         return elem
     
+    def export_attrib(self) -> Tuple[Tuple[str, str], ...]:
+        return ("unk01", str(self.unknown_01)), ("unk02", str(self.unknown_02))
+    
     def import_(self, **kwargs):
         elem: et.Element = kwargs.get("elem")
         
@@ -359,9 +383,7 @@ class IRT_Root_v4(IRT_Container_v1):
             self.objects[i].import_(child)
     
     def serialize(self, f: BinaryFile):
-        f.write_u8(self.unknown_01)
-        f.write_u16(self.unknown_02)
-        f.write_u16(self.object_count)
+        self.HEADER.write(f, self.unknown_01, self.unknown_02, self.object_count)
         for child in self.objects:
             child.serialize(f)
 
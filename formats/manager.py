@@ -5,14 +5,16 @@ TODO: Doc string
 
 # imports
 import xml.etree.ElementTree as et
-from typing import Dict, List
+from typing import Dict, List, Optional
 import os.path
 
 from files.file import BinaryFile
 from formats import XML_Manager, Binary_Manager
+from formats.cache import TreeCache
 from formats.inline_runtime import IRTPC_XML_Manager, IRTPC_Manager
 from formats.runtime import RTPC_XML_Manager, RTPC_Manager
 from formats.sarc import SARC_Manager
+from misc.dehash import DehashSource, get_dictionary
 from misc.errors import UnsupportedXMLTag, MalformedXMLDoc
 
 
@@ -43,8 +45,12 @@ def manage_xml(file_path: str, db_path: str):
     xml_manage.do()
 
 
-def manage_binary(file_path: str, db_path: str):
-    """ Manage binary files and process them. """
+def manage_binary(file_path: str, db_path: str, dehash: Optional[DehashSource] = None,
+                  cache: Optional[TreeCache] = None):
+    """
+    Manage binary files and process them. Every file shares the process-wide dictionary of the database.
+    Parsed trees are reused from 'cache' when one is given.
+    """
     FOUR_CC: Dict = {
         b"RTPC": RTPC_Manager,
         b"SARC": SARC_Manager,
@@ -62,5 +68,7 @@ def manage_binary(file_path: str, db_path: str):
         else:
             manager_class = IRTPC_Manager
 
-    manager = manager_class(file_path=file_path, db_path=db_path)
+    if dehash is None:
+        dehash = get_dictionary(db_path)
+    manager = manager_class(file_path=file_path, db_path=db_path, dehash=dehash, cache=cache)
     manager.do()
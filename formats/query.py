@@ -0,0 +1,345 @@
+"""
+Path and predicate queries straight against RTPC and IRTPC binaries, without an XML export.
+
+A path is matched against the containers below the root, segments are separated by '/':
+    'name'      a container named 'name'
+    '#1A2B3C4D' a container by hash, written as in the XML 'hash' attribute
+    '*'         any single container
+    '**'        any number of containers, including none
+Predicates test the properties of a matched container, values are compared in their XML text form:
+    'name'              the property exists
+    'name=value'        equals 'value'
+    'name=a|b|c'        equals any of the values
+    'name=@file.txt'    equals any line of the file
+    'name!=value'       exists and differs from the value or values
+    'name~regex'        exists and matches the regular expression
+"""
+
+
+# imports
+import argparse as ap
+import json
+import multiprocessing as mp
+import os.path
+import re
+import sys
+from typing import Any, Dict, List, Optional, Set, Tuple, Iterator, Iterable, FrozenSet, Union
+
+from formats.inline_runtime.v1.irtpc_v1 import IRTPC_v1
+from formats.inline_runtime.v1.irtpc_v1_types import IRT_Container_v1, IRT_Property_v1
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, to_name_hash
+from misc import utils as u
+from misc.dehash import DehashSource, get_dictionary
+from misc.hash_functions import hash_jenkins
+
+
+# settings
+ANY: str = "*"
+ANY_DEPTH: str = "**"
+
+# Per-process state, set once by init_worker
+_query: Optional["Query"] = None
+_dehash: Optional[DehashSource] = None
+
+
+# functions
+def parse_name(token: str) -> int:
+    """ Signed name hash of a name, or of an XML-style hash prefixed with '#'. """
+    if token.startswith("#"):
+        return to_name_hash(token[1:])
+    return to_name_hash(hash_jenkins(token)[0])
+
+
+def format_name(name_hash: int, names: Dict[int, str]) -> str:
+    """ The inverse of parse_name, the name when it is known. """
+    name: str = names.get(name_hash, "")
+    if name != "":
+        return name
+    return f"#{u.safe_hex(name_hash, fmt='i')}"
+
+
+def get_properties(container) -> List:
+    if isinstance(container, RT_Container_v1):
+        return container.properties
+    return [obj for obj in container.objects if isinstance(obj, IRT_Property_v1)]
+
+
+def get_containers(container) -> List:
+    if isinstance(container, RT_Container_v1):
+        return container.containers
+    return [obj for obj in container.objects if isinstance(obj, IRT_Container_v1)]
+
+
+def get_property_index(container) -> Dict[int, Any]:
+    """ name_hash -> property, the per-container index of an RTPC or the first match of an IRTPC. """
+    if isinstance(container, RT_Container_v1):
+        return container.get_property_index()
+    index: Dict[int, Any] = {}
+    for prop in get_properties(container):
+        index.setdefault(prop.name_hash, prop)
+    return index
+
+
+def get_property_hashes(container) -> Set[int]:
+    """ Lazy RTPC containers answer this from their property headers, without decoding any value. """
+    if isinstance(container, RT_Container_v1):
+        return container.get_property_hashes()
+    return set(get_property_index(container))
+
+
+# class
+class Predicate:
+    __slots__ = ("name_hash", "op", "values", "pattern")
+    
+    EXPRESSION = re.compile(r"^(?P<name>[^=!~]+?)\s*(?:(?P<op>!=|=|~)(?P<value>.*))?$")
+    
+    def __init__(self, name_hash: int, op: str = "", values: Iterable[str] = ()):
+        self.name_hash: int = name_hash
+        self.op: str = op
+        self.values: FrozenSet[str] = frozenset(values)
+        self.pattern: Optional[re.Pattern] = re.compile(next(iter(self.values))) if op == "~" else None
+    
+    def __str__(self):
+        return f"Predicate: #{u.safe_hex(self.name_hash, fmt='i')} {self.op} {sorted(self.values)}"
+    
+    @classmethod
+    def parse(cls, text: str):
+        match = cls.EXPRESSION.match(text.strip())
+        if match is None:
+            raise ValueError(f"Invalid predicate '{text}'")
+        name, op, value = match.group("name", "op", "value")
+        if op is None:
+            return cls(parse_name(name))
+        
+        value = value.strip()
+        if op == "~":
+            values: List[str] = [value]
+        elif value.startswith("@"):
+            with open(value[1:], "r", encoding="utf-8") as f:
+                values: List[str] = [line.strip() for line in f if line.strip()]
+        else:
+            values: List[str] = value.split("|")
+        return cls(parse_name(name), op, values)
+    
+    def test(self, index: Dict[int, Any]) -> bool:
+        prop = index.get(self.name_hash)
+        if prop is None:
+            return False
+        if self.op == "":
+            return True
+        
+        text: str = prop.export_text() or ""
+        if self.op == "=":
+            return text in self.values
+        elif self.op == "!=":
+            return text not in self.values
+        return self.pattern.search(text) is not None
+
+
+class Query:
+    """
+    Containers matching a path and all predicates.
+    Only the headers of containers off the path are read, the properties of containers on it are only decoded
+    once their headers hold every property the predicates need.
+    """
+    __slots__ = ("path", "predicates", "select", "required")
+    
+    def __init__(self, path: str = ANY_DEPTH, predicates: Iterable[Predicate] = (), select: Iterable[str] = ()):
+        self.path: Tuple[Union[int, str], ...] = tuple(
+            segment if segment in (ANY, ANY_DEPTH) else parse_name(segment)
+            for segment in path.split("/") if segment != ""
+        )
+        self.predicates: Tuple[Predicate, ...] = tuple(predicates)
+        self.select: FrozenSet[int] = frozenset(parse_name(name) for name in select)
+        self.required: FrozenSet[int] = frozenset(predicate.name_hash for predicate in self.predicates)
+    
+    def __str__(self):
+        return f"Query: {len(self.path)} path segments, {len(self.predicates)} predicates"
+    
+    @classmethod
+    def parse(cls, path: str = ANY_DEPTH, where: Iterable[str] = (), select: Iterable[str] = ()):
+        return cls(path, [Predicate.parse(text) for text in where], select)
+    
+    # path
+    def closure(self, states: Iterable[int]) -> FrozenSet[int]:
+        """ '**' also matches no container at all, so it can be skipped. """
+        result: Set[int] = set()
+        pending: List[int] = list(states)
+        while len(pending) > 0:
+            state: int = pending.pop()
+            if state in result:
+                continue
+            result.add(state)
+            if state < len(self.path) and self.path[state] == ANY_DEPTH:
+                pending.append(state + 1)
+        return frozenset(result)
+    
+    def start(self) -> FrozenSet[int]:
+        return self.closure([0])
+    
+    def step(self, states: FrozenSet[int], name_hash: int) -> FrozenSet[int]:
+        """ Positions in the path after stepping into a container. Empty once the path can no longer match. """
+        next_states: List[int] = []
+        for state in states:
+            if state == len(self.path):
+                continue
+            segment = self.path[state]
+            if segment == ANY_DEPTH:
+                next_states.append(state)
+            elif segment == ANY or segment == name_hash:
+                next_states.append(state + 1)
+        return self.closure(next_states)
+    
+    def is_match(self, states: FrozenSet[int]) -> bool:
+        return len(self.path) in states
+    
+    # search
+    def test(self, container) -> bool:
+        if len(self.predicates) == 0:
+            return True
+        if not self.required <= get_property_hashes(container):
+            return False
+        index: Dict[int, Any] = get_property_index(container)
+        return all(predicate.test(index) for predicate in self.predicates)
+    
+    def search(self, root) -> Iterator[Tuple[Tuple[int, ...], object]]:
+        """ (container path, container) of every match in file order, the path being the name hashes below the root. """
+        stack: List[Tuple[Tuple[int, ...], object, FrozenSet[int]]] = [((), root, self.start())]
+        while len(stack) > 0:
+            path, container, states = stack.pop()
+            if self.is_match(states) and self.test(container):
+                yield path, container
+            
+            children: List[Tuple[Tuple[int, ...], object, FrozenSet[int]]] = []
+            for child in get_containers(container):
+                name_hash: int = to_name_hash(child.name_hash)
+                child_states: FrozenSet[int] = self.step(states, name_hash)
+                if len(child_states) > 0:
+                    children.append((path + (name_hash,), child, child_states))
+            # Reversed so the first child is popped first
+            stack.extend(reversed(children))
+    
+    def results(self, root, file_path: str = "", dehash: Optional[DehashSource] = None) -> List[Dict]:
+        """ Every match as a JSON-ready dict, names are looked up in bulk once the file has been searched. """
+        matches: List[Tuple[Tuple[int, ...], List]] = []
+        hashes: Set[int] = set()
+        for path, container in self.search(root):
+            properties: List = [prop for prop in get_properties(container)
+                                if len(self.select) == 0 or to_name_hash(prop.name_hash) in self.select]
+            matches.append((path, properties))
+            hashes.update(path)
+            hashes.update(to_name_hash(prop.name_hash) for prop in properties)
+        
+        names: Dict[int, str] = dehash.lookup_many(hashes) if dehash is not None and len(hashes) > 0 else {}
+        results: List[Dict] = []
+        for path, properties in matches:
+            results.append({
+                "file": file_path,
+                "path": "/".join(format_name(name_hash, names) for name_hash in path),
+                "properties": [
+                    {
+                        "name": format_name(to_name_hash(prop.name_hash), names),
+                        "type": prop.get_type_str(),
+                        "value": prop.export_text(),
+                    }
+                    for prop in properties
+                ],
+            })
+        return results
+
+
+# io
+def open_file(file_path: str) -> Union[RTPC_v1, IRTPC_v1]:
+    """ RTPCs are loaded lazily, every other file is taken as an IRTPC like manage_binary does. """
+    with open(file_path, "rb") as f:
+        four_cc: bytes = f.read(8)
+    if four_cc[:4] == b"RTPC":
+        file = RTPC_v1(file_path, "-", lazy=True)
+    elif four_cc[4:] == b"SARC":
+        raise ValueError("SARC archives are not queried, unpack them first")
+    else:
+        file = IRTPC_v1(file_path, "-")
+    file.load()
+    return file
+
+
+def query_file(file_path: str, query: Query, dehash: Optional[DehashSource] = None) -> List[Dict]:
+    file = open_file(file_path)
+    try:
+        return query.results(file.container, file_path, dehash)
+    finally:
+        if isinstance(file, RTPC_v1):
+            file.close()
+
+
+def find_files(paths: Iterable[str]) -> Iterator[str]:
+    """ Files given directly, and every RTPC found in the given folders. """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield os.path.normpath(path)
+            continue
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                file_path: str = os.path.join(root, name)
+                with open(file_path, "rb") as f:
+                    if f.read(4) == b"RTPC":
+                        yield file_path
+
+
+# workers
+def init_worker(query: Query, database_file_path: str):
+    global _query, _dehash
+    _query = query
+    _dehash = get_dictionary(database_file_path) if database_file_path != "" else None
+
+
+def query_worker(file_path: str) -> Tuple[str, List[Dict], str]:
+    try:
+        return file_path, query_file(file_path, _query, _dehash), ""
+    except Exception as e:
+        return file_path, [], f"{type(e).__name__}: {e}"
+
+
+def query_files(paths: Iterable[str], query: Query, database_file_path: str = "",
+                processes: int = 0) -> Iterator[Tuple[str, List[Dict], str]]:
+    """ (file path, results, error) per file as each one completes, the files are searched across all cores. """
+    file_paths: List[str] = list(find_files(paths))
+    processes = min(processes or os.cpu_count() or 1, max(len(file_paths), 1))
+    if processes == 1:
+        init_worker(query, database_file_path)
+        yield from map(query_worker, file_paths)
+        return
+    
+    with mp.Pool(processes, initializer=init_worker, initargs=(query, database_file_path)) as pool:
+        yield from pool.imap_unordered(query_worker, file_paths)
+
+
+def run(argv: List[str], database_file_path: str = "") -> int:
+    """ The 'query' command, matches are written to stdout as JSON lines and errors to stderr. """
+    parser = ap.ArgumentParser(prog="query", description="Query RTPC/IRTPC binaries, one JSON line per match")
+    parser.add_argument("paths", type=str, nargs="+", help="files, or folders searched for RTPCs")
+    parser.add_argument("--path", type=str, default=ANY_DEPTH, help="container path, e.g. '**/#1A2B3C4D/*'")
+    parser.add_argument("--where", type=str, action="append", default=[],
+                        help="property predicate, e.g. 'class=CRigidObject' or '_object_id=@ids.txt'")
+    parser.add_argument("--select", type=str, action="append", default=[], help="only output these properties")
+    parser.add_argument("--db", type=str, default=database_file_path, help="names the output, optional")
+    parser.add_argument("--processes", type=int, default=0)
+    args = parser.parse_args(argv)
+    
+    query: Query = Query.parse(args.path, args.where, args.select)
+    failed: int = 0
+    for file_path, results, error in query_files(args.paths, query, args.db, args.processes):
+        if error != "":
+            failed += 1
+            print(json.dumps({"file": file_path, "error": error}), file=sys.stderr)
+        for result in results:
+            sys.stdout.write(json.dumps(result))
+            sys.stdout.write("\n")
+        sys.stdout.flush()
+    return 1 if failed > 0 else 0
+
+
+# main
+if __name__ == "__main__":
+    sys.exit(run(sys.argv[1:]))
@@ -68,6 +68,9 @@ class RTPC_Manager(Binary_Manager):
     
     def do(self, **kwargs):
         super().do(**kwargs)
-        file: SharedFile = self.VERSIONS[self.version](self.file_path, self.db_path)
-        file.load()
+        file: SharedFile = self.VERSIONS[self.version](self.file_path, self.db_path, self.dehash)
+        if self.cache is not None:
+            self.cache.load_file(file)
+        else:
+            file.load()
         file.export()
@@ -6,12 +6,16 @@ Runtime Container v1
 # imports
 import xml.etree.ElementTree as et
 import os.path
-import sqlite3 as sql
+from typing import Optional, Set, Union, List, Tuple
 
 from misc import utils
-from misc.errors import UnsupportedXMLTag, MissingInvalidXMLVersion, UnsupportedXMLVersion, FileDoesNotExist
-from files.file import SharedFile, BinaryFile
-from formats.runtime.v1.rtpc_v1_types import RT_Header_v1, RT_Container_v1
+from misc.dehash import DehashSource, get_dictionary
+from misc.errors import UnsupportedXMLTag, MissingInvalidXMLVersion, UnsupportedXMLVersion
+from files.file import SharedFile, BinaryFile, BinaryBuilder, MappedBinaryFile
+from files.xml_writer import XMLWriter
+from formats.runtime.v1.rtpc_v1_types import RT_Header_v1, RT_Container_v1, RT_LazyContainer_v1, RT_Index_v1, \
+    RT_Property_v1, RT_Layout_v1
+from misc.hash_functions import hash_jenkins
 
 
 # classes
@@ -23,7 +27,8 @@ class RTPC_v1(SharedFile):
     """
     XML_TAG: str = "rtpc"
     
-    def __init__(self, file_path: str = "", db_path: str = ""):
+    def __init__(self, file_path: str = "", db_path: str = "", dehash: Optional[DehashSource] = None,
+                 lazy: bool = False):
         super().__init__()
         self.version = 1
         self.container = RT_Container_v1()
@@ -32,6 +37,13 @@ class RTPC_v1(SharedFile):
             self.db = os.path.abspath("E:\\Projects\\Just Cause Tools\\Apex Engine Tools\\dbs\\global.db")
         else:
             self.db = db_path
+        self.dehash: Optional[DehashSource] = dehash
+        self.hashes: Set[int] = set()
+        self.names_resolved: bool = True
+        # Lazy files keep their mapped source open until closed, containers are decoded on access
+        self.lazy: bool = lazy
+        self.source: Optional[MappedBinaryFile] = None
+        self.index: Optional[RT_Index_v1] = None
         if file_path != "":
             self.get_file_details(file_path)
     
@@ -43,7 +55,44 @@ class RTPC_v1(SharedFile):
         self.container.sort_properties(property_recurse)
         self.container.sort_containers(container_recurse)
     
+    # index
+    def get_index(self) -> RT_Index_v1:
+        """ The tree-wide hash index, built on first use and rebuilt once the tree is mutated. """
+        if self.index is None or self.index.root is not self.container or self.index.is_stale():
+            self.index = RT_Index_v1(self.container)
+        return self.index
+    
+    def find_properties(self, name_hash: Union[int, str]) -> List[Tuple[Tuple[int, ...], RT_Property_v1]]:
+        return self.get_index().find_properties(name_hash)
+    
+    def find_containers(self, name_hash: Union[int, str]) -> List[Tuple[Tuple[int, ...], RT_Container_v1]]:
+        return self.get_index().find_containers(name_hash)
+    
+    def find_properties_by_name(self, name: str) -> List[Tuple[Tuple[int, ...], RT_Property_v1]]:
+        return self.find_properties(hash_jenkins(name)[0])
+    
+    def find_containers_by_name(self, name: str) -> List[Tuple[Tuple[int, ...], RT_Container_v1]]:
+        return self.find_containers(hash_jenkins(name)[0])
+    
     # io
+    def load(self):
+        """ Safe deserialize. A lazy load keeps the file mapped, call 'close' once done with the tree. """
+        if not self.lazy:
+            super().load()
+            return
+        
+        if self.header is None:
+            self.get_header()
+        self.close()
+        self.source = MappedBinaryFile.from_path(self.get_file_path())
+        self.source.seek(self.header.length)
+        self.deserialize(file=self.source)
+    
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+    
     def load_converted(self, **kwargs):
         if self.file_path == "" or self.file_name == "" or self.extension == "":
             raise ValueError(f"Load XML failed, missing file details.")
@@ -70,16 +119,25 @@ class RTPC_v1(SharedFile):
     def deserialize(self, **kwargs):
         """ Recursive containers deserialize each other. """
         f: BinaryFile = kwargs.get("file")
-        c = None
-        if os.path.exists(self.db):
-            conn = sql.connect(self.db)
-            c = conn.cursor()
-        else:
-            try:
-                raise FileDoesNotExist(self.db, message="Database path does not exist")
-            except FileDoesNotExist:
-                pass
-        self.container.deserialize(f, c)
+        self.dehash = kwargs.get("dehash", self.dehash)
+        # Names are resolved in bulk from the unique hashes, only once they are needed
+        self.hashes = set()
+        if self.lazy:
+            self.container = RT_LazyContainer_v1(f, self.hashes)
+        self.container.deserialize(f, self.hashes)
+        self.names_resolved = False
+    
+    def resolve_names(self):
+        """ Dehash every unique hash of the file with a single bulk lookup. """
+        if isinstance(self.container, RT_LazyContainer_v1):
+            # Every hash has to be collected first
+            self.container.decode()
+        dehash: Optional[DehashSource] = self.dehash
+        if dehash is None:
+            dehash = get_dictionary(self.db, len(self.hashes))
+        if dehash is not None:
+            self.container.apply_names(dehash.lookup_many(self.hashes))
+        self.names_resolved = True
     
     def export(self, **kwargs):
         file_path: str = kwargs.get("file_path", "")
@@ -87,15 +145,18 @@ class RTPC_v1(SharedFile):
             file_path = f"{self.get_file_path_short()}.xml"
         else:
             file_path = os.path.abspath(file_path)
-        rtpc = et.Element('rtpc')
-        rtpc.attrib['extension'] = self.extension
-        rtpc.attrib['version'] = str(self.header.version)
+        if not self.names_resolved:
+            self.resolve_names()
         self.sort()
-        rtpc.append(self.container.export())
-        utils.indent(rtpc)
         
-        root = et.ElementTree(rtpc)
-        root.write(file_path, encoding='utf-8', xml_declaration=True)
+        # Streamed while walking the tree, same output as building the Elements and indenting them
+        with XMLWriter.open(file_path) as w:
+            w.declaration()
+            w.start(self.XML_TAG, (("extension", self.extension), ("version", str(self.header.version))))
+            w.indent(1)
+            self.container.export_stream(w, 1)
+            w.end(self.XML_TAG, 0)
+            w.indent(0)
     
     def import_(self, **kwargs):
         root = kwargs.get("root")
@@ -111,8 +172,15 @@ class RTPC_v1(SharedFile):
         file_name: str = kwargs.get("file_name", "")
         if file_name != "":
             self.file_name = file_name
-        file_path = self.get_file_path()
-        with BinaryFile(open(file_path, 'wb')) as f:
-            self.header.serialize(f)
-            self.container.serialize_header(f)
-            self.container.serialize(f)
+        stream = kwargs.get("stream")
+        
+        # Every offset is planned up front, the file is then emitted into one buffer and written once
+        layout: RT_Layout_v1 = RT_Layout_v1(self.container, self.header.length)
+        f: BinaryBuilder = BinaryBuilder(layout.size)
+        self.header.serialize(f)
+        layout.emit(f)
+        if stream is not None:
+            f.flush(stream)
+            return
+        with open(self.get_file_path(), 'wb') as file:
+            f.flush(file)
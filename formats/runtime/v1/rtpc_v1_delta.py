@@ -0,0 +1,324 @@
+"""
+Runtime Container v1 structural diff
+
+Two trees are aligned by name_hash with dict indexes, every container and property is visited once.
+Duplicate hashes among siblings are told apart by their occurrence, so the n-th 'A' pairs with the n-th 'A'.
+The resulting delta is JSON and applies back onto a parsed tree of the base file.
+"""
+
+
+# imports
+import argparse as ap
+import json
+import os.path
+from typing import Dict, List, Tuple, Optional, Any, Iterator
+
+from files.file import MappedBinaryFile, get_struct
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, RT_Property_v1, RT_MetaType_v1, \
+    RT_v1_String_MetaType, to_name_hash
+from misc import utils as u
+
+
+# settings
+DELTA_VERSION: int = 1
+
+# Key of a node among its siblings, (name_hash, occurrence)
+Key = Tuple[int, int]
+
+
+# functions
+def index_keys(nodes: List) -> Dict[Key, Any]:
+    """ (name_hash, occurrence) -> node, in sibling order. """
+    counts: Dict[int, int] = {}
+    index: Dict[Key, Any] = {}
+    for node in nodes:
+        name_hash: int = to_name_hash(node.name_hash)
+        occurrence: int = counts.get(name_hash, 0)
+        counts[name_hash] = occurrence + 1
+        index[(name_hash, occurrence)] = node
+    return index
+
+
+def format_key(key: Key) -> str:
+    """ XML-style hash, with ':n' for the n-th repeat of a hash among its siblings. """
+    name_hash, occurrence = key
+    text: str = u.safe_hex(name_hash, fmt='i')
+    return f"{text}:{occurrence}" if occurrence > 0 else text
+
+
+def parse_key(text: str) -> Key:
+    name_hash, _, occurrence = text.partition(":")
+    return to_name_hash(name_hash), int(occurrence or 0)
+
+
+def encode_value(prop: RT_Property_v1) -> bytes:
+    """ The exact binary value, the XML text of a float is rounded. """
+    if prop.type == RT_MetaType_v1.Unassigned:
+        return b""
+    elif prop.type == RT_MetaType_v1.UInteger32:
+        return get_struct("<I").pack(int(prop.value))
+    elif prop.type == RT_MetaType_v1.Float32:
+        return get_struct("<f").pack(float(prop.value))
+    return prop.serialize_deferred()
+
+
+def is_same(a: RT_Property_v1, b: RT_Property_v1) -> bool:
+    if a.type != b.type:
+        return False
+    # Values are compared as bytes only when they differ as objects, NaN is not equal to itself
+    return a.value == b.value or encode_value(a) == encode_value(b)
+
+
+def is_same_order(a: List, b: List, compare_values: bool = False) -> bool:
+    """ Same hashes in the same order, and optionally the same values. Pairs by position are then pairs by key. """
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if x.name_hash != y.name_hash:
+            return False
+        if compare_values and not is_same(x, y):
+            return False
+    return True
+
+
+def format_path(chain: Tuple[RT_Container_v1, ...]) -> List[str]:
+    """ Keys from the root down to the last container of the chain. """
+    path: List[str] = []
+    for parent, child in zip(chain, chain[1:]):
+        name_hash: int = to_name_hash(child.name_hash)
+        occurrence: int = 0
+        for sibling in parent.containers:
+            if sibling is child:
+                break
+            if to_name_hash(sibling.name_hash) == name_hash:
+                occurrence += 1
+        path.append(format_key((name_hash, occurrence)))
+    return path
+
+
+def encode_property(prop: RT_Property_v1) -> Dict[str, str]:
+    return {"hash": u.safe_hex(to_name_hash(prop.name_hash), fmt='i'), "type": prop.get_type_str(),
+            "data": encode_value(prop).hex()}
+
+
+def decode_property(data: Dict[str, str]) -> RT_Property_v1:
+    meta_type: RT_MetaType_v1 = RT_v1_String_MetaType[data["type"]]
+    value: bytes = bytes.fromhex(data["data"])
+    prop: RT_Property_v1 = RT_Property_v1(u.safe_dehex(data["hash"], fmt='i'), 0, meta_type)
+    if meta_type == RT_MetaType_v1.UInteger32:
+        prop.value = prop.raw_data = get_struct("<I").unpack(value)[0]
+    elif meta_type == RT_MetaType_v1.Float32:
+        prop.raw_data = get_struct("<I").unpack(value)[0]
+        prop.value = get_struct("<f").unpack(value)[0]
+    elif meta_type != RT_MetaType_v1.Unassigned:
+        prop.load_deferred(MappedBinaryFile(value))
+    return prop
+
+
+def encode_container(container: RT_Container_v1) -> Dict[str, Any]:
+    return {
+        "hash": u.safe_hex(to_name_hash(container.name_hash), fmt='i'),
+        "properties": [encode_property(prop) for prop in container.properties],
+        "containers": [encode_container(child) for child in container.containers],
+    }
+
+
+def decode_container(data: Dict[str, Any]) -> RT_Container_v1:
+    container: RT_Container_v1 = RT_Container_v1()
+    container.name_hash = u.safe_dehex(data["hash"], fmt='i')
+    container.properties = [decode_property(prop) for prop in data["properties"]]
+    container.containers = [decode_container(child) for child in data["containers"]]
+    container.property_count = len(container.properties)
+    container.instance_count = len(container.containers)
+    return container
+
+
+# class
+class RT_Delta_v1:
+    """
+    Operations turning a base tree into a patched one. Each holds the path of keys to the container it edits:
+        add_property     {"path", "property"}
+        remove_property  {"path", "key"}
+        change_property  {"path", "key", "property"}
+        add_container    {"path", "container"}
+        remove_container {"path", "key"}
+    Properties carry their exact binary value in hex. Added nodes go after their siblings.
+    """
+    __slots__ = ("ops",)
+    
+    def __init__(self, ops: Optional[List[Dict[str, Any]]] = None):
+        self.ops: List[Dict[str, Any]] = ops if ops is not None else []
+    
+    def __str__(self):
+        counts: Dict[str, int] = {}
+        for op in self.ops:
+            counts[op["op"]] = counts.get(op["op"], 0) + 1
+        return f"RT_Delta_v1: {', '.join(f'{count} {op}' for op, count in sorted(counts.items())) or 'no changes'}"
+    
+    def __len__(self):
+        return len(self.ops)
+    
+    @classmethod
+    def diff(cls, base: RT_Container_v1, patch: RT_Container_v1):
+        """
+        Both roots are compared whatever their own hash, containers are visited in file order.
+        Siblings still in the same order are paired by position, hashes are only indexed where they moved.
+        """
+        ops: List[Dict[str, Any]] = []
+        # Chain of base containers from the root, paths are only formatted for the containers that changed
+        stack: List[Tuple[Tuple[RT_Container_v1, ...], RT_Container_v1, RT_Container_v1]] = [((base,), base, patch)]
+        while len(stack) > 0:
+            chain, a, b = stack.pop()
+            path: List[str] = []
+            if not is_same_order(a.properties, b.properties, True):
+                path = format_path(chain)
+                a_properties: Dict[Key, RT_Property_v1] = index_keys(a.properties)
+                b_properties: Dict[Key, RT_Property_v1] = index_keys(b.properties)
+                for key, prop in a_properties.items():
+                    other: Optional[RT_Property_v1] = b_properties.get(key)
+                    if other is None:
+                        ops.append({"op": "remove_property", "path": path, "key": format_key(key)})
+                    elif not is_same(prop, other):
+                        ops.append({"op": "change_property", "path": path, "key": format_key(key),
+                                    "property": encode_property(other)})
+                for key, prop in b_properties.items():
+                    if key not in a_properties:
+                        ops.append({"op": "add_property", "path": path, "property": encode_property(prop)})
+            
+            if is_same_order(a.containers, b.containers):
+                matched: List[Tuple[RT_Container_v1, RT_Container_v1]] = list(zip(a.containers, b.containers))
+            else:
+                path = path or format_path(chain)
+                a_containers: Dict[Key, RT_Container_v1] = index_keys(a.containers)
+                b_containers: Dict[Key, RT_Container_v1] = index_keys(b.containers)
+                matched: List[Tuple[RT_Container_v1, RT_Container_v1]] = []
+                for key, container in a_containers.items():
+                    other: Optional[RT_Container_v1] = b_containers.get(key)
+                    if other is None:
+                        ops.append({"op": "remove_container", "path": path, "key": format_key(key)})
+                    else:
+                        matched.append((container, other))
+                for key, container in b_containers.items():
+                    if key not in a_containers:
+                        ops.append({"op": "add_container", "path": path, "container": encode_container(container)})
+            # Reversed so the first child is popped first
+            stack.extend((chain + (container,), container, other) for container, other in reversed(matched))
+        
+        return cls(ops)
+    
+    def apply(self, root: RT_Container_v1):
+        """
+        Apply onto the base tree in place.
+        Every path and key is resolved before anything is edited, occurrences refer to the base tree.
+        """
+        properties: Dict[int, Dict[Key, RT_Property_v1]] = {}
+        children: Dict[int, Dict[Key, RT_Container_v1]] = {}
+        
+        def get_properties(container: RT_Container_v1) -> Dict[Key, RT_Property_v1]:
+            if id(container) not in properties:
+                properties[id(container)] = index_keys(container.properties)
+            return properties[id(container)]
+        
+        def get_children(container: RT_Container_v1) -> Dict[Key, RT_Container_v1]:
+            if id(container) not in children:
+                children[id(container)] = index_keys(container.containers)
+            return children[id(container)]
+        
+        def resolve(path: List[str]) -> RT_Container_v1:
+            container: RT_Container_v1 = root
+            for text in path:
+                child: Optional[RT_Container_v1] = get_children(container).get(parse_key(text))
+                if child is None:
+                    raise ValueError(f"Delta path not found: '{'/'.join(path)}'")
+                container = child
+            return container
+        
+        edits: List[Tuple[str, RT_Container_v1, Any, Dict[str, Any]]] = []
+        for op in self.ops:
+            container: RT_Container_v1 = resolve(op["path"])
+            target: Any = None
+            if op["op"] in ("remove_property", "change_property"):
+                target = get_properties(container).get(parse_key(op["key"]))
+            elif op["op"] == "remove_container":
+                target = get_children(container).get(parse_key(op["key"]))
+            elif op["op"] not in ("add_property", "add_container"):
+                raise ValueError(f"Unknown delta operation: '{op['op']}'")
+            if target is None and "key" in op:
+                raise ValueError(f"Delta key not found: '{'/'.join(op['path'] + [op['key']])}'")
+            edits.append((op["op"], container, target, op))
+        
+        for name, container, target, op in edits:
+            if name == "add_property":
+                container.add_property(decode_property(op["property"]))
+            elif name == "remove_property":
+                container.remove_property(target)
+            elif name == "change_property":
+                prop: RT_Property_v1 = decode_property(op["property"])
+                target.type, target.raw_data, target.value = prop.type, prop.raw_data, prop.value
+            elif name == "add_container":
+                container.add_container(decode_container(op["container"]))
+            elif name == "remove_container":
+                container.remove_container(target)
+    
+    def describe(self) -> Iterator[str]:
+        """ One line per operation, '+' added, '-' removed and '~' changed. """
+        for op in self.ops:
+            name: str = op["op"]
+            if name == "add_property":
+                yield f"+ property {'/'.join(op['path'] + [op['property']['hash']])} ({op['property']['type']})"
+            elif name == "remove_property":
+                yield f"- property {'/'.join(op['path'] + [op['key']])}"
+            elif name == "change_property":
+                yield f"~ property {'/'.join(op['path'] + [op['key']])} ({op['property']['type']})"
+            elif name == "add_container":
+                yield f"+ container {'/'.join(op['path'] + [op['container']['hash']])}"
+            elif name == "remove_container":
+                yield f"- container {'/'.join(op['path'] + [op['key']])}"
+    
+    # io
+    def save(self, file_path: str):
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"version": DELTA_VERSION, "ops": self.ops}, f, separators=(",", ":"))
+    
+    @classmethod
+    def load(cls, file_path: str):
+        with open(file_path, "r", encoding="utf-8") as f:
+            data: Dict[str, Any] = json.load(f)
+        if data.get("version") != DELTA_VERSION:
+            raise ValueError(f"Unsupported delta version: {data.get('version')} vs {DELTA_VERSION}")
+        return cls(data["ops"])
+
+
+# main
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Diff two RTPC files, or apply a delta to one")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    diff_parser = subparsers.add_parser("diff", help="write the delta from 'base' to 'patch'")
+    diff_parser.add_argument("base", type=str)
+    diff_parser.add_argument("patch", type=str)
+    diff_parser.add_argument("--out", type=str, default="", help="delta file, defaults to '<patch>.delta.json'")
+    diff_parser.add_argument("--list", action="store_true", help="print every added, removed and changed node")
+    apply_parser = subparsers.add_parser("apply", help="apply a delta to 'base'")
+    apply_parser.add_argument("base", type=str)
+    apply_parser.add_argument("delta", type=str)
+    apply_parser.add_argument("--out", type=str, required=True, help="patched RTPC file")
+    args = parser.parse_args()
+    
+    base_file: RTPC_v1 = RTPC_v1(args.base, "-")
+    base_file.load()
+    if args.command == "diff":
+        patch_file: RTPC_v1 = RTPC_v1(args.patch, "-")
+        patch_file.load()
+        delta: RT_Delta_v1 = RT_Delta_v1.diff(base_file.container, patch_file.container)
+        if args.list:
+            for line in delta.describe():
+                print(line)
+        delta.save(args.out or f"{os.path.abspath(args.patch)}.delta.json")
+        print(delta)
+    else:
+        delta: RT_Delta_v1 = RT_Delta_v1.load(args.delta)
+        delta.apply(base_file.container)
+        with open(args.out, "wb") as out:
+            base_file.serialize(stream=out)
+        print(f"{delta} applied to '{args.out}'")
@@ -0,0 +1,276 @@
+"""
+Runtime Container v1 in-place patching
+"""
+
+
+# imports
+import argparse as ap
+import io
+import mmap
+import os.path
+from typing import Dict, List, Tuple, Union, Any, Optional, Sequence
+
+from files.file import BinaryBuilder, MappedBinaryFile
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_delta import RT_Delta_v1, Key, parse_key, encode_value, decode_property
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, RT_Property_v1, RT_MetaType_v1, to_name_hash
+from misc import utils as u
+
+
+# settings
+# Container header of the root, right after the file header
+ROOT_OFFSET: int = 8
+
+# A step of a path, a hash, an 'HASH:n' key as in deltas or a (hash, occurrence) key
+Step = Union[int, str, Key]
+
+
+# functions
+def to_key(step: Step) -> Key:
+    if isinstance(step, tuple):
+        return to_name_hash(step[0]), step[1]
+    elif isinstance(step, str):
+        return parse_key(step)
+    return to_name_hash(step), 0
+
+
+def index_headers(headers: Sequence[tuple]) -> Dict[Key, int]:
+    """ (name_hash, occurrence) -> position of the header, name_hash being its first field. """
+    counts: Dict[int, int] = {}
+    index: Dict[Key, int] = {}
+    for i, header in enumerate(headers):
+        occurrence: int = counts.get(header[0], 0)
+        counts[header[0]] = occurrence + 1
+        index[(header[0], occurrence)] = i
+    return index
+
+
+def is_deferred(prop: RT_Property_v1) -> bool:
+    return not prop.is_simple() and prop.type != RT_MetaType_v1.Unassigned
+
+
+# class
+class RT_Patcher_v1:
+    """
+    Edits property values of an RTPC file on disk, without decoding the tree or rewriting the file.
+    Containers and properties are found by key paths from the root, through their headers alone,
+    every container's headers are indexed once so many edits of the same file stay cheap.
+    
+    Values that keep their encoded size are overwritten in place on the mapped file: uint32, f32, vectors,
+    matrices, object ids and arrays, events or strings of the same length. Any other value is appended past
+    the end of the file and its header repointed, the old bytes are left unused. An appended value is reused
+    by later edits of the same property as long as the new value fits in it.
+    A deferred value shared by several properties is never overwritten, the edited property gets an appended copy.
+    
+    Unused bytes are reclaimed by 'compact', which rewrites the whole file through RT_Layout_v1.
+    """
+    __slots__ = ("file_path", "file", "map", "size", "tail", "allocations", "root", "children", "properties",
+                 "references", "in_place", "appended")
+    
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        self.file = open(file_path, "r+b")
+        self.map: mmap.mmap = mmap.mmap(self.file.fileno(), 0)
+        if self.map[:4] != b"RTPC":
+            self.close()
+            raise ValueError(f"Not an RTPC file: '{file_path}'")
+        self.size: int = len(self.map)
+        # Appended values, written once the patcher is closed
+        self.tail: BinaryBuilder = BinaryBuilder()
+        # Offset -> size of every value appended to the tail
+        self.allocations: Dict[int, int] = {}
+        self.root: tuple = RT_Container_v1.HEADER.unpack(self.map, ROOT_OFFSET)
+        # (data_offset, property_count, instance_count) -> (headers, key index), for the sub-containers and the
+        # properties of a container. An empty container's data_offset is the next container's, so it takes the counts
+        self.children: Dict[tuple, Tuple[List[tuple], Dict[Key, int]]] = {}
+        self.properties: Dict[tuple, Tuple[List[tuple], Dict[Key, int]]] = {}
+        # Deferred value offset -> number of properties pointing at it, counted on first use
+        self.references: Optional[Dict[int, int]] = None
+        self.in_place: int = 0
+        self.appended: int = 0
+    
+    def __str__(self):
+        return f"RT_Patcher_v1: {self.in_place} values patched in place, {self.appended} appended"
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, t, value, traceback):
+        self.close()
+    
+    def close(self):
+        """ Flush the mapped edits, then append the values that did not fit. """
+        if self.map is None:
+            return
+        self.map.flush()
+        self.map.close()
+        self.map = None
+        if len(self.tail) > 0:
+            self.file.seek(self.size)
+            self.tail.flush(self.file)
+        self.file.close()
+    
+    def compact(self) -> int:
+        """
+        Close the patcher and rewrite the file from its tree, dropping every unused value.
+        Returns the number of bytes reclaimed.
+        """
+        self.close()
+        rtpc: RTPC_v1 = RTPC_v1(self.file_path, "-")
+        rtpc.load()
+        stream = io.BytesIO()
+        rtpc.serialize(stream=stream)
+        size: int = os.path.getsize(self.file_path)
+        with open(self.file_path, "wb") as f:
+            f.write(stream.getbuffer())
+        return size - stream.tell()
+    
+    # find
+    def find_container(self, path: Sequence[Step]) -> tuple:
+        """ Container header at the end of a path of container keys below the root. """
+        header: tuple = self.root
+        for step in path:
+            headers, index = self.get_children(header)
+            position: Optional[int] = index.get(to_key(step))
+            if position is None:
+                raise ValueError(f"Container not found: {step} in '{'/'.join(map(str, path))}'")
+            header = headers[position]
+        return header
+    
+    def get_children(self, header: tuple) -> Tuple[List[tuple], Dict[Key, int]]:
+        _, data_offset, property_count, instance_count = header
+        key: tuple = header[1:]
+        if key not in self.children:
+            offset: int = data_offset + property_count * RT_Property_v1.HEADER.size
+            offset += u.align(offset)
+            size: int = instance_count * RT_Container_v1.HEADER.size
+            headers: List[tuple] = list(RT_Container_v1.HEADER.iter_unpack(self.map[offset:offset + size]))
+            self.children[key] = (headers, index_headers(headers))
+        return self.children[key]
+    
+    def get_properties(self, header: tuple) -> Tuple[List[tuple], Dict[Key, int]]:
+        _, data_offset, property_count, _ = header
+        key: tuple = header[1:]
+        if key not in self.properties:
+            size: int = property_count * RT_Property_v1.HEADER.size
+            headers: List[tuple] = list(RT_Property_v1.HEADER.iter_unpack(self.map[data_offset:data_offset + size]))
+            self.properties[key] = (headers, index_headers(headers))
+        return self.properties[key]
+    
+    def find_property(self, path: Sequence[Step], step: Step) -> int:
+        """ Offset of the header of a property, by the path of its container and its own key. """
+        header: tuple = self.find_container(path)
+        position: Optional[int] = self.get_properties(header)[1].get(to_key(step))
+        if position is None:
+            raise ValueError(f"Property not found: {step} in '{'/'.join(map(str, path))}'")
+        return header[1] + position * RT_Property_v1.HEADER.size
+    
+    def get_references(self) -> Dict[int, int]:
+        """ Deferred value offset -> number of properties pointing at it, indexing the headers of the whole file. """
+        if self.references is None:
+            self.references = {}
+            stack: List[tuple] = [self.root]
+            while len(stack) > 0:
+                header: tuple = stack.pop()
+                for _, raw_data, meta_type in self.get_properties(header)[0]:
+                    if meta_type not in RT_Property_v1.SIMPLE_HEADERS and meta_type != RT_MetaType_v1.Unassigned:
+                        self.references[raw_data] = self.references.get(raw_data, 0) + 1
+                stack.extend(self.get_children(header)[0])
+        return self.references
+    
+    def release(self, prop: RT_Property_v1):
+        """ A property no longer points at its deferred value. """
+        if is_deferred(prop):
+            self.references[prop.raw_data] -= 1
+    
+    # values
+    def read_property(self, header_offset: int) -> RT_Property_v1:
+        name_hash, raw_data, meta_type = RT_Property_v1.HEADER.unpack(self.map, header_offset)
+        prop: RT_Property_v1 = RT_Property_v1(name_hash, raw_data, RT_MetaType_v1(meta_type))
+        if prop.type == RT_MetaType_v1.UInteger32:
+            prop.value = raw_data
+        elif prop.type == RT_MetaType_v1.Float32:
+            prop.value = RT_Property_v1.SIMPLE_HEADERS[prop.type].unpack(self.map, header_offset)[1]
+        elif prop.type != RT_MetaType_v1.Unassigned:
+            if raw_data < self.size:
+                f: MappedBinaryFile = MappedBinaryFile(self.map)
+                f.seek(raw_data)
+                prop.load_deferred(f)
+            else:
+                # Read through a view of the tail, released right away as it cannot grow while one is exported
+                with MappedBinaryFile(self.tail.buffer) as f:
+                    f.seek(raw_data - self.size)
+                    prop.load_deferred(f)
+        return prop
+    
+    def get(self, path: Sequence[Step], step: Step) -> Any:
+        return self.read_property(self.find_property(path, step)).value
+    
+    def set(self, path: Sequence[Step], step: Step, value: Any, meta_type: Optional[RT_MetaType_v1] = None):
+        """ Set the value of a property, of a new type if 'meta_type' is given. """
+        header_offset: int = self.find_property(path, step)
+        old: RT_Property_v1 = self.read_property(header_offset)
+        new: RT_Property_v1 = RT_Property_v1(old.name_hash, 0, old.type if meta_type is None else meta_type, value)
+        data: bytes = encode_value(new)
+        if is_deferred(old) or is_deferred(new):
+            # Counted before any header is repointed, the indexed headers are not updated by edits
+            self.get_references()
+        
+        type_slot = RT_Property_v1.HEADER.slot("type", header_offset)
+        raw_slot = RT_Property_v1.HEADER.slot("raw_data", header_offset)
+        if new.is_simple() or new.type == RT_MetaType_v1.Unassigned:
+            # The value is the raw field itself, none for an unassigned property
+            self.map[raw_slot.offset:raw_slot.offset + raw_slot.struct.size] = data.ljust(raw_slot.struct.size, b"\00")
+            type_slot.struct.pack_into(self.map, type_slot.offset, new.type)
+            self.release(old)
+            self.in_place += 1
+        elif new.type == old.type and len(data) == len(encode_value(old)) and self.references[old.raw_data] == 1:
+            self.write(old.raw_data, data)
+            self.in_place += 1
+        elif len(data) <= self.allocations.get(old.raw_data, 0):
+            # Appended earlier by this patcher, nothing else points at it
+            self.write(old.raw_data, data)
+            type_slot.struct.pack_into(self.map, type_slot.offset, new.type)
+            self.in_place += 1
+        else:
+            self.tail.write(b"P" * u.align(self.size + len(self.tail)))
+            offset: int = self.size + len(self.tail)
+            raw_slot.struct.pack_into(self.map, raw_slot.offset, offset)
+            type_slot.struct.pack_into(self.map, type_slot.offset, new.type)
+            self.tail.write(data)
+            self.allocations[offset] = len(data)
+            self.release(old)
+            self.references[offset] = 1
+            self.appended += 1
+    
+    def write(self, offset: int, data: bytes):
+        if offset < self.size:
+            self.map[offset:offset + len(data)] = data
+        else:
+            self.tail.seek(offset - self.size)
+            self.tail.write(data)
+            self.tail.seek(len(self.tail))
+    
+    def apply(self, delta: RT_Delta_v1):
+        """ Apply the property changes of a delta. Structural changes need the tree, see RT_Delta_v1.apply. """
+        for op in delta.ops:
+            if op["op"] != "change_property":
+                raise ValueError(f"'{op['op']}' cannot be patched in place, apply the delta to a loaded tree")
+        for op in delta.ops:
+            prop: RT_Property_v1 = decode_property(op["property"])
+            self.set(op["path"], op["key"], prop.value, prop.type)
+
+
+# main
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Apply the property changes of a delta to an RTPC file in place")
+    parser.add_argument("rtpc", type=str)
+    parser.add_argument("delta", type=str, help="delta written by rtpc_v1_delta")
+    parser.add_argument("--compact", action="store_true", help="rewrite the file afterwards to drop unused values")
+    args = parser.parse_args()
+    
+    with RT_Patcher_v1(args.rtpc) as patcher:
+        patcher.apply(RT_Delta_v1.load(args.delta))
+        print(patcher)
+        if args.compact:
+            print(f"Compacted, {patcher.compact()} bytes reclaimed")
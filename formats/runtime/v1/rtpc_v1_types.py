@@ -5,12 +5,22 @@ Runtime Container v1 types
 
 # imports
 import struct
-from typing import Dict, Optional, List, Any
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Optional, List, Any, Set, Tuple, Union
 from enum import IntEnum
 import xml.etree.ElementTree as et
 
-from files.file import SharedHeader, BinaryFile
+from files.file import SharedHeader, BinaryFile, get_struct
+from files.record import Record
+from files.xml_writer import XMLWriter
 from misc import utils as u
+from misc.hash_functions import hash_jenkins, to_signed
+
+
+# settings
+COALESCE_SIZE: int = 1 << 20  # Most bytes read at once while sweeping deferred values
 
 
 # enums
@@ -33,7 +43,60 @@ class RT_MetaType_v1(IntEnum):
     Total = 15
 
 
+# functions
+def to_name_hash(name_hash: Union[int, str]) -> int:
+    """ Signed int32 form of a hash, either an int or the XML hex string kept by imported containers. """
+    if isinstance(name_hash, str):
+        return u.safe_dehex(name_hash, fmt='i')
+    return to_signed(name_hash & 0xffffffff)
+
+
+def index_nodes(nodes: List) -> Dict[int, Any]:
+    """ name_hash -> node, the first node wins like the linear search it replaces. """
+    index: Dict[int, Any] = {}
+    for node in nodes:
+        index.setdefault(to_name_hash(node.name_hash), node)
+    return index
+
+
+def load_deferred(f: BinaryFile, properties: List, block_offsets: Optional[List[int]] = None):
+    """
+    Read the deferred values of 'properties' in one forward sweep, ordered by offset.
+    A value never crosses the start of a container block, so the sorted 'block_offsets' bound each read:
+    values up to COALESCE_SIZE bytes apart are read in one go instead of one seek and read each.
+    Without them every value is read from 'f' directly.
+    """
+    properties = sorted(properties, key=lambda x: x.raw_data)
+    if block_offsets is None:
+        for prop in properties:
+            f.seek(prop.raw_data)
+            prop.load_deferred(f)
+        return
+    
+    offsets: List[int] = [prop.raw_data for prop in properties]
+    i: int = 0
+    while i < len(properties):
+        start: int = offsets[i]
+        # Bound the read by the furthest block start within reach, at least the next one
+        first: int = bisect_right(block_offsets, start)
+        last: int = max(bisect_right(block_offsets, start + COALESCE_SIZE) - 1, first)
+        if last < len(block_offsets):
+            end: int = block_offsets[last]
+            j: int = bisect_left(offsets, end, i)
+        else:
+            end: int = -1
+            j: int = len(properties)
+        
+        window, base = f.window(start, end - start if end >= 0 else -1)
+        for prop in properties[i:j]:
+            window.seek(prop.raw_data - base)
+            prop.load_deferred(window)
+        i = j
+
+
 # dicts
+META_TYPES: Tuple[RT_MetaType_v1, ...] = tuple(RT_MetaType_v1)
+
 RT_v1_MetaType_String: Dict = {
     RT_MetaType_v1.Unassigned: 'none',
     RT_MetaType_v1.UInteger32: 'uint32',
@@ -53,6 +116,11 @@ RT_v1_MetaType_String: Dict = {
     RT_MetaType_v1.Total: 'total',
 }
 RT_v1_String_MetaType: Dict = { value: key for key, value in RT_v1_MetaType_String.items() }
+RT_v1_MetaType_Typecode: Dict = {
+    RT_MetaType_v1.Float32Array: 'f',
+    RT_MetaType_v1.UInteger32Array: 'I',
+    RT_MetaType_v1.ByteArray: 'B',
+}
 
 
 # class
@@ -86,19 +154,28 @@ class RT_Property_v1:
     Complex type content
     1) Property data
     """
-    def __init__(self):
+    __slots__ = ("name", "name_hash", "data_offset", "raw_data", "type", "value")
+    
+    HEADER: Record = Record(("name_hash", "i"), ("raw_data", "I"), ("type", "B"))
+    SIMPLE_HEADERS: Dict = {
+        RT_MetaType_v1.UInteger32: Record(("name_hash", "i"), ("value", "I"), ("type", "B")),
+        RT_MetaType_v1.Float32: Record(("name_hash", "i"), ("value", "f"), ("type", "B")),
+    }
+    
+    def __init__(self, name_hash: int = 0, raw_data: Any = None, meta_type: RT_MetaType_v1 = RT_MetaType_v1.Unassigned,
+                 value: Any = None):
         self.name: str = ''
-        self.name_hash: int = 0
+        self.name_hash: int = name_hash
         self.data_offset: int = 0
-        self.raw_data: Any = None
-        self.type: RT_MetaType_v1 = RT_MetaType_v1.Unassigned
-        self.value: Any = None
-        
-        self.simple_type: bool = False
-        self.base_pos: int = 0
+        self.raw_data: Any = raw_data
+        self.type: RT_MetaType_v1 = meta_type
+        self.value: Any = value
     
     def get_type_str(self) -> str:
         return RT_v1_MetaType_String[self.type]
+    
+    def apply_names(self, names: Dict[int, str]):
+        self.name = names.get(self.name_hash, "")
 
     def deserialize_complex_array(self, f: BinaryFile):
         """ Complex array deserialize. """
@@ -131,13 +208,12 @@ class RT_Property_v1:
                 for y in x.split(","):
                     self.value.append(float(y))
         elif self.type in [RT_MetaType_v1.UInteger32Array, RT_MetaType_v1.Float32Array]:
+            self.value = array(RT_v1_MetaType_Typecode[self.type])
             if raw_data != "":
                 py_type_func = float if self.type == RT_MetaType_v1.Float32Array else int
-                self.value = [ py_type_func(number) for number in raw_data.split(",") ]
-            else:
-                self.value = []
+                self.value.extend(map(py_type_func, raw_data.split(",")))
         elif self.type == RT_MetaType_v1.ByteArray:
-            self.value = [ single_byte.encode("utf-8") for single_byte in raw_data.split(",") ]
+            self.value = array('B', bytes.fromhex(raw_data.replace(",", "")))
         elif self.type == RT_MetaType_v1.Event:
             self.value = []
             if len(raw_data) > 0:
@@ -149,53 +225,47 @@ class RT_Property_v1:
             raise ValueError("RT_MetaType_v1 not found.")
 
     # io
-    def deserialize(self, f: BinaryFile, db_cursor=None):
-        self.name_hash = f.read_s32()
-        if db_cursor is not None:
-            db_cursor.execute(f"SELECT value FROM properties WHERE hash = {self.name_hash}")
-            value = db_cursor.fetchone()
-            if value is not None:
-                self.name = value[0]
-        self.raw_data = f.read_u32()
-        self.type = RT_MetaType_v1(f.read_u8())
+    def deserialize(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        header = self.HEADER.read(f)
+        original_position = f.tell()
+        self.load(f, header, hashes)
+        f.seek(original_position)
+    
+    def load(self, f: BinaryFile, header: tuple, hashes: Optional[Set[int]] = None):
+        """ Load from an already decoded header. Deferred values move the file position. """
+        self.name_hash, self.raw_data, meta_type = header
+        if hashes is not None:
+            hashes.add(self.name_hash)
+        self.type = RT_MetaType_v1(meta_type)
         
         # Base data types
         # Simple types
         if self.type in [RT_MetaType_v1.Unassigned, RT_MetaType_v1.UInteger32, RT_MetaType_v1.Float32]:
             if self.type == RT_MetaType_v1.Unassigned:
                 return None
-            self.raw_data = struct.pack('I', self.raw_data)
+            # The raw u32 is kept as an int, only floats need reinterpreting
             if self.type == RT_MetaType_v1.UInteger32:
-                fmt = 'I'
-            elif self.type == RT_MetaType_v1.Float32:
-                fmt = 'f'
+                self.value = self.raw_data
             else:
-                raise KeyError("RT_MetaType_v1 not found.")
-            self.value = struct.unpack(fmt, self.raw_data)[0]
+                self.value = struct.unpack('f', struct.pack('I', self.raw_data))[0]
             return None
         
         # Deferred/pointer types
-        original_position = f.tell()
         f.seek(self.raw_data)
+        self.load_deferred(f)
+    
+    def load_deferred(self, f: BinaryFile):
+        """ Read the deferred value at the cursor. """
         if self.type == RT_MetaType_v1.String:
-            self.value = f.read_strz()
+            self.value = f.read_strz(intern=True)
         elif self.type == RT_MetaType_v1.ObjectID:
             self.value = f.read_u64()
         elif self.type in [RT_MetaType_v1.Vec2, RT_MetaType_v1.Vec3, RT_MetaType_v1.Vec4,
                            RT_MetaType_v1.Mat3x3, RT_MetaType_v1.Mat4x4]:
             self.deserialize_complex_array(f)
-        elif self.type in [RT_MetaType_v1.UInteger32Array, RT_MetaType_v1.Float32Array]:
-            count = f.read_u32()
-            type_func = f.read_u32 if self.type == RT_MetaType_v1.UInteger32 else f.read_f32
-            if count > 0:
-                self.value = [type_func(count)] if count == 1 else list(type_func(count))
-        elif self.type == RT_MetaType_v1.ByteArray:
+        elif self.type in [RT_MetaType_v1.UInteger32Array, RT_MetaType_v1.Float32Array, RT_MetaType_v1.ByteArray]:
             count = f.read_u32()
-            if count > 0:
-                self.value = []
-                if count > 1:
-                    self.value.extend(f.read_u8(count))
-        # self.value = list(map(safe_hex, self.value, ['B' for _ in range(count)]))
+            self.value = f.read_array(RT_v1_MetaType_Typecode[self.type], count)
         elif self.type == RT_MetaType_v1.Event:
             count = f.read_u32()
             self.value = []
@@ -203,30 +273,32 @@ class RT_Property_v1:
                 self.value.append(f.read_u32(2))
         else:
             raise ValueError("RT_MetaType_v1 not found.")
-        f.seek(original_position)
     
     def export(self):
-        elem = et.Element('property')
-        elem.attrib['hash'] = u.safe_hex(self.name_hash, fmt='i')
-        elem.attrib['type'] = f"{self.get_type_str()}"
-        elem.attrib['name'] = self.name
-        
+        elem = et.Element('property', dict(self.export_attrib()))
+        elem.text = self.export_text()
+        return elem
+    
+    def export_attrib(self) -> Tuple[Tuple[str, str], ...]:
+        return ("hash", u.safe_hex(self.name_hash, fmt='i')), ("type", f"{self.get_type_str()}"), ("name", self.name)
+    
+    def export_text(self) -> Optional[str]:
         if self.value is None:
-            return elem
+            return None
         
         if self.type == RT_MetaType_v1.String:
-            elem.text = self.value.decode('utf-8')
+            return self.value.decode('utf-8')
         elif self.type == RT_MetaType_v1.Float32:
-            elem.text = u.f32_fmt(self.value)
+            return u.f32_fmt(self.value)
         elif self.type in [RT_MetaType_v1.Vec2, RT_MetaType_v1.Vec3, RT_MetaType_v1.Vec4]:
-            elem.text = ",".join(map(u.f32_fmt, self.value))
+            return ",".join(map(u.f32_fmt, self.value))
         elif self.type == RT_MetaType_v1.Mat3x3:
             by_three = [
                 ",".join(map(u.f32_fmt, self.value[:3])),
                 ",".join(map(u.f32_fmt, self.value[3:6])),
                 ",".join(map(u.f32_fmt, self.value[6:]))
             ]
-            elem.text = " ".join(by_three)
+            return " ".join(by_three)
         elif self.type == RT_MetaType_v1.Mat4x4:
             by_four = [
                 ",".join(map(u.f32_fmt, self.value[:4])),
@@ -234,25 +306,25 @@ class RT_Property_v1:
                 ",".join(map(u.f32_fmt, self.value[8:12])),
                 ",".join(map(u.f32_fmt, self.value[12:]))
             ]
-            elem.text = " ".join(by_four)
+            return " ".join(by_four)
         elif self.type in [RT_MetaType_v1.UInteger32Array, RT_MetaType_v1.Float32Array]:
-            elem.text = ",".join(map(str, self.value))
+            return ",".join(map(str, self.value))
         elif self.type == RT_MetaType_v1.ByteArray:
-            mapped = map(u.safe_hex, self.value, ['B' for _ in range(len(self.value))])
-            elem.text = ",".join(list(mapped))
+            return bytes(self.value).hex(",").upper()
         elif self.type == RT_MetaType_v1.ObjectID:
-            elem.text = u.safe_hex(self.value, 'Q', switch=True)
+            return u.safe_hex(self.value, 'Q', switch=True)
         elif self.type == RT_MetaType_v1.Event:
             values = []
             for pair in self.value:
                 fmt_e01, fmt_e02 = u.safe_hex(pair[0]), u.safe_hex(pair[1])
                 values.append(f"{fmt_e01}={fmt_e02}")
-            elem.text = ", ".join(values)
+            return ", ".join(values)
         else:
-            elem.text = f"{self.value}"
-        
-        return elem
-
+            return f"{self.value}"
+    
+    def export_stream(self, w: XMLWriter, level: int = 0):
+        w.leaf("property", self.export_attrib(), self.export_text())
+    
     def import_(self, elem: et.Element):
         self.name = elem.attrib["name"]
         self.name_hash = u.safe_dehex(elem.attrib["hash"], fmt='i')
@@ -264,65 +336,40 @@ class RT_Property_v1:
             raw_data = str(raw_text)
         self.preprocess_data(raw_data)
 
-    def serialize(self, f: BinaryFile):
-        f.write_s32(self.name_hash)
-        if self.type in [RT_MetaType_v1.UInteger32, RT_MetaType_v1.Float32]:
-            self.simple_type = True
-            if self.type == RT_MetaType_v1.UInteger32:
-                f.write_u32(int(self.value))
-            elif self.type == RT_MetaType_v1.Float32:
-                f.write_f32(float(self.value))
-            f.write_u8(self.type)
-            return None
-        
-        self.base_pos = f.tell()
-        f.write(b"FFFF")
-        f.write_u8(self.type)
-        return None
+    def is_simple(self) -> bool:
+        """ Whether the value is stored inline in the header rather than deferred after the container's headers. """
+        return self.type in self.SIMPLE_HEADERS
     
-    def write(self, f: BinaryFile) -> None:
-        """
-        RTPC requires the offset of a complex property that's based on prior complex properties.
-        Naive implementation for now until I have time to work out a better solution.
-        """
-        if self.simple_type:
-            return None
-        deferred_offset: int = f.tell()
-        if self.type == RT_MetaType_v1.Mat4x4:
-            f.write_align(force=True)
-        self.write_deferred(f)
-        new_pos: int = f.tell()
-        f.seek(self.base_pos)
-        f.write_u32(deferred_offset)
-        f.seek(new_pos)
-        
-        if self.type == RT_MetaType_v1.String:
-            f.write_align()
-        
-        return None
+    def serialize(self, f: BinaryFile, deferred_offset: int = 0):
+        """ Write the header, with the inline value or the offset of the already placed deferred value. """
+        f.write(self.pack_header(deferred_offset))
+    
+    def pack_header(self, deferred_offset: int = 0) -> bytes:
+        if self.type in self.SIMPLE_HEADERS:
+            py_type_func = int if self.type == RT_MetaType_v1.UInteger32 else float
+            return self.SIMPLE_HEADERS[self.type].pack(self.name_hash, py_type_func(self.value), self.type)
+        return self.HEADER.pack(self.name_hash, deferred_offset, self.type)
     
-    def write_deferred(self, f: BinaryFile):
+    def serialize_deferred(self) -> bytes:
+        """ The deferred value, without the alignment around it. """
         if self.type == RT_MetaType_v1.String:
-            f.write_strl(str(self.value), delim=True)
+            value = self.value if isinstance(self.value, (bytes, bytearray)) else str(self.value).encode("utf-8")
+            return bytes(value) + b"\00"
         elif self.type == RT_MetaType_v1.ObjectID:
-            f.write_u64(int(self.value))
+            return get_struct("<Q").pack(int(self.value))
         elif self.type in [RT_MetaType_v1.Vec2, RT_MetaType_v1.Vec3, RT_MetaType_v1.Vec4,
                            RT_MetaType_v1.Mat3x3, RT_MetaType_v1.Mat4x4]:
-            f.write_f32(self.value)
-        elif self.type in [RT_MetaType_v1.UInteger32Array, RT_MetaType_v1.Float32Array]:
-            type_func = f.write_f32 if self.type == RT_MetaType_v1.Float32Array else f.write_u32
-            f.write_u32(len(self.value))
-            type_func(self.value)
-        elif self.type == RT_MetaType_v1.ByteArray:
-            f.write_u32(len(self.value))
-            for x in self.value:
-                y = int(x, 16)
-                f.write_u8(y)
+            return get_struct(f"<{len(self.value)}f").pack(*self.value)
+        elif self.type in [RT_MetaType_v1.UInteger32Array, RT_MetaType_v1.Float32Array, RT_MetaType_v1.ByteArray]:
+            typecode: str = RT_v1_MetaType_Typecode[self.type]
+            values = self.value if isinstance(self.value, array) and self.value.typecode == typecode \
+                else array(typecode, self.value)
+            if sys.byteorder != "little":
+                values = array(typecode, values)
+                values.byteswap()
+            return get_struct("<I").pack(len(values)) + values.tobytes()
         elif self.type == RT_MetaType_v1.Event:
-            f.write_u32(len(self.value))
-            for pair in self.value:
-                f.write_u32(pair[0])
-                f.write_u32(pair[1])
+            return get_struct(f"<I{len(self.value) * 2}I").pack(len(self.value), *(x for pair in self.value for x in pair))
         else:
             raise ValueError("RT_MetaType_v1 not found.")
 
@@ -335,6 +382,12 @@ class RT_Container_v1:
     4) Deferred property values.
     5) Sub-containers.
     """
+    __slots__ = ("name", "name_hash", "data_offset", "property_count", "instance_count", "properties", "containers",
+                 "property_index", "container_index", "indexed_properties", "indexed_containers", "tree_index")
+    
+    HEADER: Record = Record(("name_hash", "i"), ("data_offset", "I"), ("property_count", "H"),
+                            ("instance_count", "H"))
+    
     def __init__(self):
         self.name: str = ''
         self.name_hash: Optional[int] = None
@@ -343,15 +396,73 @@ class RT_Container_v1:
         self.instance_count: Optional[int] = None
         self.properties: List[RT_Property_v1] = []
         self.containers: List[RT_Container_v1] = []
-
-        self.base_pos: int = 0
+        
+        # Built on first lookup, rebuilt when the list is replaced or resized
+        self.property_index: Optional[Dict[int, RT_Property_v1]] = None
+        self.container_index: Optional[Dict[int, RT_Container_v1]] = None
+        self.indexed_properties: Tuple[Optional[List[RT_Property_v1]], int] = (None, 0)
+        self.indexed_containers: Tuple[Optional[List[RT_Container_v1]], int] = (None, 0)
+        # Tree-wide index covering this container, marked stale by mutations made through the container API
+        self.tree_index: Optional["RT_Index_v1"] = None
+    
+    # index
+    def get_property_index(self) -> Dict[int, RT_Property_v1]:
+        properties: List[RT_Property_v1] = self.properties
+        if self.property_index is None or self.indexed_properties[0] is not properties or \
+                self.indexed_properties[1] != len(properties):
+            self.property_index = index_nodes(properties)
+            self.indexed_properties = (properties, len(properties))
+        return self.property_index
+    
+    def get_property_hashes(self) -> Set[int]:
+        """ Name hashes of the container's own properties. """
+        return set(self.get_property_index())
+    
+    def get_container_index(self) -> Dict[int, "RT_Container_v1"]:
+        containers: List[RT_Container_v1] = self.containers
+        if self.container_index is None or self.indexed_containers[0] is not containers or \
+                self.indexed_containers[1] != len(containers):
+            self.container_index = index_nodes(containers)
+            self.indexed_containers = (containers, len(containers))
+        return self.container_index
+    
+    def invalidate(self):
+        """ Drop this container's indexes and mark its tree index stale. Needed after editing a child's name_hash. """
+        self.property_index = None
+        self.container_index = None
+        self.mark_stale()
+    
+    def mark_stale(self):
+        if self.tree_index is not None:
+            self.tree_index.stale = True
+    
+    # mutations
+    def add_property(self, prop: "RT_Property_v1"):
+        self.properties.append(prop)
+        self.property_count = len(self.properties)
+        self.invalidate()
+    
+    def remove_property(self, prop: "RT_Property_v1"):
+        self.properties.remove(prop)
+        self.property_count = len(self.properties)
+        self.invalidate()
+    
+    def add_container(self, container: "RT_Container_v1"):
+        self.containers.append(container)
+        self.instance_count = len(self.containers)
+        self.invalidate()
+    
+    def remove_container(self, container: "RT_Container_v1"):
+        self.containers.remove(container)
+        self.instance_count = len(self.containers)
+        self.invalidate()
     
     # getters
     def get_property(self, name_hash, recurse: bool = True):
         """ Search for a property in the container. Optional recursion. """
-        for child in self.properties:
-            if child.name_hash == name_hash:
-                return child
+        child: Optional[RT_Property_v1] = self.get_property_index().get(to_name_hash(name_hash))
+        if child is not None:
+            return child
         
         if recurse:
             for child in self.containers:
@@ -363,9 +474,9 @@ class RT_Container_v1:
     
     def get_container(self, name_hash, recurse: bool = True):
         """ Search for a container within this container. Optional recursion. """
-        for child in self.containers:
-            if child.name_hash == name_hash:
-                return child
+        child: Optional[RT_Container_v1] = self.get_container_index().get(to_name_hash(name_hash))
+        if child is not None:
+            return child
         
         if recurse:
             for child in self.containers:
@@ -375,10 +486,25 @@ class RT_Container_v1:
         
         return None
     
+    def get_property_by_name(self, name: str, recurse: bool = True):
+        return self.get_property(hash_jenkins(name)[0], recurse)
+    
+    def get_container_by_name(self, name: str, recurse: bool = True):
+        return self.get_container(hash_jenkins(name)[0], recurse)
+    
+    def apply_names(self, names: Dict[int, str]):
+        """ Set names from a bulk dehash of the tree's hashes. """
+        self.name = names.get(self.name_hash, "")
+        for prop in self.properties:
+            prop.apply_names(names)
+        for container in self.containers:
+            container.apply_names(names)
+    
     # sort
     def sort_properties(self, recurse: bool = True):
         """ Sort properties by name then name_hash. Optional recursion. """
         self.properties.sort(key=lambda x: (x.name == "", x.name.lower(), x.name_hash))
+        self.mark_stale()
         
         if recurse:
             for child in self.containers:
@@ -387,45 +513,95 @@ class RT_Container_v1:
     def sort_containers(self, recurse: bool = True):
         """ Sort containers by name then name_hash. Optional recursion. """
         self.containers.sort(key=lambda x: (x.name == "", x.name, x.name_hash))
+        self.mark_stale()
         
         if recurse:
             for child in self.containers:
                 child.sort_containers(recurse)
     
     # load
-    def load_properties(self, f: BinaryFile, db_cursor=None):
+    def load_properties(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        """ Decode the property headers, then read the deferred values in offset order. """
+        load_deferred(f, self.read_properties(f, hashes))
+    
+    def read_properties(self, f: BinaryFile, hashes: Optional[Set[int]] = None) -> List[RT_Property_v1]:
+        """
+        Property headers are contiguous, the whole block is decoded in one go.
+        Simple values are reinterpreted in bulk. Returns the properties whose value is deferred, still unread.
+        """
+        size: int = self.property_count * RT_Property_v1.HEADER.size
+        # Left at the end of the block, right before the child headers
         f.seek(self.data_offset)
-        self.properties = [RT_Property_v1() for _ in range(self.property_count)]
-        for i in range(self.property_count):
-            self.properties[i].deserialize(f, db_cursor)
-    
-    def load_containers(self, f: BinaryFile, db_cursor=None):
-        # Align to 4-byte boundary
-        new_position = f.tell()
-        f.seek(new_position + u.align(new_position))
+        headers: List[tuple] = list(RT_Property_v1.HEADER.iter_unpack(f.read(size)))
+        if hashes is not None:
+            hashes.update(header[0] for header in headers)
+        
+        raw_values = array('I', [header[1] for header in headers])
+        with memoryview(raw_values).cast('B').cast('f') as view:
+            f32_values: List[float] = view.tolist()
         
+        u32_type, f32_type = RT_MetaType_v1.UInteger32, RT_MetaType_v1.Float32
+        properties: List[RT_Property_v1] = []
+        deferred: List[RT_Property_v1] = []
+        for (name_hash, raw_data, meta_type), f32_value in zip(headers, f32_values):
+            if meta_type == 1:
+                properties.append(RT_Property_v1(name_hash, raw_data, u32_type, raw_data))
+            elif meta_type == 2:
+                properties.append(RT_Property_v1(name_hash, raw_data, f32_type, f32_value))
+            else:
+                prop = RT_Property_v1(name_hash, raw_data, META_TYPES[meta_type] if meta_type < len(META_TYPES)
+                                      else RT_MetaType_v1(meta_type))
+                if meta_type != 0:
+                    deferred.append(prop)
+                properties.append(prop)
+        self.properties = properties
+        return deferred
+    
+    def read_child_headers(self, f: BinaryFile) -> List[tuple]:
+        # Sub-container headers are contiguous and follow the 4-byte aligned property headers
+        offset: int = self.data_offset + self.property_count * RT_Property_v1.HEADER.size
+        f.seek(offset + u.align(offset))
+        return list(self.HEADER.read_many(f, self.instance_count))
+    
+    def load_containers(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        headers: List[tuple] = self.read_child_headers(f)
         self.containers = [RT_Container_v1() for _ in range(self.instance_count)]
         for i in range(self.instance_count):
-            self.containers[i].deserialize(f, db_cursor)
+            self.containers[i].load(f, headers[i], hashes)
     
     # io
-    def deserialize(self, f: BinaryFile, db_cursor=None):
-        """ Deserialize a file. Optional sqlite3.cursor object for dehash. """
-        self.name_hash = f.read_s32()
-        if db_cursor is not None:
-            db_cursor.execute(f"SELECT value FROM properties WHERE hash = {self.name_hash}")
-            value = db_cursor.fetchone()
-            if value is not None:
-                self.name = value[0]
-        self.data_offset = f.read_u32()
-        self.property_count = f.read_u16()
-        self.instance_count = f.read_u16()
-        
+    def deserialize(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        """ Deserialize a file. Optionally collect every name hash into 'hashes' for a later dehash. """
+        header = self.HEADER.read(f)
         original_position = f.tell()
-        self.load_properties(f, db_cursor)
-        self.load_containers(f, db_cursor)
+        self.load(f, header, hashes)
         f.seek(original_position)
     
+    def load(self, f: BinaryFile, header: tuple, hashes: Optional[Set[int]] = None):
+        """
+        Load the container's sub-tree from an already decoded header.
+        Containers are visited in file order from an explicit stack, nesting depth is not bound by recursion.
+        Deferred values of the whole sub-tree are gathered on the way and read last, in a single forward sweep.
+        """
+        stack: List[Tuple[RT_Container_v1, tuple]] = [(self, header)]
+        deferred: List[RT_Property_v1] = []
+        block_offsets: List[int] = []
+        while len(stack) > 0:
+            container, header = stack.pop()
+            container.name_hash, container.data_offset, container.property_count, container.instance_count = header
+            if hashes is not None:
+                hashes.add(container.name_hash)
+            
+            deferred.extend(container.read_properties(f, hashes))
+            block_offsets.append(container.data_offset)
+            headers: List[tuple] = container.read_child_headers(f)
+            container.containers = [RT_Container_v1() for _ in range(container.instance_count)]
+            # Reversed so the first child is popped first, children are laid out depth-first
+            stack.extend(zip(reversed(container.containers), reversed(headers)))
+        
+        block_offsets.sort()
+        load_deferred(f, deferred, block_offsets)
+    
     def export(self):
         elem = et.Element('container')
         elem.attrib['hash'] = u.safe_hex(self.name_hash, 'i')
@@ -439,6 +615,22 @@ class RT_Container_v1:
         
         return elem
     
+    def export_stream(self, w: XMLWriter, level: int = 0):
+        """ Stream the container to 'w', same output as export followed by utils.indent. """
+        attrib = (("hash", u.safe_hex(self.name_hash, 'i')), ("name", self.name))
+        if len(self.properties) == 0 and len(self.containers) == 0:
+            w.leaf("container", attrib)
+            return
+        
+        w.start("container", attrib)
+        for prop in self.properties:
+            w.indent(level + 1)
+            prop.export_stream(w, level + 1)
+        for container in self.containers:
+            w.indent(level + 1)
+            container.export_stream(w, level + 1)
+        w.end("container", level)
+    
     def import_(self, **kwargs):
         elem: et.Element = kwargs.get("elem")
         
@@ -458,32 +650,221 @@ class RT_Container_v1:
         self.property_count = len(self.properties)
         self.instance_count = len(self.containers)
     
-    def serialize(self, f: BinaryFile):
-        deferred_offset: int = f.tell()
-        f.seek(self.base_pos)
-        f.write_u32(deferred_offset)
-        f.seek(deferred_offset)
+    def serialize_header(self, f: BinaryFile, data_offset: int):
+        f.write(self.pack_header(data_offset))
+    
+    def pack_header(self, data_offset: int) -> bytes:
+        return self.HEADER.pack(to_name_hash(self.name_hash), data_offset, len(self.properties), len(self.containers))
+
+
+class RT_Layout_v1:
+    """
+    Two-pass RTPC serialization.
+    The plan pass places every container block, property header and deferred value up front,
+    the emit pass then fills one preallocated buffer front to back without patching anything.
+    
+    Container blocks are laid out depth-first:
+    1) Property headers, 'P' padded to 4 bytes
+    2) Sub-container headers
+    3) Deferred values, strings are 'P' padded to 4 bytes and Mat4x4 values are preceded by 1-4 'P' bytes.
+       The offset of a Mat4x4 points at that padding, as the game files do.
+    4) Zero filled gap up to the 4-byte aligned start of the next block
+    """
+    __slots__ = ("root", "header_offset", "size", "data_offsets", "blocks")
+    
+    def __init__(self, root: RT_Container_v1, header_offset: int = 8):
+        self.root: RT_Container_v1 = root
+        self.header_offset: int = header_offset
+        self.size: int = 0
+        self.data_offsets: Dict[int, int] = {}
+        # (container, [(property, offset, padding before, value, padding after)]) in file order
+        self.blocks: List[Tuple[RT_Container_v1, List[Tuple[RT_Property_v1, int, int, bytes, int]]]] = []
+        self.plan()
+    
+    def plan(self):
+        position: int = self.header_offset + RT_Container_v1.HEADER.size
+        stack: List[RT_Container_v1] = [self.root]
+        while len(stack) > 0:
+            container = stack.pop()
+            position += u.align(position)
+            self.data_offsets[id(container)] = position
+            
+            position += len(container.properties) * RT_Property_v1.HEADER.size
+            position += u.align(position)
+            position += len(container.containers) * RT_Container_v1.HEADER.size
+            
+            deferred: List[Tuple[RT_Property_v1, int, int, bytes, int]] = []
+            for prop in container.properties:
+                if prop.type in RT_Property_v1.SIMPLE_HEADERS:
+                    continue
+                value: bytes = prop.serialize_deferred()
+                offset: int = position
+                before: int = (u.align(position) or 4) if prop.type == RT_MetaType_v1.Mat4x4 else 0
+                position += before + len(value)
+                after: int = u.align(position) if prop.type == RT_MetaType_v1.String else 0
+                position += after
+                deferred.append((prop, offset, before, value, after))
+            
+            self.blocks.append((container, deferred))
+            stack.extend(reversed(container.containers))
         
-        for prop in self.properties:
-            prop.serialize(f)
-        f.write_align()
+        # The gap after the last block is never written
+        self.size = position
+    
+    def emit(self, f: BinaryFile):
+        """ Write the planned tree, the file header before 'header_offset' is left to the caller. """
+        f.seek(self.header_offset)
+        self.root.serialize_header(f, self.data_offsets[id(self.root)])
+        for container, deferred in self.blocks:
+            # Each block is assembled in memory and written at its planned offset in one go
+            data_offset: int = self.data_offsets[id(container)]
+            block = bytearray()
+            deferred_offsets = iter([offset for _, offset, _, _, _ in deferred])
+            for prop in container.properties:
+                if prop.type in RT_Property_v1.SIMPLE_HEADERS:
+                    block += prop.pack_header()
+                else:
+                    block += prop.pack_header(next(deferred_offsets))
+            block += b"P" * u.align(data_offset + len(block))
+            
+            for child in container.containers:
+                block += child.pack_header(self.data_offsets[id(child)])
+            
+            for prop, offset, before, value, after in deferred:
+                if before:
+                    block += b"P" * before
+                block += value
+                if after:
+                    block += b"P" * after
+            
+            f.seek(data_offset)
+            f.write(block)
+
+
+class RT_Index_v1:
+    """
+    Tree-wide index of every property and container by name_hash.
+    Each entry is (container path, node), the path being the name hashes from the root down to the owning container.
+    Every indexed container links back to the index, so only mutations of this tree make it stale.
+    """
+    __slots__ = ("root", "stale", "properties", "containers")
+    
+    def __init__(self, root: RT_Container_v1):
+        self.root: RT_Container_v1 = root
+        self.stale: bool = False
+        self.properties: Dict[int, List[Tuple[Tuple[int, ...], RT_Property_v1]]] = {}
+        self.containers: Dict[int, List[Tuple[Tuple[int, ...], RT_Container_v1]]] = {}
         
-        for sub_con in self.containers:
-            sub_con.serialize_header(f)
+        stack: List[Tuple[Tuple[int, ...], RT_Container_v1]] = [((), root)]
+        while len(stack) > 0:
+            parent_path, container = stack.pop()
+            container.tree_index = self
+            name_hash: int = to_name_hash(container.name_hash)
+            self.containers.setdefault(name_hash, []).append((parent_path, container))
+            path: Tuple[int, ...] = parent_path + (name_hash,)
+            for prop in container.properties:
+                self.properties.setdefault(to_name_hash(prop.name_hash), []).append((path, prop))
+            # Reversed so nodes are indexed in the same depth-first order as the recursive getters
+            stack.extend((path, child) for child in reversed(container.containers))
+    
+    def __str__(self):
+        return f"RT_Index_v1: {len(self.properties)} property hashes, {len(self.containers)} container hashes"
+    
+    def is_stale(self) -> bool:
+        return self.stale
+    
+    def find_properties(self, name_hash: Union[int, str]) -> List[Tuple[Tuple[int, ...], RT_Property_v1]]:
+        return self.properties.get(to_name_hash(name_hash), [])
+    
+    def find_containers(self, name_hash: Union[int, str]) -> List[Tuple[Tuple[int, ...], RT_Container_v1]]:
+        return self.containers.get(to_name_hash(name_hash), [])
 
-        for prop in self.properties:
-            prop.write(f)
+
+class RT_LazyContainer_v1(RT_Container_v1):
+    """
+    Container backed by an open (mapped) file, only its header is decoded up front.
+    Properties and sub-containers are decoded the first time they are accessed.
+    """
+    __slots__ = ("f", "hashes", "_properties", "_containers")
+    
+    def __init__(self, f: Optional[BinaryFile] = None, hashes: Optional[Set[int]] = None):
+        super().__init__()
+        self.f: Optional[BinaryFile] = f
+        self.hashes: Optional[Set[int]] = hashes
+        self._properties: Optional[List[RT_Property_v1]] = None
+        self._containers: Optional[List[RT_Container_v1]] = None
+    
+    @property
+    def properties(self) -> List[RT_Property_v1]:
+        if self._properties is None:
+            self.load_properties(self.f, self.hashes)
+        return self._properties
+    
+    @properties.setter
+    def properties(self, value: List[RT_Property_v1]):
+        self._properties = value
+    
+    @property
+    def containers(self) -> List[RT_Container_v1]:
+        if self._containers is None:
+            self.load_containers(self.f, self.hashes)
+        return self._containers
+    
+    @containers.setter
+    def containers(self, value: List[RT_Container_v1]):
+        self._containers = value
+    
+    def is_decoded(self) -> bool:
+        return self._properties is not None and self._containers is not None
+    
+    def get_property_hashes(self) -> Set[int]:
+        """ Taken from the property headers alone while the properties are not decoded yet. """
+        if self._properties is not None or self.f is None:
+            return super().get_property_hashes()
+        size: int = self.property_count * RT_Property_v1.HEADER.size
+        return {header[0] for header in RT_Property_v1.HEADER.iter_unpack(self.f.read_at(self.data_offset, size))}
+    
+    def decode(self):
+        """
+        Decode the whole sub-tree, e.g. before it is exported or the file is closed.
+        Visited from an explicit stack like RT_Container_v1.load, the deferred values are read last in one sweep.
+        """
+        stack: List[RT_LazyContainer_v1] = [self]
+        deferred: List[RT_Property_v1] = []
+        block_offsets: List[int] = []
+        while len(stack) > 0:
+            container = stack.pop()
+            if container.f is not None:
+                block_offsets.append(container.data_offset)
+                if container._properties is None:
+                    deferred.extend(container.read_properties(container.f, container.hashes))
+            stack.extend(child for child in reversed(container.containers) if isinstance(child, RT_LazyContainer_v1))
         
-        f.align()
-        for sub_con in self.containers:
-            sub_con.serialize(f)
-    
-    def serialize_header(self, f: BinaryFile):
-        f.write_s32(u.safe_dehex(self.name_hash, 'i'))
-        self.base_pos = f.tell()
-        f.write(b"FFFF")
-        f.write_u16(self.property_count)
-        f.write_u16(self.instance_count)
+        if len(deferred) > 0:
+            block_offsets.sort()
+            load_deferred(self.f, deferred, block_offsets)
+    
+    # load
+    def load_properties(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        if f is None:
+            self._properties = []
+            return
+        super().load_properties(f, hashes)
+    
+    def load_containers(self, f: BinaryFile, hashes: Optional[Set[int]] = None):
+        if f is None:
+            self._containers = []
+            return
+        headers: List[tuple] = self.read_child_headers(f)
+        self.containers = [RT_LazyContainer_v1(f, hashes) for _ in range(self.instance_count)]
+        for i in range(self.instance_count):
+            self._containers[i].load(f, headers[i], hashes)
+    
+    def load(self, f: BinaryFile, header: tuple, hashes: Optional[Set[int]] = None):
+        """ Only take the header, the content is decoded on access. """
+        self.name_hash, self.data_offset, self.property_count, self.instance_count = header
+        if hashes is not None:
+            hashes.add(self.name_hash)
 
 
 
@@ -7,7 +7,7 @@ Base SARC file to allow AAF -> Unpacked SARC
 from typing import Optional
 import os.path
 
-from files.file import BinaryFile, SharedHeader
+from files.file import BinaryFile, MappedBinaryFile, SharedHeader
 from formats.sarc.v2.sarc_v2_types import SARC_Header_v2
 
 
@@ -32,16 +32,27 @@ class SARC:
         if "" in [self.file_path, self.file_name, self.extension]:
             raise ValueError("File information is none, need to run 'get_file_details' first")
     
-        with BinaryFile(open(self.file_path, "rb")) as f:
+        with MappedBinaryFile.from_path(self.get_file_path()) as f:
             self.header = self.header_type()
             self.header.deserialize(f)
     
     def four_cc(self) -> bytes:
         return self.header.four_cc
     
+    def get_file_path(self) -> str:
+        return os.path.join(self.file_path, f"{self.file_name}.{self.extension}")
+    
     def get_file_path_short(self) -> str:
         return os.path.join(self.file_path, f"{self.file_name}")
     
+    def load(self):
+        """ Deserialize an on-disk archive through a memory map. """
+        with MappedBinaryFile.from_path(self.get_file_path()) as f:
+            self.load_stream(file=f)
+    
+    def load_stream(self, **kwargs):
+        pass
+    
     def load_converted(self, **kwargs):
         pass
 
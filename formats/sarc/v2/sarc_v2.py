@@ -3,12 +3,11 @@ Streamed Archive v2
 """
 
 # imports
-import io
 import os.path
 from typing import List
 import xml.etree.ElementTree as et
 
-from files.file import BinaryFile
+from files.file import BinaryFile, BinaryBuilder
 from formats.sarc.sarc import SARC
 from formats.sarc.v2.sarc_v2_types import SARC_Header_v2, SARC_Entry_v2
 from misc.errors import MalformedXMLDoc, UnsupportedXMLTag, MissingInvalidXMLVersion, UnsupportedXMLVersion
@@ -131,7 +130,7 @@ class SARC_v2(SARC):
             self.file_name = file_name
         file_path = f"{self.get_file_path_short()}_serial.sarc"
         
-        f: BinaryFile = BinaryFile(io.BytesIO(b""))
+        f: BinaryBuilder = BinaryBuilder()
         self.header.serialize(f)
         for file in self.files:
             file.serialize(f)
@@ -142,9 +141,8 @@ class SARC_v2(SARC):
                 f.write_align(delim=b"\00")
         
         if export_sarc:
-            f.seek(0)
             with open(file_path, "wb") as sarc_file:
-                sarc_file.write(f.read_all())
+                f.flush(sarc_file)
         
         return f.read_all()
 
@@ -6,7 +6,10 @@ Streamed Archive v2 types
 import os.path
 import xml.etree.ElementTree as et
 
-from files.file import SharedHeader, BinaryFile
+from typing import Optional, Union
+
+from files.file import SharedHeader, BinaryFile, Slot
+from files.record import Record
 import misc.utils as u
 from misc.errors import FileDoesNotExist, IncorrectFileSize, PropertyDoesNotMatch
 
@@ -23,11 +26,11 @@ class SARC_Header_v2(SharedHeader):
     def __init__(self):
         super().__init__()
         self.length = 4 * 4  # 4-byte length of header
-        self.four_cc = "SARC"
+        self.four_cc = b"SARC"
         self.version = 2
         
         self.size: int = 0
-        self.base_pos: int = 0
+        self.offset_slot: Optional[Slot] = None
     
     def __str__(self):
         return f"SARC_Header: {self.four_cc} version {self.version}"
@@ -38,7 +41,7 @@ class SARC_Header_v2(SharedHeader):
         if length * 4 != self.length:
             raise PropertyDoesNotMatch(str(length), str(self.length), property_name=f"Header length")
         
-        four_cc: str = f.read_strl(4)
+        four_cc: bytes = f.read_strl(4)
         if four_cc != self.four_cc:
             raise PropertyDoesNotMatch(str(four_cc), str(self.four_cc), property_name=f"Header four CC")
         
@@ -50,17 +53,13 @@ class SARC_Header_v2(SharedHeader):
     
     def serialize(self, f: BinaryFile):
         f.write_u32(self.length // 4)
-        f.write_strl(self.four_cc)
+        f.write(self.four_cc)
         f.write_u32(self.version)
-        self.base_pos = f.tell()
-        f.write(b"FFFF")
+        self.offset_slot = f.reserve_u32()
     
     def write(self, f: BinaryFile):
-        new_pos: int = f.tell()
-        f.seek(self.base_pos)
         # Offset accounts for len(header), code takes the pos of len(header) - 4
-        f.write_u32(new_pos - (self.base_pos + 4))
-        f.seek(new_pos)
+        f.patch(self.offset_slot, f.tell() - (self.offset_slot.offset + 4))
 
 
 class SARC_Entry_v2:
@@ -70,32 +69,30 @@ class SARC_Entry_v2:
     3) Data offset (If 0, file is a reference to another global file)
     4) File size
     """
+    DATA: Record = Record(("data_offset", "I"), ("size", "I"))
     
     def __init__(self):
         self.name_length: int = 0
         self.name: str = ""
         self.data_offset: int = 0
         self.size: int = 0
-        self.data: bytes = b""
+        # Deserialized payloads are memoryview slices of the source buffer, copied only when written out
+        self.data: Union[bytes, memoryview] = b""
         self.ref: bool = False
 
         self.base_path: str = ""
-        self.base_pos: int = 0
+        self.offset_slot: Optional[Slot] = None
     
     def deserialize(self, f: BinaryFile):
         self.name_length = f.read_u32()
         rel_file_path: bytes = f.read_strl(self.name_length)
         self.name = rel_file_path.strip(b"\00").decode("utf-8")
-        self.data_offset = f.read_u32()
-        self.size = f.read_u32()
+        self.data_offset, self.size = self.DATA.read(f)
         
         if self.data_offset == 0:
             self.ref = True
         else:
-            original_pos: int = f.tell()
-            f.seek(self.data_offset)
-            self.data = f.read(self.size)
-            f.seek(original_pos)
+            self.data = f.read_at(self.data_offset, self.size)
     
     def export(self, folder_path: str):
         file_path: str = os.path.join(folder_path, self.name)
@@ -137,15 +134,11 @@ class SARC_Entry_v2:
         if self.ref:
             f.write_u32(0)
         else:
-            self.base_pos = f.tell()
-            f.write(b"FFFF")
+            self.offset_slot = f.reserve_u32()
         f.write_u32(self.size)
     
     def write(self, f: BinaryFile):
         if not self.ref:
-            new_pos: int = f.tell()
-            f.seek(self.base_pos)
-            f.write_u32(new_pos)
-            f.seek(new_pos)
+            f.patch(self.offset_slot, f.tell())
             f.write(self.data)
         
@@ -4,11 +4,13 @@ Entry point for the program
 
 
 # imports
+from formats.cache import TreeCache, CACHE_SIZE_MIB
 from formats.manager import manage_xml, manage_binary
+from formats.query import run as run_query
 import argparse as ap
 import os.path
 import sys
-from typing import List
+from typing import List, Optional
 import configparser as cp
 
 from misc.errors import ApexEngineError, FileDoesNotExist
@@ -20,6 +22,9 @@ THIS_PATH: str = os.path.split(sys.argv[0])[0]
 DB_FILEPATH: str = f"{THIS_PATH}\\global.db"
 AUTO_CLOSE: bool = False
 DEBUG: bool = False
+# Parsed trees are cached there when set, an empty path disables the cache
+TREE_CACHE_DIRECTORY: str = ""
+TREE_CACHE_SIZE_MIB: int = CACHE_SIZE_MIB
 
 
 # functions
@@ -36,14 +41,28 @@ if __name__ == "__main__":
         config["DEFAULT"]["DatabaseAbsolutePath"] = DB_FILEPATH
         config["DEFAULT"]["AutoCloseOnComplete"] = str(int(AUTO_CLOSE))
         config["DEFAULT"]["Debug"] = str(int(DEBUG))
+        config["DEFAULT"]["TreeCacheDirectory"] = TREE_CACHE_DIRECTORY
+        config["DEFAULT"]["TreeCacheSizeMiB"] = str(TREE_CACHE_SIZE_MIB)
         with open(abs_config_path, "w") as config_f:
             config.write(config_f)
     config.read(abs_config_path)
     DB_FILEPATH = config["DEFAULT"]["DatabaseAbsolutePath"]
     AUTO_CLOSE = bool(int(config["DEFAULT"]["AutoCloseOnComplete"]))
     DEBUG = bool(int(config["DEFAULT"]["Debug"]))
+    # Missing from configs written by older versions
+    TREE_CACHE_DIRECTORY = config["DEFAULT"].get("TreeCacheDirectory", TREE_CACHE_DIRECTORY)
+    TREE_CACHE_SIZE_MIB = int(config["DEFAULT"].get("TreeCacheSizeMiB", str(TREE_CACHE_SIZE_MIB)))
     
-    parser = ap.ArgumentParser(description=f"Apex Engine Tools {VERSION}")
+    # 'main.py query ...' streams JSON lines, so it never waits for a key press
+    if len(sys.argv) > 1 and sys.argv[1] == "query":
+        sys.exit(run_query(sys.argv[2:], DB_FILEPATH))
+    
+    cache: Optional[TreeCache] = None
+    if TREE_CACHE_DIRECTORY != "":
+        cache = TreeCache(TREE_CACHE_DIRECTORY, TREE_CACHE_SIZE_MIB)
+    
+    parser = ap.ArgumentParser(description=f"Apex Engine Tools {VERSION}",
+                               epilog="'main.py query --help' to query binaries without converting them")
     parser.add_argument('process', metavar='path', type=str, nargs='+', help='process each file/folder')
     
     args = parser.parse_args()
@@ -60,7 +79,7 @@ if __name__ == "__main__":
                 if path[-3:] == "xml":
                     manage_xml(path, DB_FILEPATH)
                 else:
-                    manage_binary(path, DB_FILEPATH)
+                    manage_binary(path, DB_FILEPATH, cache=cache)
             else:
                 # process_folder(path)
                 print(f"DEBUG: Folder processing is WIP")
@@ -4,42 +4,117 @@ Database commands.
 
 
 # imports
+import argparse as ap
 import sqlite3 as sql
 import os.path
+import time
+from typing import Dict, List, Iterator, Tuple
 
-from misc.hash_functions import hash_jenkins
+from misc.hash_functions import hash_jenkins_many
 
 
 # settings
 TO_ADD_FILE_PATH: str = os.path.abspath('../databases/private_properties_JC3.txt')
 DB_FILE_PATH: str = os.path.abspath("../databases/global.db")
+CHUNK_SIZE: int = 50000  # Lines hashed and inserted per transaction
 
 
 # functions
-def add_file_to_database(database_file_path: str, to_add_file_path: str):
+def read_chunks(to_add_file_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[List[bytes], int]]:
+    """ Non-empty lines in chunks, with the number of bytes read so far. Memory is bounded by the chunk size. """
+    with open(to_add_file_path, "rb") as f:
+        chunk: List[bytes] = []
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if len(line) == 0:
+                continue
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield chunk, f.tell()
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk, f.tell()
+
+
+def add_file_to_database(database_file_path: str, to_add_file_path: str, replace: bool = False,
+                         chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Hash every line of a wordlist and add it to the properties table. Returns the number of rows written.
+    Existing hashes, signed or unsigned, are kept or overwritten with 'replace'.
+    Each chunk is committed in its own transaction.
+    Lines that are not valid UTF-8 are skipped, their stored name would not hash back to the stored hash.
+    """
     if not os.path.exists(database_file_path):
         raise FileNotFoundError("Cannot find database_file_path")
     if not os.path.exists(to_add_file_path):
-        raise FileNotFoundError("Cannot find database_file_path")
+        raise FileNotFoundError("Cannot find to_add_file_path")
+    
+    # The table holds a mix of signed and unsigned hashes, an existing row is matched in either form
+    queries: List[str] = [
+        "INSERT OR IGNORE INTO properties(hash, value) SELECT ?1, ?2 "
+        "WHERE NOT EXISTS (SELECT 1 FROM properties WHERE hash IN (?1, ?1 & 0xFFFFFFFF))"
+    ]
+    if replace:
+        queries.insert(0, "UPDATE properties SET value = ?2 WHERE hash IN (?1, ?1 & 0xFFFFFFFF)")
     
-    to_add = []
-    with open(to_add_file_path, "r") as f:
-        contents = f.read()
-        split = contents.split("\n")
-        for line in split:
-            value = line
-            val_hash_int, val_hash_hex = hash_jenkins(value)
-            to_add.append((value, val_hash_int))
-    query = "INSERT INTO properties(value, hash) " \
-            "VALUES " + ", ".join(map(str, to_add))
-    conn = sql.connect(database_file_path)
-    c = conn.cursor()
-    c.execute(query)
-    conn.commit()
-    conn.close()
+    total_size: int = max(os.path.getsize(to_add_file_path), 1)
+    conn = sql.connect(database_file_path, isolation_level=None)
+    journal_mode: str = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    
+    start: float = time.perf_counter()
+    lines: int = 0
+    written: int = 0
+    skipped: int = 0
+    try:
+        for chunk, position in read_chunks(to_add_file_path, chunk_size):
+            values: List[bytes] = []
+            names: List[str] = []
+            for value in chunk:
+                try:
+                    names.append(value.decode("utf-8"))
+                except UnicodeDecodeError:
+                    skipped += 1
+                    continue
+                values.append(value)
+            
+            # First value wins for duplicate hashes within a chunk, the unique hash_index handles the rest
+            rows: Dict[int, str] = {}
+            for name, value_hash in zip(names, hash_jenkins_many(values)):
+                if value_hash not in rows:
+                    rows[value_hash] = name
+            
+            changes: int = conn.total_changes
+            conn.execute("BEGIN")
+            try:
+                for query in queries:
+                    conn.executemany(query, rows.items())
+                conn.execute("COMMIT")
+            except sql.Error:
+                conn.execute("ROLLBACK")
+                raise
+            
+            lines += len(chunk)
+            written += conn.total_changes - changes
+            elapsed: float = max(time.perf_counter() - start, 1e-9)
+            print(f"[{position / total_size:6.1%}] {lines} lines, {written} written, {skipped} not UTF-8, "
+                  f"{lines / elapsed:,.0f} rows/s")
+    finally:
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        conn.close()
+    
+    return written
 
 
 # main
 if __name__ == "__main__":
-    add_file_to_database(DB_FILE_PATH, TO_ADD_FILE_PATH)
-    pass
+    parser = ap.ArgumentParser(description="Add a wordlist to the properties table")
+    parser.add_argument("words", type=str, nargs="?", default=TO_ADD_FILE_PATH, help="wordlist, one name per line")
+    parser.add_argument("--db", type=str, default=DB_FILE_PATH)
+    parser.add_argument("--replace", action="store_true", help="overwrite the names of existing hashes")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    
+    add_file_to_database(args.db, args.words, args.replace, args.chunk_size)
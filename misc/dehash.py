@@ -0,0 +1,289 @@
+"""
+Hash to name lookups for dehashing.
+"""
+
+
+# imports
+import argparse as ap
+import mmap
+import os
+import os.path
+import pathlib
+import sqlite3 as sql
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Optional, Iterable, List, Union, Tuple
+
+from files.file import BinaryBuilder
+from files.record import Record
+from misc.hash_functions import to_signed
+
+
+# settings
+COMPILED_EXTENSION: str = ".hdict"
+CACHE_SIZE_KIB: int = 65536  # Page cache per read-only handle
+BULK_QUERY_LIMIT: int = 4096  # Up to this many hashes are queried directly instead of loading the table
+
+
+# class
+class HashDictionary:
+    """
+    In-memory hash -> name mapping.
+    Loaded from the properties table once and shared by every file processed in a run.
+    """
+    def __init__(self, names: Optional[Dict[int, str]] = None):
+        self.names: Dict[int, str] = {}
+        if names is not None:
+            for name_hash, name in names.items():
+                self.add(name_hash, name)
+    
+    def __str__(self):
+        return f"HashDictionary: {len(self.names)} names"
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def __contains__(self, name_hash: int):
+        return name_hash in self.names
+    
+    @classmethod
+    def from_database(cls, database_file_path: str):
+        """ Load the whole properties table in one query. """
+        dictionary = cls()
+        for name_hash, name in get_connection(database_file_path).execute("SELECT hash, value FROM properties"):
+            dictionary.add(name_hash, name)
+        return dictionary
+    
+    def add(self, name_hash: int, name: str):
+        # Hashes are read as signed int32, the table holds a mix of signed and unsigned values
+        self.names[to_signed(name_hash & 0xffffffff)] = name
+    
+    def get(self, name_hash: int, default: str = "") -> str:
+        return self.names.get(name_hash, default)
+    
+    def lookup_many(self, hashes: Iterable[int]) -> Dict[int, str]:
+        """ Names for every known hash. """
+        names: Dict[int, str] = self.names
+        return {name_hash: names[name_hash] for name_hash in hashes if name_hash in names}
+
+
+class DatabaseDictionary:
+    """
+    Hash -> name lookups straight from the properties table, without loading it.
+    Meant for bulk resolution of the unique hashes of a tree with a few chunked IN queries.
+    """
+    # Stay below SQLite's default bound parameter limit
+    CHUNK_SIZE: int = 450
+    
+    def __init__(self, database_file_path: str):
+        self.database_file_path: str = database_file_path
+    
+    def __str__(self):
+        return f"DatabaseDictionary: '{self.database_file_path}'"
+    
+    def get(self, name_hash: int, default: str = "") -> str:
+        return self.lookup_many([name_hash]).get(name_hash, default)
+    
+    def lookup_many(self, hashes: Iterable[int]) -> Dict[int, str]:
+        """ Names for every known hash, one query per chunk. """
+        hashes: List[int] = list(set(hashes))
+        names: Dict[int, str] = {}
+        conn: sql.Connection = get_connection(self.database_file_path)
+        for i in range(0, len(hashes), self.CHUNK_SIZE):
+            chunk: List[int] = hashes[i:i + self.CHUNK_SIZE]
+            # Match both the signed and unsigned form, the table holds a mix of them
+            params: List[int] = chunk + [name_hash & 0xffffffff for name_hash in chunk]
+            query: str = f"SELECT hash, value FROM properties WHERE hash IN ({','.join('?' * len(params))})"
+            for name_hash, name in conn.execute(query, params):
+                names[to_signed(name_hash & 0xffffffff)] = name
+        return names
+
+
+class MappedDictionary:
+    """
+    Hash -> name lookups from a compiled dictionary file, memory-mapped and binary searched.
+    Opening is effectively free and the pages are shared by every process mapping the same file.
+    
+    Layout, little-endian:
+    1) Header: four_cc, version, count
+    2) Hashes: u32[count], unsigned and sorted
+    3) Offsets: u32[count + 1] into the blob, name i is blob[offsets[i]:offsets[i + 1]]
+    4) Blob: UTF-8 names
+    """
+    HEADER = Record(("four_cc", "4s"), ("version", "I"), ("count", "I"))
+    FOUR_CC: bytes = b"HDCT"
+    VERSION: int = 1
+    
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        with open(file_path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        four_cc, version, self.count = self.HEADER.unpack(self.buffer)
+        if four_cc != self.FOUR_CC or version != self.VERSION:
+            self.buffer.close()
+            raise ValueError(f"{file_path} is not a v{self.VERSION} compiled dictionary")
+        
+        view = memoryview(self.buffer)
+        hashes_end: int = self.HEADER.size + self.count * 4
+        offsets_end: int = hashes_end + (self.count + 1) * 4
+        self.hashes = view[self.HEADER.size:hashes_end].cast("I")
+        self.offsets = view[hashes_end:offsets_end].cast("I")
+        self.blob = view[offsets_end:]
+        if sys.byteorder != "little":
+            self.hashes = self.swapped(self.hashes)
+            self.offsets = self.swapped(self.offsets)
+    
+    def __str__(self):
+        return f"MappedDictionary: {self.count} names from '{self.file_path}'"
+    
+    def __len__(self):
+        return self.count
+    
+    def __contains__(self, name_hash: int):
+        return self.find(name_hash) is not None
+    
+    @staticmethod
+    def swapped(values: memoryview) -> array:
+        # Big-endian hosts pay for a copy of the tables, the blob is still mapped
+        values = array("I", values)
+        values.byteswap()
+        return values
+    
+    @classmethod
+    def compile(cls, names: Dict[int, str], file_path: str):
+        """ Write a dictionary file from hash -> name pairs, hashes in either signed or unsigned form. """
+        entries: Dict[int, bytes] = {name_hash & 0xffffffff: name.encode("utf-8") for name_hash, name in names.items()}
+        hashes = array("I", sorted(entries))
+        offsets = array("I", [0])
+        blob = bytearray()
+        for name_hash in hashes:
+            blob += entries[name_hash]
+            offsets.append(len(blob))
+        
+        f = BinaryBuilder()
+        cls.HEADER.write(f, cls.FOUR_CC, cls.VERSION, len(hashes))
+        f.write_array(hashes)
+        f.write_array(offsets)
+        f.write(blob)
+        with open(file_path, "wb") as file:
+            f.flush(file)
+    
+    def close(self):
+        self.hashes = self.offsets = self.blob = None
+        self.buffer.close()
+    
+    def find(self, name_hash: int) -> Optional[int]:
+        name_hash &= 0xffffffff
+        index: int = bisect_left(self.hashes, name_hash)
+        if index < self.count and self.hashes[index] == name_hash:
+            return index
+        return None
+    
+    def name(self, index: int) -> str:
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+    
+    def get(self, name_hash: int, default: str = "") -> str:
+        index: Optional[int] = self.find(name_hash)
+        if index is None:
+            return default
+        return self.name(index)
+    
+    def lookup_many(self, hashes: Iterable[int]) -> Dict[int, str]:
+        """ Names for every known hash, keyed by the hashes as given. """
+        names: Dict[int, str] = {}
+        for name_hash in set(hashes):
+            index: Optional[int] = self.find(name_hash)
+            if index is not None:
+                names[name_hash] = self.name(index)
+        return names
+
+
+DehashSource = Union[HashDictionary, DatabaseDictionary, MappedDictionary]
+
+
+# functions
+_connections: Dict[Tuple[int, str], sql.Connection] = {}
+# database path -> (modification stamp, dictionary)
+_dictionaries: Dict[str, Tuple[Tuple[int, int], DehashSource]] = {}
+
+
+def get_connection(database_file_path: str) -> sql.Connection:
+    """
+    The process-wide read-only handle for a database, opened on first use.
+    Keyed by process id as well, so every worker process opens exactly one handle of its own.
+    The handle sees writes made to the database while it is open, by misc.database for instance.
+    """
+    database_file_path = os.path.abspath(database_file_path)
+    key: Tuple[int, str] = (os.getpid(), database_file_path)
+    if key not in _connections:
+        uri: str = f"{pathlib.Path(database_file_path).as_uri()}?mode=ro"
+        conn: sql.Connection = sql.connect(uri, uri=True)
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+        _connections[key] = conn
+    return _connections[key]
+
+
+def close_connections():
+    """ Close the handles opened by this process. """
+    pid: int = os.getpid()
+    for key in [key for key in _connections if key[0] == pid]:
+        _connections.pop(key).close()
+
+
+def compiled_path(database_file_path: str) -> str:
+    return os.path.splitext(database_file_path)[0] + COMPILED_EXTENSION
+
+
+def compile_dictionary(database_file_path: str, file_path: str = "") -> str:
+    """ Compile the properties table of a database into a dictionary file next to it. """
+    file_path = file_path or compiled_path(database_file_path)
+    MappedDictionary.compile(HashDictionary.from_database(database_file_path).names, file_path)
+    return file_path
+
+
+def get_stamp(database_file_path: str) -> Tuple[int, int]:
+    """ Modification times of a database and of its write-ahead log, changed by any write to it. """
+    wal_path: str = f"{database_file_path}-wal"
+    wal_mtime: int = os.stat(wal_path).st_mtime_ns if os.path.exists(wal_path) else 0
+    return os.stat(database_file_path).st_mtime_ns, wal_mtime
+
+
+def get_dictionary(database_file_path: str, hash_count: Optional[int] = None) -> Optional[DehashSource]:
+    """
+    The shared dictionary for a database, loaded on first use. None if the database does not exist.
+    A compiled dictionary next to the database is mapped instead, as long as it is not older than the database
+    and its write-ahead log.
+    Without either, resolving only 'hash_count' hashes, up to BULK_QUERY_LIMIT, queries the database for them
+    rather than loading the whole table.
+    A database written to since its dictionary was loaded is loaded again.
+    """
+    database_file_path = os.path.abspath(database_file_path)
+    if not os.path.exists(database_file_path):
+        return None
+    stamp: Tuple[int, int] = get_stamp(database_file_path)
+    if database_file_path not in _dictionaries or _dictionaries[database_file_path][0] != stamp:
+        dictionary_path: str = compiled_path(database_file_path)
+        dictionary: DehashSource
+        if os.path.exists(dictionary_path) and os.stat(dictionary_path).st_mtime_ns >= max(stamp):
+            dictionary = MappedDictionary(dictionary_path)
+        elif hash_count is not None and hash_count <= BULK_QUERY_LIMIT:
+            # Not kept, a later and larger lookup still loads the table once
+            return DatabaseDictionary(database_file_path)
+        else:
+            dictionary = HashDictionary.from_database(database_file_path)
+        
+        if database_file_path in _dictionaries and isinstance(_dictionaries[database_file_path][1], MappedDictionary):
+            _dictionaries[database_file_path][1].close()
+        _dictionaries[database_file_path] = (stamp, dictionary)
+    return _dictionaries[database_file_path][1]
+
+
+# main
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Compile a hash dictionary file from a database")
+    parser.add_argument("db", type=str, help="database with a properties table")
+    parser.add_argument("--out", type=str, default="", help=f"defaults to the database path with {COMPILED_EXTENSION}")
+    args = parser.parse_args()
+    
+    print(f"Compiled {compile_dictionary(args.db, args.out)}")
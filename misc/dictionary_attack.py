@@ -0,0 +1,265 @@
+"""
+Dictionary attack on unknown property hashes.
+Candidates from wordlists, prefixes/suffixes and case permutations are hashed across all cores,
+matches are stored in the properties table as they are found.
+"""
+
+
+# imports
+import argparse as ap
+import hashlib
+import multiprocessing as mp
+import os.path
+import re
+import sqlite3 as sql
+import time
+import xml.etree.ElementTree as et
+from typing import List, Set, Dict, Iterator, Iterable, Tuple, Optional
+
+from misc import utils as u
+from misc.hash_functions import hash_jenkins_many, to_signed
+
+
+# settings
+CHUNK_SIZE: int = 256  # Base words per task
+BATCH_SIZE: int = 16384  # Candidates hashed per hash_jenkins_many call
+SEPARATORS: List[str] = ["", "_"]
+
+WORD_PARTS = re.compile(r"[A-Z]+(?=[A-Z][a-z]|[0-9]|$)|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+# Per-process state, set once by init_worker
+_words: List[str] = []
+_prefixes: List[str] = [""]
+_suffixes: List[str] = [""]
+_targets: Set[int] = set()
+_depth: int = 1
+
+
+# candidates
+def split_words(word: str) -> List[str]:
+    """ 'spawnPoint_ID2' -> ['spawn', 'Point', 'ID', '2'] """
+    parts: List[str] = []
+    for piece in re.split(r"[_\-\s.]+", word):
+        parts.extend(WORD_PARTS.findall(piece))
+    return parts
+
+
+def word_forms(word: str) -> Set[str]:
+    """ Case and separator permutations of a single word or phrase. """
+    parts: List[str] = split_words(word)
+    if len(parts) == 0:
+        return {word}
+    
+    lower: List[str] = [part.lower() for part in parts]
+    capital: List[str] = [part.capitalize() for part in lower]
+    return {
+        word,
+        word.lower(),
+        "".join(lower),
+        "_".join(lower),
+        "".join(capital),
+        "_".join(capital),
+        lower[0] + "".join(capital[1:]),
+        "_".join(parts),
+        "".join(parts),
+    }
+
+
+def generate_candidates(base_words: Iterable[str], words: List[str], prefixes: List[str], suffixes: List[str],
+                        depth: int = 1) -> Iterator[str]:
+    """ Every prefix + permutation + suffix for each base word, optionally combined with a second word. """
+    for word in base_words:
+        phrases: List[str] = [word]
+        if depth > 1:
+            phrases.extend(f"{word}{sep}{other}" for other in words for sep in SEPARATORS)
+        
+        for phrase in phrases:
+            for form in word_forms(phrase):
+                for prefix in prefixes:
+                    for suffix in suffixes:
+                        yield f"{prefix}{form}{suffix}"
+
+
+# io
+def load_lines(file_path: str) -> List[str]:
+    """ Unique, non-empty lines in file order. Lines that are not valid UTF-8 are skipped, not altered. """
+    if file_path == "":
+        return []
+    lines: Dict[str, None] = {}
+    with open(file_path, "rb") as f:
+        for raw_line in f:
+            try:
+                line: str = raw_line.decode("utf-8").strip()
+            except UnicodeDecodeError:
+                continue
+            if line:
+                lines[line] = None
+    return list(lines)
+
+
+def load_targets(path: str, decimal: bool = False) -> Set[int]:
+    """
+    Hashes to resolve. Either a text file of hashes or an exported XML / folder of exported XMLs,
+    where every node with an empty name is a target.
+    Hashes in a text file are XML-style hex like in the exports, even when all digits, or 0x-prefixed hex.
+    Plain numbers are only read as decimal with 'decimal' set.
+    """
+    targets: Set[int] = set()
+    xml_paths: List[str] = []
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            xml_paths.extend(os.path.join(root, name) for name in files if name.endswith(".xml"))
+    elif path.endswith(".xml"):
+        xml_paths.append(path)
+    else:
+        for line in load_lines(path):
+            if line.lower().startswith("0x"):
+                targets.add(to_signed(int(line, 16)))
+            elif decimal:
+                targets.add(to_signed(int(line) & 0xFFFFFFFF))
+            else:
+                targets.add(u.safe_dehex(line, fmt='i'))
+    
+    for xml_path in xml_paths:
+        for _, elem in et.iterparse(xml_path):
+            if elem.attrib.get("name", None) == "" and "hash" in elem.attrib:
+                targets.add(u.safe_dehex(elem.attrib["hash"], fmt='i'))
+            elem.clear()
+    
+    return targets
+
+
+def get_fingerprint(targets: Set[int], words: List[str], prefixes: List[str], suffixes: List[str],
+                    depth: int) -> str:
+    """ Chunk numbers only mean the same candidates for the same inputs. """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{CHUNK_SIZE}:{depth}:{','.join(map(str, sorted(targets)))}".encode("utf-8"))
+    for values in [words, prefixes, suffixes]:
+        digest.update(f"{len(values)}\n".encode("utf-8"))
+        digest.update("\n".join(values).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_completed(state_path: str, fingerprint: str) -> Optional[Set[int]]:
+    """ Chunks finished by a previous run of the same inputs, None when the state is of other inputs. """
+    if not os.path.exists(state_path):
+        return set()
+    with open(state_path, "r") as f:
+        if f.readline().strip() != f"fingerprint {fingerprint}":
+            return None
+        return {int(line) for line in f if line.strip().isdigit()}
+
+
+def store_matches(conn: sql.Connection, matches: Dict[int, str]):
+    """ Hashes already stored in either their signed or unsigned form are left as they are. """
+    rows: List[Tuple[int, str]] = [
+        (name_hash, name) for name_hash, name in matches.items()
+        if conn.execute("SELECT 1 FROM properties WHERE hash IN (?, ?)",
+                        (name_hash, name_hash & 0xffffffff)).fetchone() is None
+    ]
+    conn.executemany("INSERT OR IGNORE INTO properties(hash, value) VALUES (?, ?)", rows)
+    conn.commit()
+
+
+# workers
+def init_worker(words: List[str], prefixes: List[str], suffixes: List[str], targets: Set[int], depth: int):
+    global _words, _prefixes, _suffixes, _targets, _depth
+    _words, _prefixes, _suffixes, _targets, _depth = words, prefixes, suffixes, targets, depth
+
+
+def attack_chunk(chunk: int) -> Tuple[int, Dict[int, str], int]:
+    """ Hash every candidate built from one chunk of base words. """
+    base_words: List[str] = _words[chunk * CHUNK_SIZE:(chunk + 1) * CHUNK_SIZE]
+    matches: Dict[int, str] = {}
+    hashed: int = 0
+    batch: List[str] = []
+    for candidate in generate_candidates(base_words, _words, _prefixes, _suffixes, _depth):
+        batch.append(candidate)
+        if len(batch) >= BATCH_SIZE:
+            hashed += check_batch(batch, matches)
+            batch = []
+    hashed += check_batch(batch, matches)
+    
+    return chunk, matches, hashed
+
+
+def check_batch(batch: List[str], matches: Dict[int, str]) -> int:
+    for candidate, value in zip(batch, hash_jenkins_many(batch)):
+        if value in _targets:
+            matches.setdefault(value, candidate)
+    return len(batch)
+
+
+# functions
+def dictionary_attack(database_file_path: str, targets: Set[int], words: List[str], prefixes: List[str],
+                      suffixes: List[str], state_path: str, depth: int = 1, processes: int = 0) -> Dict[int, str]:
+    """
+    Resolve as many target hashes as possible. Completed chunks are logged to 'state_path' for resuming,
+    under a fingerprint of the inputs. A state of other inputs is started over.
+    """
+    prefixes = [""] + [prefix for prefix in prefixes if prefix != ""]
+    suffixes = [""] + [suffix for suffix in suffixes if suffix != ""]
+    chunk_count: int = (len(words) + CHUNK_SIZE - 1) // CHUNK_SIZE
+    fingerprint: str = get_fingerprint(targets, words, prefixes, suffixes, depth)
+    completed: Optional[Set[int]] = load_completed(state_path, fingerprint)
+    if completed is None:
+        print(f"'{state_path}' is the progress of other inputs, starting over")
+        completed = set()
+    if len(completed) == 0:
+        with open(state_path, "w") as state:
+            state.write(f"fingerprint {fingerprint}\n")
+    pending: List[int] = [chunk for chunk in range(chunk_count) if chunk not in completed]
+    
+    conn: sql.Connection = sql.connect(database_file_path)
+    # Targets are signed, the table holds a mix of signed and unsigned values
+    known: Set[int] = {to_signed(row[0] & 0xffffffff) for row in conn.execute("SELECT hash FROM properties")}
+    targets = {target for target in targets if target not in known}
+    print(f"Targets: {len(targets)}, words: {len(words)}, chunks: {len(pending)}/{chunk_count} remaining")
+    
+    found: Dict[int, str] = {}
+    if len(targets) == 0 or len(pending) == 0:
+        conn.close()
+        return found
+    
+    start: float = time.perf_counter()
+    hashed: int = 0
+    processes = processes or os.cpu_count() or 1
+    with mp.Pool(processes, initializer=init_worker, initargs=(words, prefixes, suffixes, targets, depth)) as pool, \
+            open(state_path, "a") as state:
+        for i, (chunk, matches, count) in enumerate(pool.imap_unordered(attack_chunk, pending)):
+            new: Dict[int, str] = {k: v for k, v in matches.items() if k not in found}
+            if len(new) > 0:
+                store_matches(conn, new)
+                found.update(new)
+                for value, name in new.items():
+                    print(f"{u.safe_hex(value, fmt='i')} = {name}")
+            state.write(f"{chunk}\n")
+            state.flush()
+            
+            hashed += count
+            elapsed: float = time.perf_counter() - start
+            print(f"[{i + 1}/{len(pending)}] {hashed} hashed, {hashed / elapsed:,.0f} hashes/s, "
+                  f"{len(found)}/{len(targets)} found")
+    
+    conn.close()
+    return found
+
+
+# main
+if __name__ == "__main__":
+    parser = ap.ArgumentParser(description="Dictionary attack on unknown property hashes")
+    parser.add_argument("targets", type=str, help="hash list, exported XML or folder of exported XMLs")
+    parser.add_argument("words", type=str, nargs="+", help="wordlist files")
+    parser.add_argument("--db", type=str, default=os.path.abspath("./dbs/global.db"))
+    parser.add_argument("--prefixes", type=str, default="", help="file of prefixes, one per line")
+    parser.add_argument("--suffixes", type=str, default="", help="file of suffixes, one per line")
+    parser.add_argument("--depth", type=int, default=1, help="2 to also try every pair of words")
+    parser.add_argument("--processes", type=int, default=0)
+    parser.add_argument("--state", type=str, default="", help="progress file used to resume, per wordlist")
+    parser.add_argument("--decimal", action="store_true", help="plain numbers in the hash list are decimal")
+    args = parser.parse_args()
+    
+    all_words: List[str] = list(dict.fromkeys(word for path in args.words for word in load_lines(path)))
+    dictionary_attack(args.db, load_targets(args.targets, args.decimal), all_words, load_lines(args.prefixes),
+                      load_lines(args.suffixes), args.state or f"{args.words[0]}.progress", args.depth,
+                      args.processes)
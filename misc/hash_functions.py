@@ -5,7 +5,19 @@ Ash Hamilton
 """
 
 
+# imports
+import struct
+from typing import Union, Iterable, List, Dict
+
+try:
+    import numpy as np
+except ImportError:
+    # hash_jenkins_many falls back to hash_little per name
+    np = None
+
+
 # big boi hash jenkins
+# Reference implementation, superseded by hash_little but kept to check and benchmark against
 def mix_01(a, b, c):
     a &= 0xffffffff
     b &= 0xffffffff
@@ -195,20 +207,163 @@ def ord_to_array(data_array):
     return data_array
 
 
-def hash_jenkins(in_data):
-    input_array = split_to_array(in_data)
-    input_ready = ord_to_array(input_array)
+# fast hash jenkins
+M32: int = 0xffffffff
+
+
+def hash_little(data: bytes, seed: int = 0) -> int:
+    """
+    Jenkins lookup3 'hashlittle' over bytes, unsigned result.
+    Matches 'main' above, including the final mix on empty input.
+    """
+    length: int = len(data)
+    a = b = c = (0xDEADBEEF + length + seed) & M32
+    
+    # Every 12-byte block except the last is mixed, the last (possibly partial) block is zero-padded
+    blocks: int = max(0, (length - 1) // 12)
+    tail: bytes = data[blocks * 12:].ljust(12, b"\00")
+    words = struct.unpack_from(f"<{blocks * 3 + 3}I", data[:blocks * 12] + tail)
+    
+    for i in range(0, blocks * 3, 3):
+        a = (a + words[i]) & M32
+        b = (b + words[i + 1]) & M32
+        c = (c + words[i + 2]) & M32
+        
+        a = (a - c) & M32
+        a ^= ((c << 4) | (c >> 28)) & M32
+        c = (c + b) & M32
+        b = (b - a) & M32
+        b ^= ((a << 6) | (a >> 26)) & M32
+        a = (a + c) & M32
+        c = (c - b) & M32
+        c ^= ((b << 8) | (b >> 24)) & M32
+        b = (b + a) & M32
+        a = (a - c) & M32
+        a ^= ((c << 16) | (c >> 16)) & M32
+        c = (c + b) & M32
+        b = (b - a) & M32
+        b ^= ((a << 19) | (a >> 13)) & M32
+        a = (a + c) & M32
+        c = (c - b) & M32
+        c ^= ((b << 4) | (b >> 28)) & M32
+        b = (b + a) & M32
+    
+    a = (a + words[-3]) & M32
+    b = (b + words[-2]) & M32
+    c = (c + words[-1]) & M32
+    
+    c ^= b
+    c = (c - (((b << 14) | (b >> 18)) & M32)) & M32
+    a ^= c
+    a = (a - (((c << 11) | (c >> 21)) & M32)) & M32
+    b ^= a
+    b = (b - (((a << 25) | (a >> 7)) & M32)) & M32
+    c ^= b
+    c = (c - (((b << 16) | (b >> 16)) & M32)) & M32
+    a ^= c
+    a = (a - (((c << 4) | (c >> 28)) & M32)) & M32
+    b ^= a
+    b = (b - (((a << 14) | (a >> 18)) & M32)) & M32
+    c ^= b
+    c = (c - (((b << 24) | (b >> 8)) & M32)) & M32
+    
+    return c
+
+
+def _rot(x, k: int):
+    return (x << np.uint32(k)) | (x >> np.uint32(32 - k))
+
+
+def _hash_little_numpy(values: List[bytes], length: int):
+    """ Vectorized hash_little over many inputs of the same length. """
+    blocks: int = max(0, (length - 1) // 12)
+    padded: int = (blocks + 1) * 12
+    buffer: bytes = b"".join(value.ljust(padded, b"\00") for value in values)
+    words = np.frombuffer(buffer, dtype="<u4").reshape(len(values), padded // 4).astype(np.uint32)
+    
+    a = np.full(len(values), (0xDEADBEEF + length) & M32, dtype=np.uint32)
+    b = a.copy()
+    c = a.copy()
+    for i in range(0, blocks * 3, 3):
+        a += words[:, i]
+        b += words[:, i + 1]
+        c += words[:, i + 2]
+        
+        a -= c
+        a ^= _rot(c, 4)
+        c += b
+        b -= a
+        b ^= _rot(a, 6)
+        a += c
+        c -= b
+        c ^= _rot(b, 8)
+        b += a
+        a -= c
+        a ^= _rot(c, 16)
+        c += b
+        b -= a
+        b ^= _rot(a, 19)
+        a += c
+        c -= b
+        c ^= _rot(b, 4)
+        b += a
     
-    input_len = len(input_ready)
+    a += words[:, -3]
+    b += words[:, -2]
+    c += words[:, -1]
     
-    output_uint = main(input_ready, 0, input_len, 0)
+    c ^= b
+    c -= _rot(b, 14)
+    a ^= c
+    a -= _rot(c, 11)
+    b ^= a
+    b -= _rot(a, 25)
+    c ^= b
+    c -= _rot(b, 16)
+    a ^= c
+    a -= _rot(c, 4)
+    b ^= a
+    b -= _rot(a, 14)
+    c ^= b
+    c -= _rot(b, 24)
+    
+    return c
+
+
+def to_signed(value: int) -> int:
+    """ Unsigned 32-bit hash to the signed form stored in the database. """
+    return value - 0x100000000 if value > 0x7fffffff else value
+
+
+def hash_jenkins(in_data: Union[str, bytes]):
+    if isinstance(in_data, str):
+        in_data = in_data.encode("utf-8")
+    output_uint = hash_little(in_data)
     output_hex = hex(output_uint)
     
-    output_int = int(output_hex, 16)
-    if output_int > 0x7fffffff:
-        output_int -= 0x100000000
+    return to_signed(output_uint), output_hex
+
+
+def hash_jenkins_many(values: Iterable[Union[str, bytes]]) -> List[int]:
+    """
+    Signed hashes for many strings at once.
+    With NumPy installed inputs are bucketed by length and each bucket is hashed in one vectorized pass.
+    """
+    encoded: List[bytes] = [value.encode("utf-8") if isinstance(value, str) else value for value in values]
+    if np is None:
+        return [to_signed(hash_little(value)) for value in encoded]
+    
+    buckets: Dict[int, List[int]] = {}
+    for i, value in enumerate(encoded):
+        buckets.setdefault(len(value), []).append(i)
+    
+    results: List[int] = [0] * len(encoded)
+    for length, indices in buckets.items():
+        hashes = _hash_little_numpy([encoded[i] for i in indices], length).astype(np.int32).tolist()
+        for i, value in zip(indices, hashes):
+            results[i] = value
     
-    return output_int, output_hex
+    return results
 
 
 def format_hash_jenkins(hash_int, hash_hex):
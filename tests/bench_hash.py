@@ -0,0 +1,47 @@
+"""
+Benchmark for the Jenkins hash functions
+"""
+
+
+# imports
+import random
+import string
+import time
+
+from misc.hash_functions import hash_jenkins, hash_jenkins_many, main, split_to_array, ord_to_array, np
+
+
+# config
+WORD_COUNT: int = 200000
+
+
+# functions
+def hash_jenkins_reference(in_data: str) -> int:
+    """ The list-of-ords path hash_jenkins used before hash_little. """
+    input_ready = ord_to_array(split_to_array(in_data))
+    return main(input_ready, 0, len(input_ready), 0)
+
+
+def make_words(count: int = WORD_COUNT):
+    rng = random.Random(0)
+    alphabet: str = string.ascii_letters + string.digits + "_"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(4, 40))) for _ in range(count)]
+
+
+def timed(name: str, func, words, baseline: float = 0.0) -> float:
+    start: float = time.perf_counter()
+    func(words)
+    elapsed: float = time.perf_counter() - start
+    speedup: str = f" ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{name:>24}: {elapsed:7.2f} s, {len(words) / elapsed / 1e6:6.2f} M hashes/s{speedup}")
+    return elapsed
+
+
+# main
+if __name__ == "__main__":
+    words = make_words()
+    print(f"{len(words)} words, NumPy {'available' if np is not None else 'not installed'}")
+    
+    baseline: float = timed("reference hash_jenkins", lambda w: [hash_jenkins_reference(x) for x in w], words)
+    timed("hash_jenkins", lambda w: [hash_jenkins(x) for x in w], words, baseline)
+    timed("hash_jenkins_many", hash_jenkins_many, words, baseline)
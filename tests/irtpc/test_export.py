@@ -0,0 +1,79 @@
+"""
+IRTPC streamed XML export against the Element and utils.indent export it replaced
+"""
+
+
+# imports
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as et
+
+from formats.inline_runtime.v1.irtpc_v1 import IRTPC_v1
+from misc import utils
+
+
+# config
+VALUES = {
+    "uint32": "4294967295",
+    "f32": "1.5",
+    "str": "CRigidObject <&> \"quoted\"",
+    "vec2": "1.0,2.0",
+    "vec3": "1.0,2.0,3.0",
+    "vec4": "1.0,2.0,3.0,4.0",
+    "mat3x4": "1.0,0.0,0.0 0.0,1.0,0.0 0.0,0.0,1.0 4.0,5.0,6.0",
+    "event": "0x00000010=0x0000001A, 0x00000001=0x00000002",
+}
+
+
+# functions
+def build_irtpc(folder: str) -> str:
+    """ A small IRTPC with every property type, serialized from XML. """
+    root = et.Element("irtpc", extension="bin", version="1", version_02="4")
+    objects = et.SubElement(root, "root", unk01="1", unk02="4")
+    for i in range(3):
+        container = et.SubElement(objects, "container", hash=f"{i + 1:08X}", name="", unk01="1", unk02="4")
+        for j, (meta_type, text) in enumerate(VALUES.items()):
+            prop = et.SubElement(container, "property", hash=f"{i:02X}{j:06X}", type=meta_type, name="")
+            prop.text = text
+    
+    irtpc = IRTPC_v1(os.path.join(folder, "test.xml"), "-")
+    irtpc.import_(root=root)
+    irtpc.extension = "bin"
+    irtpc.serialize()
+    return os.path.join(folder, "test.bin")
+
+
+def export_elements(irtpc: IRTPC_v1, file_path: str):
+    """ The export as it was before it was streamed. """
+    root = et.Element("irtpc")
+    root.attrib["extension"] = irtpc.extension
+    root.attrib["version"] = str(irtpc.header.version_01)
+    root.attrib["version_02"] = str(irtpc.header.version_02)
+    root.append(irtpc.container.export())
+    utils.indent(root)
+    et.ElementTree(root).write(file_path, encoding="utf-8", xml_declaration=True)
+
+
+# class
+class TestExport(unittest.TestCase):
+    def test_matches_element_export(self):
+        with tempfile.TemporaryDirectory() as folder:
+            irtpc = IRTPC_v1(build_irtpc(folder), "-")
+            irtpc.get_header()
+            irtpc.load()
+            irtpc.resolve_names()
+            # Names that need escaping in attributes
+            irtpc.container.objects[0].name = "a<&>\"b\tc"
+            irtpc.container.objects[0].objects[0].name = "name\r\n"
+            
+            streamed: str = os.path.join(folder, "streamed.xml")
+            elements: str = os.path.join(folder, "elements.xml")
+            irtpc.export(file_path=streamed)
+            export_elements(irtpc, elements)
+            with open(streamed, "rb") as a, open(elements, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+"""
+Testing package for the database and dehash tools
+"""
+
+
+# imports
+import sqlite3 as sql
+from typing import Dict
+
+
+# config
+# Same schema as dbs/global.db
+SCHEMA: str = """
+CREATE TABLE properties (
+    ID INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT UNIQUE,
+    Hash INTEGER NOT NULL,
+    Value TEXT NOT NULL
+);
+CREATE UNIQUE INDEX hash_index ON properties(hash);
+"""
+
+
+# functions
+def create_database(file_path: str, names: Dict[int, str]) -> str:
+    """ A properties database holding 'names', hashes stored as given. """
+    conn: sql.Connection = sql.connect(file_path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO properties(hash, value) VALUES (?, ?)", names.items())
+    conn.commit()
+    conn.close()
+    return file_path
@@ -0,0 +1,58 @@
+"""
+Wordlists added to the properties table in chunks
+"""
+
+
+# imports
+import os
+import sqlite3 as sql
+import tempfile
+import unittest
+from typing import List, Tuple
+
+from misc.database import add_file_to_database
+from misc.hash_functions import hash_jenkins
+from tests.misc import create_database
+
+
+# config
+# Its hash is negative, stored below in unsigned form
+EXISTING: str = "abcdefg"
+WORDS: List[bytes] = [b"health", b"abcdefg", b"bad\xff\xfeword", b"speed", b"health", b"radius"]
+
+
+# class
+class TestAddFile(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.hash: int = hash_jenkins(EXISTING)[0]
+        self.assertLess(self.hash, 0)
+        self.db: str = create_database(os.path.join(self.folder.name, "test.db"), {self.hash & 0xFFFFFFFF: "old"})
+        self.words: str = os.path.join(self.folder.name, "words.txt")
+        with open(self.words, "wb") as f:
+            f.write(b"\n".join(WORDS) + b"\n\n")
+    
+    def tearDown(self):
+        self.folder.cleanup()
+    
+    def rows(self) -> List[Tuple[int, str]]:
+        conn: sql.Connection = sql.connect(self.db)
+        rows: List[Tuple[int, str]] = conn.execute("SELECT hash, value FROM properties ORDER BY value").fetchall()
+        conn.close()
+        return rows
+    
+    def test_add(self):
+        # Chunks of two, the duplicate 'health' lands in another chunk than the first
+        self.assertEqual(add_file_to_database(self.db, self.words, chunk_size=2), 3)
+        expected = [(hash_jenkins(name)[0], name) for name in ["health", "radius", "speed"]]
+        self.assertEqual(self.rows(), sorted(expected + [(self.hash & 0xFFFFFFFF, "old")], key=lambda row: row[1]))
+    
+    def test_replace(self):
+        with open(self.words, "wb") as f:
+            f.write(b"abcdefg\n")
+        self.assertEqual(add_file_to_database(self.db, self.words, replace=True), 1)
+        self.assertEqual(self.rows(), [(self.hash & 0xFFFFFFFF, EXISTING)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Dehash sources, every form of the dictionary resolves the same names
+"""
+
+
+# imports
+import os
+import sqlite3 as sql
+import tempfile
+import unittest
+from typing import Dict, List
+
+from misc import dehash
+from misc.hash_functions import hash_jenkins
+from tests.misc import create_database
+
+
+# config
+NAMES: List[str] = [f"name_{i}" for i in range(1000)] + ["health", "abcdefg", "élément"]
+
+
+# functions
+def stored_names() -> Dict[int, str]:
+    """ Every other name stored under its unsigned hash, the way the table mixes both forms. """
+    names: Dict[int, str] = {}
+    for i, name in enumerate(NAMES):
+        name_hash: int = hash_jenkins(name)[0]
+        names[name_hash & 0xFFFFFFFF if i % 2 else name_hash] = name
+    return names
+
+
+# class
+class DehashCase(unittest.TestCase):
+    """ Lookups are made with the signed hashes of a parsed tree. """
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.stored: Dict[int, str] = stored_names()
+        self.expected: Dict[int, str] = {hash_jenkins(name)[0]: name for name in NAMES}
+        self.unknown: List[int] = [hash_jenkins(f"unknown_{i}")[0] for i in range(10)]
+        self.assertTrue(any(name_hash < 0 for name_hash in self.expected))
+    
+    def tearDown(self):
+        dehash.close_connections()
+        self.folder.cleanup()
+    
+    def check(self, dictionary):
+        self.assertEqual(dictionary.lookup_many(list(self.expected) + self.unknown), self.expected)
+        for name_hash, name in list(self.expected.items())[::97]:
+            self.assertEqual(dictionary.get(name_hash), name)
+        self.assertEqual(dictionary.get(self.unknown[0], "?"), "?")
+
+
+class TestHashDictionary(DehashCase):
+    def test_names(self):
+        dictionary = dehash.HashDictionary(self.stored)
+        self.assertEqual(len(dictionary), len(NAMES))
+        self.check(dictionary)
+    
+    def test_from_database(self):
+        db: str = create_database(os.path.join(self.folder.name, "test.db"), self.stored)
+        self.check(dehash.HashDictionary.from_database(db))
+
+
+class TestDatabaseDictionary(DehashCase):
+    def test_chunks(self):
+        self.assertGreater(len(self.expected) + len(self.unknown), 2 * dehash.DatabaseDictionary.CHUNK_SIZE)
+        db: str = create_database(os.path.join(self.folder.name, "test.db"), self.stored)
+        self.check(dehash.DatabaseDictionary(db))
+    
+    def test_small_lookups(self):
+        db: str = create_database(os.path.join(self.folder.name, "test.db"), self.stored)
+        try:
+            self.assertIsInstance(dehash.get_dictionary(db, dehash.BULK_QUERY_LIMIT), dehash.DatabaseDictionary)
+            self.assertIsInstance(dehash.get_dictionary(db, dehash.BULK_QUERY_LIMIT + 1), dehash.HashDictionary)
+        finally:
+            dehash._dictionaries.pop(os.path.abspath(db), None)
+
+
+class TestMappedDictionary(DehashCase):
+    def test_compile(self):
+        path: str = os.path.join(self.folder.name, "test.hdict")
+        dehash.MappedDictionary.compile(self.stored, path)
+        dictionary = dehash.MappedDictionary(path)
+        try:
+            self.assertEqual(len(dictionary), len(NAMES))
+            self.check(dictionary)
+            # Keyed by the hashes as given, unsigned ones resolve too
+            unsigned: Dict[int, str] = {name_hash & 0xFFFFFFFF: name for name_hash, name in self.expected.items()}
+            self.assertEqual(dictionary.lookup_many(unsigned), unsigned)
+        finally:
+            dictionary.close()
+    
+    def test_compile_database(self):
+        db: str = create_database(os.path.join(self.folder.name, "test.db"), self.stored)
+        dictionary = dehash.MappedDictionary(dehash.compile_dictionary(db))
+        try:
+            self.check(dictionary)
+        finally:
+            dictionary.close()
+    
+    def test_not_a_dictionary(self):
+        path: str = os.path.join(self.folder.name, "test.hdict")
+        with open(path, "wb") as f:
+            f.write(b"RTPC" + bytes(8))
+        with self.assertRaises(ValueError):
+            dehash.MappedDictionary(path)
+
+
+class TestGetDictionary(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path: str = create_database(os.path.join(self.folder.name, "test.db"), {1: "one"})
+    
+    def tearDown(self):
+        dehash.close_connections()
+        dehash._dictionaries.pop(os.path.abspath(self.path), None)
+        self.folder.cleanup()
+    
+    def test_write_ahead_log(self):
+        dehash.compile_dictionary(self.path)
+        compiled = dehash.get_dictionary(self.path)
+        self.assertIsInstance(compiled, dehash.MappedDictionary)
+        
+        # Written through the log only, the database file itself is left as it was
+        conn: sql.Connection = sql.connect(self.path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("INSERT INTO properties(hash, value) VALUES (2, 'two')")
+        conn.commit()
+        # Compiled after the last change to the database file, but before the log was written
+        os.utime(self.path, ns=(0, 0))
+        os.utime(dehash.compiled_path(self.path), ns=(1, 1))
+        try:
+            dictionary = dehash.get_dictionary(self.path)
+            self.assertIsInstance(dictionary, dehash.HashDictionary)
+            self.assertEqual(dictionary.get(2), "two")
+            self.assertTrue(compiled.buffer.closed)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
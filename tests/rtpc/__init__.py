@@ -3,12 +3,60 @@ Testing package for RTPC files
 """
 
 
+# imports
+import io
+import os.path
+from typing import List, Tuple
+
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, RT_Header_v1, RT_Property_v1, RT_MetaType_v1
+
+
 # config
 BASE_PATH: str = "E:/Projects/Just Cause Tools/Apex Engine Tools"
 RTPC_v1_FILE_PATH: str = f"{BASE_PATH}/tests/rtpc/jc3/tests/rtpc/jc3/global.blo"
+# Every property type in nested containers, sample.blo was written from sample.xml by the baseline writer
+SAMPLE_XML: str = os.path.join(os.path.dirname(__file__), "data", "sample.xml")
+SAMPLE_BLO: str = os.path.join(os.path.dirname(__file__), "data", "sample.blo")
+
+
+# functions
+def describe(root: RT_Container_v1) -> List[Tuple]:
+    """ Every container in depth-first order, with the XML text of its properties. Deep trees do not recurse. """
+    nodes: List[Tuple] = []
+    stack: List[Tuple[Tuple[int, ...], RT_Container_v1]] = [((), root)]
+    while len(stack) > 0:
+        path, container = stack.pop()
+        path = path + (container.name_hash,)
+        properties = [(prop.name_hash, prop.type, prop.export_text()) for prop in container.properties]
+        nodes.append((path, properties))
+        stack.extend((path, child) for child in reversed(container.containers))
+    return nodes
+
+
+def build_deep(depth: int) -> bytes:
+    """ An RTPC of 'depth' nested containers, each with a string and a uint32. """
+    root = RT_Container_v1()
+    root.name_hash = 0
+    container: RT_Container_v1 = root
+    for i in range(depth):
+        child = RT_Container_v1()
+        child.name_hash = i + 1
+        child.add_property(RT_Property_v1(1, 0, RT_MetaType_v1.String, f"level_{i}".encode("utf-8")))
+        child.add_property(RT_Property_v1(2, i, RT_MetaType_v1.UInteger32, i))
+        container.add_container(child)
+        container = child
+    
+    rtpc = RTPC_v1()
+    rtpc.header = RT_Header_v1()
+    rtpc.container = root
+    stream = io.BytesIO()
+    rtpc.serialize(stream=stream)
+    return stream.getvalue()
 
 
 # main
 if __name__ == "__main__":
     pass
 
+# TODO: Proper unit tests
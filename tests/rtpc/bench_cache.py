@@ -0,0 +1,50 @@
+"""
+Tree cache benchmark, parsing and dehashing an RTPC against serving it from its cache entry
+    python -m tests.rtpc.bench_cache [db_path]
+"""
+
+
+# imports
+import os
+import sys
+import tempfile
+import time
+
+from formats.cache import TreeCache
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from tests.rtpc.bench_seeks import build_rtpc
+
+
+# config
+CONTAINER_COUNT: int = 20000
+RUNS: int = 3
+
+
+# main
+if __name__ == "__main__":
+    db_path: str = sys.argv[1] if len(sys.argv) > 1 else "-"
+    data: bytes = build_rtpc(CONTAINER_COUNT)
+    
+    with tempfile.TemporaryDirectory() as folder:
+        path: str = os.path.join(folder, "bench.blo")
+        with open(path, "wb") as f:
+            f.write(data)
+        cache: TreeCache = TreeCache(os.path.join(folder, "cache"))
+        
+        timings = {"parse": [], "miss": [], "hit": []}
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            rtpc: RTPC_v1 = RTPC_v1(path, db_path)
+            rtpc.load()
+            rtpc.resolve_names()
+            timings["parse"].append(time.perf_counter() - start)
+        for kind in ["miss", "hit", "hit"]:
+            start = time.perf_counter()
+            cache.load_file(RTPC_v1(path, db_path))
+            timings[kind].append(time.perf_counter() - start)
+        
+        entry_size: int = sum(os.path.getsize(os.path.join(cache.directory, name))
+                              for name in os.listdir(cache.directory))
+        print(f"{len(data) / 1024 / 1024:.1f} MiB file, {entry_size / 1024 / 1024:.1f} MiB cache entry")
+        for kind, seconds in timings.items():
+            print(f"{kind:>6}: {min(seconds):6.2f} s")
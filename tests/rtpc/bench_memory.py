@@ -0,0 +1,65 @@
+"""
+Peak memory benchmark for loading an RTPC
+
+Each checkout is measured in its own process, pass the path of an older checkout to compare against it:
+    python -m tests.rtpc.bench_memory [baseline_checkout]
+Peak RSS comes from resource.getrusage, so Unix only.
+"""
+
+
+# imports
+import random
+import struct
+from typing import List
+
+from formats.runtime.v1.rtpc_v1_types import RT_MetaType_v1
+from tests.rtpc.checkouts import run_in_checkout, compare_checkouts
+
+
+# config
+CONTAINER_COUNT: int = 2000
+PROPERTIES_PER_CONTAINER: int = 250
+
+MEASURE: str = """
+import resource, sys, time
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+rtpc = RTPC_v1(sys.argv[1], "-")
+rtpc.load()
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(f"{(peak - before) / 1024:.1f} {elapsed:.2f}")
+"""
+
+
+# functions
+def build_rtpc(container_count: int = CONTAINER_COUNT, property_count: int = PROPERTIES_PER_CONTAINER) -> bytes:
+    """ A root holding many containers of simple properties, the shape of a large world file. """
+    rng = random.Random(0)
+    simple_types: List[int] = [RT_MetaType_v1.UInteger32, RT_MetaType_v1.Float32]
+    
+    root_data: int = 8 + 12
+    children: bytearray = bytearray()
+    blocks: bytearray = bytearray()
+    block_offset: int = root_data + container_count * 12
+    for i in range(container_count):
+        children += struct.pack("<iIHH", i, block_offset + len(blocks), property_count, 0)
+        for j in range(property_count):
+            meta_type: int = rng.choice(simple_types)
+            blocks += struct.pack("<iIB", rng.getrandbits(31), rng.getrandbits(32) & 0x3fffffff, meta_type)
+        blocks += b"P" * ((4 - len(blocks) % 4) % 4)
+    
+    buffer = bytearray(b"RTPC" + struct.pack("<I", 1))
+    buffer += struct.pack("<iIHH", 0, root_data, 0, container_count)
+    return bytes(buffer + children + blocks)
+
+
+def measure(checkout: str, file_path: str) -> str:
+    peak_mib, seconds = run_in_checkout(checkout, MEASURE, file_path)
+    return f"{float(peak_mib):8.1f} MiB peak, {float(seconds):6.2f} s"
+
+
+# main
+if __name__ == "__main__":
+    compare_checkouts(build_rtpc(), f"{CONTAINER_COUNT * PROPERTIES_PER_CONTAINER} properties", measure)
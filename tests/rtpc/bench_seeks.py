@@ -0,0 +1,102 @@
+"""
+Seek benchmark for loading an RTPC from a regular file
+
+The file is read through a buffered reader over a raw file that counts the seeks and reads reaching the OS,
+the access pattern a cold page cache or a network mount pays for. Pass older checkouts to compare against them:
+    python -m tests.rtpc.bench_seeks [baseline_checkout ...]
+"""
+
+
+# imports
+import io
+import random
+from typing import List
+
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_Header_v1, RT_Container_v1, RT_Property_v1, RT_MetaType_v1
+from tests.rtpc.checkouts import run_in_checkout, compare_checkouts
+
+
+# config
+CONTAINER_COUNT: int = 4000
+PROPERTIES_PER_CONTAINER: int = 24
+CHILDREN_PER_CONTAINER: int = 4
+
+MEASURE: str = """
+import io, sys, time
+from files.file import BinaryFile
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+
+class CountingFileIO(io.FileIO):
+    seeks = 0
+    reads = 0
+    
+    def seek(self, pos, whence=0):
+        CountingFileIO.seeks += 1
+        return super().seek(pos, whence)
+    
+    def readinto(self, b):
+        CountingFileIO.reads += 1
+        return super().readinto(b)
+
+rtpc = RTPC_v1(sys.argv[1], "-")
+rtpc.get_header()
+start = time.perf_counter()
+with BinaryFile(io.BufferedReader(CountingFileIO(sys.argv[1], "rb"))) as f:
+    f.seek(rtpc.header.length)
+    rtpc.deserialize(file=f)
+elapsed = time.perf_counter() - start
+print(f"{CountingFileIO.seeks} {CountingFileIO.reads} {elapsed:.2f}")
+"""
+
+
+# functions
+def build_rtpc(container_count: int = CONTAINER_COUNT, property_count: int = PROPERTIES_PER_CONTAINER) -> bytes:
+    """ A tree of containers where most properties have a deferred value. """
+    rng = random.Random(0)
+    strings: List[bytes] = [f"editor.entity_{i}".encode("utf-8") for i in range(64)]
+    
+    def make_property(i: int) -> RT_Property_v1:
+        meta_type = rng.choice([RT_MetaType_v1.UInteger32, RT_MetaType_v1.String, RT_MetaType_v1.Vec3,
+                                RT_MetaType_v1.Mat4x4, RT_MetaType_v1.Float32Array, RT_MetaType_v1.ObjectID])
+        if meta_type == RT_MetaType_v1.UInteger32:
+            value = rng.getrandbits(32)
+        elif meta_type == RT_MetaType_v1.String:
+            value = rng.choice(strings)
+        elif meta_type == RT_MetaType_v1.Vec3:
+            value = [rng.uniform(-100, 100) for _ in range(3)]
+        elif meta_type == RT_MetaType_v1.Mat4x4:
+            value = [rng.uniform(-1, 1) for _ in range(16)]
+        elif meta_type == RT_MetaType_v1.Float32Array:
+            value = [rng.uniform(-1, 1) for _ in range(rng.randint(1, 16))]
+        else:
+            value = rng.getrandbits(48)
+        return RT_Property_v1(i, value if meta_type == RT_MetaType_v1.UInteger32 else 0, meta_type, value)
+    
+    root = RT_Container_v1()
+    root.name_hash = 0
+    parents: List[RT_Container_v1] = [root]
+    for i in range(container_count):
+        container = RT_Container_v1()
+        container.name_hash = i
+        for j in range(property_count):
+            container.add_property(make_property(j))
+        parents[i // CHILDREN_PER_CONTAINER].add_container(container)
+        parents.append(container)
+    
+    rtpc = RTPC_v1()
+    rtpc.header = RT_Header_v1()
+    rtpc.container = root
+    stream = io.BytesIO()
+    rtpc.serialize(stream=stream)
+    return stream.getvalue()
+
+
+def measure(checkout: str, file_path: str) -> str:
+    seeks, reads, seconds = run_in_checkout(checkout, MEASURE, file_path)
+    return f"{int(seeks):8} seeks, {int(reads):8} reads, {float(seconds):6.2f} s"
+
+
+# main
+if __name__ == "__main__":
+    compare_checkouts(build_rtpc(), f"{CONTAINER_COUNT * PROPERTIES_PER_CONTAINER} properties", measure)
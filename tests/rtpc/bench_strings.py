@@ -0,0 +1,88 @@
+"""
+Micro-benchmark for RTPC string reads
+"""
+
+
+# imports
+import io
+import random
+import struct
+import timeit
+
+from files.file import BinaryFile, MappedBinaryFile
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_MetaType_v1
+
+
+# config
+PROPERTY_COUNT: int = 20000
+UNIQUE_STRINGS: int = 200
+REPEAT: int = 3
+
+
+# class
+class LegacyBinaryFile(BinaryFile):
+    """ Byte-at-a-time string reads as they were before the buffered reader. """
+    def read_strz(self, delimiter: bytes = b'\00', intern: bool = False):
+        buffer: bytes = b''
+        while True:
+            this: bytes = self.read(1)
+            if len(this) == 0:
+                break
+            elif this == delimiter:
+                break
+            else:
+                buffer += this
+        return buffer
+
+
+# functions
+def build_string_rtpc(property_count: int = PROPERTY_COUNT, unique_strings: int = UNIQUE_STRINGS) -> bytes:
+    """ A single container holding nothing but String properties. """
+    rng = random.Random(0)
+    pool = [f"editor.entity_{i}.{'x' * rng.randint(4, 48)}".encode("utf-8") for i in range(unique_strings)]
+    
+    header_end: int = 8 + 12
+    values_offset: int = header_end + property_count * 9
+    values_offset += (4 - values_offset % 4) % 4
+    
+    headers = bytearray()
+    values = bytearray()
+    for i in range(property_count):
+        value: bytes = pool[rng.randrange(unique_strings)] + b"\00"
+        headers += struct.pack("<iIB", i, values_offset + len(values), RT_MetaType_v1.String)
+        values += value
+    
+    buffer = bytearray(b"RTPC" + struct.pack("<I", 1))
+    buffer += struct.pack("<iIHH", 0, header_end, property_count, 0)
+    buffer += headers
+    buffer += b"\00" * (values_offset - len(buffer))
+    buffer += values
+    return bytes(buffer)
+
+
+def parse(f: BinaryFile):
+    rtpc: RTPC_v1 = RTPC_v1(db_path="-")
+    f.seek(8)
+    rtpc.deserialize(file=f)
+    return rtpc
+
+
+# main
+if __name__ == "__main__":
+    data: bytes = build_string_rtpc()
+    print(f"{PROPERTY_COUNT} string properties, {len(data) / 1024:.0f} KiB")
+    
+    cases = {
+        "legacy read_strz": lambda: parse(LegacyBinaryFile(io.BytesIO(data))),
+        "buffered read_strz": lambda: parse(BinaryFile(io.BytesIO(data))),
+        "mapped read_strz": lambda: parse(MappedBinaryFile(data)),
+    }
+    baseline: float = 0.0
+    for name, case in cases.items():
+        best: float = min(timeit.repeat(case, number=1, repeat=REPEAT))
+        baseline = baseline or best
+        print(f"{name:>20}: {best * 1000:8.1f} ms ({baseline / best:.1f}x)")
+    
+    values = [p.value for p in parse(MappedBinaryFile(data)).container.properties]
+    print(f"Interned: {len(values)} values share {len({id(v) for v in values})} objects")
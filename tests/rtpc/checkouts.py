@@ -0,0 +1,36 @@
+"""
+Shared scaffold of the benchmarks comparing this checkout against older ones
+"""
+
+
+# imports
+import os
+import subprocess
+import sys
+import tempfile
+from typing import List, Callable
+
+
+# config
+THIS_CHECKOUT: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+# functions
+def run_in_checkout(checkout: str, script: str, *args: str) -> List[str]:
+    """ Run a script in a fresh process importing 'checkout', returns the fields it printed. """
+    env = dict(os.environ, PYTHONPATH=checkout)
+    result = subprocess.run([sys.executable, "-c", script, *args], env=env, cwd=checkout,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def compare_checkouts(data: bytes, label: str, measure: Callable[[str, str], str]):
+    """ Measure the RTPC 'data' in this checkout and every checkout given on the command line. """
+    checkouts: List[str] = [THIS_CHECKOUT] + [os.path.abspath(path) for path in sys.argv[1:]]
+    with tempfile.TemporaryDirectory() as folder:
+        path: str = os.path.join(folder, "bench.blo")
+        with open(path, "wb") as f:
+            f.write(data)
+        print(f"{label}, {len(data) / 1024 / 1024:.1f} MiB file")
+        for checkout in checkouts:
+            print(f"{checkout}: {measure(checkout, path)}")
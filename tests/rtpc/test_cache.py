@@ -0,0 +1,108 @@
+"""
+Tree cache, a hit serves the same tree a miss parsed
+"""
+
+
+# imports
+import os
+import shutil
+import sqlite3 as sql
+import tempfile
+import unittest
+
+from formats.cache import TreeCache, EXTENSION
+from formats.inline_runtime.v1.irtpc_v1 import IRTPC_v1
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from misc.dehash import close_connections
+from tests.irtpc.test_export import build_irtpc
+from tests.misc import create_database
+from tests.rtpc import SAMPLE_BLO
+
+
+# functions
+def export(file, file_path: str) -> bytes:
+    file.export(file_path=file_path)
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+# class
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache: TreeCache = TreeCache(os.path.join(self.folder.name, "cache"))
+        self.path: str = os.path.join(self.folder.name, "sample.blo")
+        shutil.copy(SAMPLE_BLO, self.path)
+    
+    def tearDown(self):
+        self.folder.cleanup()
+    
+    def check_hit(self, file_type, file_path: str):
+        expected = file_type(file_path, "-")
+        expected.get_header()
+        expected.load()
+        expected.resolve_names()
+        exported: bytes = export(expected, os.path.join(self.folder.name, "expected.xml"))
+        
+        for hits in range(2):
+            file = file_type(file_path, "-")
+            self.cache.load_file(file)
+            self.assertEqual(self.cache.hits, hits)
+            self.assertEqual(file.hashes, expected.hashes)
+            self.assertEqual(export(file, os.path.join(self.folder.name, "cached.xml")), exported)
+    
+    def test_rtpc(self):
+        self.check_hit(RTPC_v1, self.path)
+    
+    def test_irtpc(self):
+        self.check_hit(IRTPC_v1, build_irtpc(self.folder.name))
+    
+    def test_changed_source(self):
+        self.cache.load_file(RTPC_v1(self.path, "-"))
+        with open(self.path, "r+b") as f:
+            f.seek(-4, os.SEEK_END)
+            f.write(b"\xff\xff\xff\xff")
+        self.cache.load_file(RTPC_v1(self.path, "-"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+    
+    def test_changed_database(self):
+        db: str = create_database(os.path.join(self.folder.name, "test.db"), {0x1C06DF6D: "path"})
+        conn: sql.Connection = sql.connect(db)
+        conn.execute("PRAGMA journal_mode = WAL")
+        try:
+            file: RTPC_v1 = RTPC_v1(self.path, db)
+            self.cache.load_file(file)
+            self.assertEqual(file.container.get_property(0x1C06DF6D).name, "path")
+            self.assertEqual(file.container.get_property(0x63E5FC8D).name, "")
+            
+            # Only the log is written while the connection stays open
+            db_stat = os.stat(db)
+            conn.execute("INSERT INTO properties(hash, value) VALUES (?, ?)", (0x63E5FC8D, "speed"))
+            conn.commit()
+            os.utime(db, ns=(db_stat.st_atime_ns, db_stat.st_mtime_ns))
+            
+            file = RTPC_v1(self.path, db)
+            self.cache.load_file(file)
+            self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+            self.assertEqual(file.container.get_property(0x63E5FC8D).name, "speed")
+        finally:
+            conn.close()
+            close_connections()
+    
+    def test_corrupt_entry(self):
+        self.cache.load_file(RTPC_v1(self.path, "-"))
+        for name in os.listdir(self.cache.directory):
+            with open(os.path.join(self.cache.directory, name), "r+b") as f:
+                f.truncate(64)
+        self.cache.load_file(RTPC_v1(self.path, "-"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+    
+    def test_eviction(self):
+        self.cache.load_file(RTPC_v1(self.path, "-"))
+        self.cache.max_size = 0
+        self.cache.evict()
+        self.assertEqual([name for name in os.listdir(self.cache.directory) if name.endswith(EXTENSION)], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
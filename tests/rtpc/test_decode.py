@@ -0,0 +1,196 @@
+"""
+RTPC decode paths against a plain decode, one header read and one value seek at a time
+"""
+
+
+# imports
+import io
+import struct
+import sys
+import unittest
+from unittest import mock
+from typing import List, Set, Tuple
+
+from files.file import BinaryFile, MappedBinaryFile
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1 import rtpc_v1_types
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, RT_Property_v1, RT_MetaType_v1, RT_Header_v1, \
+    load_deferred
+from misc import utils as u
+from tests.rtpc import SAMPLE_BLO, describe, build_deep
+from tests.rtpc.bench_seeks import build_rtpc
+
+
+# config
+# Container header of the root, right after the file header
+ROOT_OFFSET: int = 8
+
+
+# functions
+def plain_decode(f: BinaryFile, hashes: Set[int]) -> RT_Container_v1:
+    """ Every header read on its own and every deferred value where it is found. """
+    f.seek(ROOT_OFFSET)
+    root = RT_Container_v1()
+    stack: List[Tuple[RT_Container_v1, tuple]] = [(root, RT_Container_v1.HEADER.read(f))]
+    while len(stack) > 0:
+        container, header = stack.pop()
+        container.name_hash, container.data_offset, container.property_count, container.instance_count = header
+        hashes.add(container.name_hash)
+        
+        f.seek(container.data_offset)
+        container.properties = []
+        for _ in range(container.property_count):
+            prop = RT_Property_v1()
+            prop.deserialize(f, hashes)
+            container.properties.append(prop)
+        f.seek(f.tell() + u.align(f.tell()))
+        headers: List[tuple] = [RT_Container_v1.HEADER.read(f) for _ in range(container.instance_count)]
+        container.containers = [RT_Container_v1() for _ in headers]
+        stack.extend(zip(reversed(container.containers), reversed(headers)))
+    return root
+
+
+def build_simple() -> bytes:
+    """ Edge values of every type decoded from the headers alone, around a deferred one. """
+    root = RT_Container_v1()
+    root.name_hash = 0
+    values = [(RT_MetaType_v1.UInteger32, 0xFFFFFFFF), (RT_MetaType_v1.UInteger32, 0),
+              (RT_MetaType_v1.Float32, -0.0), (RT_MetaType_v1.Float32, float("inf")),
+              (RT_MetaType_v1.Float32, 1e-40), (RT_MetaType_v1.Float32, -3.5), (RT_MetaType_v1.String, b"deferred")]
+    for i, (meta_type, value) in enumerate(values):
+        raw_data = value if meta_type == RT_MetaType_v1.UInteger32 else 0
+        root.add_property(RT_Property_v1(i, raw_data, meta_type, value))
+    
+    rtpc = RTPC_v1()
+    rtpc.header = RT_Header_v1()
+    rtpc.container = root
+    stream = io.BytesIO()
+    rtpc.serialize(stream=stream)
+    return stream.getvalue()
+
+
+def load(f: BinaryFile, hashes: Set[int]) -> RT_Container_v1:
+    f.seek(ROOT_OFFSET)
+    root = RT_Container_v1()
+    root.deserialize(f, hashes)
+    return root
+
+
+class WindowedFile(BinaryFile):
+    """ Keeps the (offset, size) of every window read. """
+    def __init__(self, data: bytes):
+        super().__init__(io.BytesIO(data))
+        self.windows: List[Tuple[int, int]] = []
+    
+    def window(self, offset: int, n: int) -> Tuple[BinaryFile, int]:
+        window, base = super().window(offset, n)
+        self.windows.append((offset, len(window.view)))
+        return window, base
+
+
+def open_files(data: bytes) -> List[BinaryFile]:
+    """ The same bytes as a plain file and as a mapped buffer, they read deferred values differently. """
+    return [BinaryFile(io.BytesIO(data)), MappedBinaryFile(data)]
+
+
+# class
+class TestDecode(unittest.TestCase):
+    def setUp(self):
+        with open(SAMPLE_BLO, "rb") as f:
+            self.sample: bytes = f.read()
+    
+    def assert_same_tree(self, data: bytes):
+        expected_hashes: Set[int] = set()
+        expected = describe(plain_decode(MappedBinaryFile(data), expected_hashes))
+        for f in open_files(data):
+            hashes: Set[int] = set()
+            self.assertEqual(describe(load(f, hashes)), expected)
+            self.assertEqual(hashes, expected_hashes)
+    
+    # iterative load
+    def test_load(self):
+        self.assert_same_tree(self.sample)
+    
+    def test_deep_load(self):
+        self.assert_same_tree(build_deep(sys.getrecursionlimit() + 100))
+    
+    
+    # bulk headers
+    def test_read_headers(self):
+        f: MappedBinaryFile = MappedBinaryFile(self.sample)
+        stack: List[RT_Container_v1] = [plain_decode(f, set())]
+        while len(stack) > 0:
+            expected: RT_Container_v1 = stack.pop()
+            container = RT_Container_v1()
+            container.data_offset, container.property_count, container.instance_count = \
+                expected.data_offset, expected.property_count, expected.instance_count
+            hashes: Set[int] = set()
+            deferred: List[RT_Property_v1] = container.read_properties(f, hashes)
+            
+            self.assertEqual(hashes, {prop.name_hash for prop in expected.properties})
+            self.assertEqual([(prop.name_hash, prop.raw_data, prop.type) for prop in container.properties],
+                             [(prop.name_hash, prop.raw_data, prop.type) for prop in expected.properties])
+            # Deferred values are left unread
+            self.assertEqual([prop.value for prop in deferred], [None] * len(deferred))
+            self.assertEqual([prop.name_hash for prop in deferred],
+                             [prop.name_hash for prop in expected.properties
+                              if not prop.is_simple() and prop.type != RT_MetaType_v1.Unassigned])
+            self.assertEqual([prop.value for prop in container.properties if prop.is_simple()],
+                             [prop.value for prop in expected.properties if prop.is_simple()])
+            self.assertEqual(container.read_child_headers(f),
+                             [(child.name_hash, child.data_offset, child.property_count, child.instance_count)
+                              for child in expected.containers])
+            stack.extend(expected.containers)
+    
+    def test_simple_values(self):
+        data: bytes = build_simple()
+        expected = plain_decode(MappedBinaryFile(data), set())
+        root = load(MappedBinaryFile(data), set())
+        self.assertEqual([struct.pack("<f", prop.value) if prop.type == RT_MetaType_v1.Float32 else prop.value
+                          for prop in root.properties],
+                         [struct.pack("<f", prop.value) if prop.type == RT_MetaType_v1.Float32 else prop.value
+                          for prop in expected.properties])
+        self.assertEqual(root.properties[0].value, 0xFFFFFFFF)
+        self.assertEqual(root.properties[-1].value, b"deferred")
+    
+    
+    # deferred sweep
+    def test_coalescing_boundary(self):
+        data: bytes = build_rtpc(64, 8)
+        expected = describe(plain_decode(MappedBinaryFile(data), set()))
+        # Windows up to the start of the last block and the rest of the file, then bounded by block starts
+        # 256 bytes or one block apart
+        for coalesce_size in [len(data), 256, 1]:
+            with mock.patch.object(rtpc_v1_types, "COALESCE_SIZE", coalesce_size):
+                f: WindowedFile = WindowedFile(data)
+                self.assertEqual(describe(load(f, set())), expected)
+            
+            block_count: int = len(expected)
+            if coalesce_size == len(data):
+                self.assertEqual(len(f.windows), 2)
+            else:
+                self.assertGreater(len(f.windows), 1)
+                self.assertLessEqual(len(f.windows), block_count)
+            # Windows never overlap, each value is read once
+            for (offset, size), (next_offset, _) in zip(f.windows, f.windows[1:]):
+                self.assertLessEqual(offset + size, next_offset)
+    
+    def test_unbounded_sweep(self):
+        root = plain_decode(MappedBinaryFile(self.sample), set())
+        expected = describe(root)
+        properties: List[RT_Property_v1] = []
+        stack: List[RT_Container_v1] = [root]
+        while len(stack) > 0:
+            container = stack.pop()
+            properties.extend(prop for prop in container.properties if not prop.is_simple())
+            stack.extend(container.containers)
+        for prop in properties:
+            prop.value = None
+        
+        # Without block offsets every value is read from the file directly, in offset order
+        load_deferred(BinaryFile(io.BytesIO(self.sample)), reversed(properties))
+        self.assertEqual(describe(root), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Structural RTPC deltas, a diff applied onto its base leaves nothing to diff
+"""
+
+
+# imports
+import os
+import tempfile
+import unittest
+
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_delta import RT_Delta_v1
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, RT_Property_v1, RT_MetaType_v1
+from tests.rtpc import SAMPLE_BLO
+
+
+# functions
+def load_sample() -> RT_Container_v1:
+    rtpc = RTPC_v1(SAMPLE_BLO, "-")
+    rtpc.load()
+    return rtpc.container
+
+
+def edit(root: RT_Container_v1):
+    """ Changed, added and removed properties and containers. """
+    child: RT_Container_v1 = root.containers[0]
+    child.properties[0].value = [9.0, 8.0, 7.0]
+    child.remove_property(child.properties[-1])
+    child.add_property(RT_Property_v1(0x1234, 7, RT_MetaType_v1.UInteger32, 7))
+    root.properties[0].value = b"changed"
+    root.properties[1].type = RT_MetaType_v1.UInteger32
+    root.properties[1].value = 3
+    
+    grandchild: RT_Container_v1 = root.containers[1].containers[1]
+    grandchild.properties[0].value = 0x1122334455
+    root.containers[0].remove_container(root.containers[0].containers[1])
+    container: RT_Container_v1 = RT_Container_v1()
+    container.name_hash = 0x4321
+    container.add_property(RT_Property_v1(0x5678, 0, RT_MetaType_v1.String, b"added"))
+    root.containers[1].add_container(container)
+
+
+# class
+class TestDelta(unittest.TestCase):
+    def test_same_tree(self):
+        self.assertEqual(len(RT_Delta_v1.diff(load_sample(), load_sample())), 0)
+    
+    def test_diff_apply(self):
+        base, patch = load_sample(), load_sample()
+        edit(patch)
+        delta: RT_Delta_v1 = RT_Delta_v1.diff(base, patch)
+        self.assertGreater(len(delta), 0)
+        
+        delta.apply(base)
+        self.assertEqual(RT_Delta_v1.diff(base, patch).ops, [])
+    
+    def test_save_load(self):
+        base, patch = load_sample(), load_sample()
+        edit(patch)
+        with tempfile.TemporaryDirectory() as folder:
+            path: str = os.path.join(folder, "sample.json")
+            RT_Delta_v1.diff(base, patch).save(path)
+            delta: RT_Delta_v1 = RT_Delta_v1.load(path)
+        
+        delta.apply(base)
+        self.assertEqual(RT_Delta_v1.diff(base, patch).ops, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
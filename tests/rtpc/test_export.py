@@ -0,0 +1,52 @@
+"""
+RTPC streamed XML export against the Element and utils.indent export it replaced
+"""
+
+
+# imports
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as et
+
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_MetaType_v1
+from misc import utils
+from tests.rtpc import SAMPLE_BLO
+
+
+# functions
+def export_elements(rtpc: RTPC_v1, file_path: str):
+    """ The export as it was before it was streamed. """
+    root = et.Element("rtpc")
+    root.attrib["extension"] = rtpc.extension
+    root.attrib["version"] = str(rtpc.header.version)
+    rtpc.sort()
+    root.append(rtpc.container.export())
+    utils.indent(root)
+    et.ElementTree(root).write(file_path, encoding="utf-8", xml_declaration=True)
+
+
+# class
+class TestExport(unittest.TestCase):
+    def test_matches_element_export(self):
+        rtpc: RTPC_v1 = RTPC_v1(SAMPLE_BLO, "-")
+        rtpc.load()
+        rtpc.resolve_names()
+        # Names and a string value that need escaping, an empty container is already in the sample
+        rtpc.container.name = "a<&>\"b\tc"
+        rtpc.container.containers[0].properties[0].name = "name\r\n"
+        string = next(prop for prop in rtpc.container.properties if prop.type == RT_MetaType_v1.String)
+        string.value = "<value> & \"quoted\"\n".encode("utf-8")
+        
+        with tempfile.TemporaryDirectory() as folder:
+            streamed: str = os.path.join(folder, "streamed.xml")
+            elements: str = os.path.join(folder, "elements.xml")
+            rtpc.export(file_path=streamed)
+            export_elements(rtpc, elements)
+            with open(streamed, "rb") as a, open(elements, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Hash indexes of RTPC containers against linear scans of the sample tree
+"""
+
+
+# imports
+import unittest
+from typing import List, Optional, Tuple
+
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, RT_Property_v1, RT_MetaType_v1, index_nodes
+from tests.rtpc import SAMPLE_BLO
+
+
+# functions
+def scan(container: RT_Container_v1, name_hash: int, containers: bool) -> Optional[object]:
+    """ The linear search the indexes replaced, own nodes first then each child in turn. """
+    for node in (container.containers if containers else container.properties):
+        if node.name_hash == name_hash:
+            return node
+    for child in container.containers:
+        result = scan(child, name_hash, containers)
+        if result is not None:
+            return result
+    return None
+
+
+def walk(root: RT_Container_v1) -> List[Tuple[Tuple[int, ...], RT_Container_v1]]:
+    """ (parent path, container) of every container, depth-first. """
+    nodes: List[Tuple[Tuple[int, ...], RT_Container_v1]] = []
+    stack: List[Tuple[Tuple[int, ...], RT_Container_v1]] = [((), root)]
+    while len(stack) > 0:
+        path, container = stack.pop()
+        nodes.append((path, container))
+        stack.extend((path + (container.name_hash,), child) for child in reversed(container.containers))
+    return nodes
+
+
+# class
+class TestIndex(unittest.TestCase):
+    def setUp(self):
+        self.rtpc: RTPC_v1 = RTPC_v1(SAMPLE_BLO, "-")
+        self.rtpc.load()
+        self.root: RT_Container_v1 = self.rtpc.container
+        self.nodes = walk(self.root)
+    
+    def test_index_nodes(self):
+        # Duplicates within one list are resolved to the first node
+        nodes: List[RT_Property_v1] = [RT_Property_v1(1, 1, RT_MetaType_v1.UInteger32, 1),
+                                       RT_Property_v1(1, 2, RT_MetaType_v1.UInteger32, 2)]
+        self.assertIs(index_nodes(nodes)[1], nodes[0])
+        for _, container in self.nodes:
+            for nodes in [container.properties, container.containers]:
+                index = index_nodes(nodes)
+                self.assertEqual(set(index), {node.name_hash for node in nodes})
+                for name_hash, node in index.items():
+                    self.assertIs(node, next(other for other in nodes if other.name_hash == name_hash))
+    
+    def test_getters(self):
+        for name_hash in self.rtpc.hashes:
+            for _, container in self.nodes:
+                self.assertIs(container.get_property(name_hash), scan(container, name_hash, False))
+                self.assertIs(container.get_container(name_hash), scan(container, name_hash, True))
+        self.assertIs(self.root.get_property_by_name("health1"), self.root.properties[1])
+    
+    def test_tree_index(self):
+        for name_hash in self.rtpc.hashes:
+            expected_properties = [(path + (container.name_hash,), prop) for path, container in self.nodes
+                                   for prop in container.properties if prop.name_hash == name_hash]
+            expected_containers = [(path, container) for path, container in self.nodes
+                                   if container.name_hash == name_hash]
+            self.assertEqual(self.rtpc.find_properties(name_hash), expected_properties)
+            self.assertEqual(self.rtpc.find_containers(name_hash), expected_containers)
+        self.assertEqual(self.rtpc.find_properties_by_name("tags3"),
+                         [((self.root.name_hash,), self.root.properties[3])])
+    
+    def test_mutations(self):
+        index = self.rtpc.get_index()
+        self.assertIs(self.rtpc.get_index(), index)
+        
+        child: RT_Container_v1 = self.root.containers[1].containers[0]
+        prop: RT_Property_v1 = RT_Property_v1(0x1234, 7, RT_MetaType_v1.UInteger32, 7)
+        child.add_property(prop)
+        self.assertIs(self.root.get_property(0x1234), prop)
+        self.assertIsNot(self.rtpc.get_index(), index)
+        self.assertEqual(self.rtpc.find_properties(0x1234),
+                         [((self.root.name_hash, self.root.containers[1].name_hash, child.name_hash), prop)])
+        
+        # Renaming a node in place needs an explicit invalidate
+        index = self.rtpc.get_index()
+        prop.name_hash = 0x4321
+        child.invalidate()
+        self.assertIsNone(self.root.get_property(0x1234))
+        self.assertIs(self.root.get_property(0x4321), prop)
+        self.assertEqual(self.rtpc.find_properties(0x1234), [])
+        self.assertIsNot(self.rtpc.get_index(), index)
+        
+        # Another tree's mutations leave this index alone
+        index = self.rtpc.get_index()
+        other: RTPC_v1 = RTPC_v1(SAMPLE_BLO, "-")
+        other.load()
+        other.get_index()
+        other.container.add_property(RT_Property_v1(0x1234, 7, RT_MetaType_v1.UInteger32, 7))
+        self.assertIs(self.rtpc.get_index(), index)
+
+
+if __name__ == "__main__":
+    unittest.main()
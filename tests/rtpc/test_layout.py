@@ -0,0 +1,32 @@
+"""
+RTPC serialization through RT_Layout_v1 against the bytes of the writer it replaced
+"""
+
+
+# imports
+import io
+import unittest
+
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from misc import utils as u
+from tests.rtpc import SAMPLE_XML, SAMPLE_BLO
+
+
+# functions
+def serialize(rtpc: RTPC_v1) -> bytes:
+    stream = io.BytesIO()
+    rtpc.serialize(stream=stream)
+    return stream.getvalue()
+
+
+# class
+class TestLayout(unittest.TestCase):
+    def test_matches_baseline_writer(self):
+        rtpc = RTPC_v1(SAMPLE_XML, "-")
+        rtpc.import_(root=u.load_converted(SAMPLE_XML).getroot())
+        with open(SAMPLE_BLO, "rb") as f:
+            self.assertEqual(serialize(rtpc), f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
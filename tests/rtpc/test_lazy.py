@@ -0,0 +1,94 @@
+"""
+Lazy RTPC trees, containers decoded on access match an eager load
+"""
+
+
+# imports
+import os
+import sys
+import tempfile
+import unittest
+
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_types import RT_LazyContainer_v1
+from tests.rtpc import SAMPLE_BLO, describe, build_deep
+
+
+# functions
+def load(file_path: str, lazy: bool) -> RTPC_v1:
+    rtpc = RTPC_v1(file_path, "-", lazy=lazy)
+    rtpc.load()
+    return rtpc
+
+
+# class
+class TestLazy(unittest.TestCase):
+    def setUp(self):
+        self.eager: RTPC_v1 = load(SAMPLE_BLO, False)
+        self.lazy: RTPC_v1 = load(SAMPLE_BLO, True)
+    
+    def tearDown(self):
+        self.lazy.close()
+    
+    def test_decode(self):
+        root: RT_LazyContainer_v1 = self.lazy.container
+        self.assertFalse(root.is_decoded())
+        root.decode()
+        self.assertEqual(describe(root), describe(self.eager.container))
+        self.assertEqual(self.lazy.hashes, self.eager.hashes)
+    
+    def test_on_demand(self):
+        root: RT_LazyContainer_v1 = self.lazy.container
+        first, second = root.containers
+        self.assertIsNone(root._properties)
+        self.assertFalse(first.is_decoded())
+        
+        expected = self.eager.container.containers[1]
+        # Answered from the headers, nothing is decoded
+        self.assertEqual(second.get_property_hashes(), expected.get_property_hashes())
+        self.assertIsNone(second._properties)
+        
+        self.assertEqual(describe(second), describe(expected))
+        self.assertTrue(second.is_decoded())
+        self.assertFalse(first.is_decoded())
+        self.assertIsNone(root._properties)
+    
+    def test_find(self):
+        for container in [self.eager.container.containers[0].containers[1], self.eager.container.containers[1]]:
+            expected = self.eager.container.get_container(container.name_hash)
+            found = self.lazy.container.get_container(container.name_hash)
+            self.assertEqual(describe(found), describe(expected))
+        
+        for prop in self.eager.container.containers[1].containers[1].properties:
+            expected = self.eager.container.get_property(prop.name_hash)
+            found = self.lazy.container.get_property(prop.name_hash)
+            self.assertEqual(found.export_text(), expected.export_text())
+    
+    def test_index(self):
+        for name_hash in self.eager.hashes:
+            expected = self.eager.find_properties(name_hash)
+            found = self.lazy.find_properties(name_hash)
+            self.assertEqual([(path, prop.export_text()) for path, prop in found],
+                             [(path, prop.export_text()) for path, prop in expected])
+            self.assertEqual([path for path, _ in self.lazy.find_containers(name_hash)],
+                             [path for path, _ in self.eager.find_containers(name_hash)])
+    
+    def test_deep_decode(self):
+        depth: int = sys.getrecursionlimit() + 100
+        with tempfile.TemporaryDirectory() as folder:
+            path: str = os.path.join(folder, "deep.blo")
+            with open(path, "wb") as f:
+                f.write(build_deep(depth))
+            
+            lazy: RTPC_v1 = load(path, True)
+            try:
+                lazy.container.decode()
+                nodes = describe(lazy.container)
+                self.assertEqual(nodes, describe(load(path, False).container))
+                self.assertEqual(len(nodes), depth + 1)
+            finally:
+                lazy.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+In-place RTPC patching, values overwritten in place or appended then read back
+"""
+
+
+# imports
+import os
+import shutil
+import tempfile
+import unittest
+
+from formats.runtime.v1.rtpc_v1 import RTPC_v1
+from formats.runtime.v1.rtpc_v1_patch import RT_Patcher_v1
+from formats.runtime.v1.rtpc_v1_types import RT_Container_v1, RT_Property_v1
+from tests.rtpc import SAMPLE_BLO
+
+
+# functions
+def load(file_path: str) -> RT_Container_v1:
+    rtpc = RTPC_v1(file_path, "-")
+    rtpc.load()
+    return rtpc.container
+
+
+# class
+class TestPatch(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.folder.name, "sample.blo")
+        shutil.copy(SAMPLE_BLO, self.path)
+        self.size: int = os.path.getsize(self.path)
+        root: RT_Container_v1 = load(self.path)
+        # Root properties: String, Vec2, Mat3x3, ByteArray, Float32, Mat4x4
+        self.string, self.vec2, _, _, self.f32, _ = [(prop.name_hash, 0) for prop in root.properties]
+        self.child = [(root.containers[1].name_hash, 0)]
+        self.object_id = (root.containers[1].properties[0].name_hash, 0)
+        # Its first and last properties are both object ids
+        grandchild: RT_Container_v1 = root.containers[1].containers[1]
+        self.grandchild = self.child + [(grandchild.name_hash, 0)]
+        self.first_id = (grandchild.properties[0].name_hash, 0)
+        self.last_id = (grandchild.properties[-1].name_hash, 0)
+    
+    def tearDown(self):
+        self.folder.cleanup()
+    
+    def test_in_place(self):
+        with RT_Patcher_v1(self.path) as patcher:
+            patcher.set([], self.f32, 0.5)
+            patcher.set([], self.vec2, [1.0, 2.0])
+            patcher.set(self.child, self.object_id, 0x1122334455)
+            self.assertEqual((patcher.in_place, patcher.appended), (3, 0))
+        
+        self.assertEqual(os.path.getsize(self.path), self.size)
+        root: RT_Container_v1 = load(self.path)
+        self.assertEqual(root.get_property(self.f32[0]).value, 0.5)
+        self.assertEqual(root.get_property(self.vec2[0]).value, [1.0, 2.0])
+        self.assertEqual(root.get_property(self.object_id[0]).value, 0x1122334455)
+    
+    def test_append_and_reuse(self):
+        with RT_Patcher_v1(self.path) as patcher:
+            patcher.set([], self.string, b"a much longer string than the original one")
+            self.assertEqual(patcher.appended, 1)
+            patcher.set([], self.string, b"shorter, reuses the appended value")
+            patcher.set([], self.string, b"fits too")
+            self.assertEqual((patcher.in_place, patcher.appended), (2, 1))
+            self.assertEqual(patcher.get([], self.string), b"fits too")
+        
+        with RT_Patcher_v1(self.path) as patcher:
+            self.assertEqual(patcher.get([], self.string), b"fits too")
+        self.assertEqual(load(self.path).get_property(self.string[0]).value, b"fits too")
+    
+    def test_shared_value(self):
+        with RT_Patcher_v1(self.path) as patcher:
+            first: int = patcher.find_property(self.grandchild, self.first_id)
+            last: int = patcher.find_property(self.grandchild, self.last_id)
+            shared: int = patcher.read_property(first).raw_data
+            raw_slot = RT_Property_v1.HEADER.slot("raw_data", last)
+            raw_slot.struct.pack_into(patcher.map, raw_slot.offset, shared)
+        
+        with RT_Patcher_v1(self.path) as patcher:
+            original = patcher.get(self.grandchild, self.first_id)
+            self.assertEqual(patcher.get(self.grandchild, self.last_id), original)
+            patcher.set(self.grandchild, self.last_id, 0x1122334455)
+            self.assertEqual((patcher.in_place, patcher.appended), (0, 1))
+            # No longer shared, so edited in place
+            patcher.set(self.grandchild, self.first_id, 0x5544332211)
+            self.assertEqual((patcher.in_place, patcher.appended), (1, 1))
+        
+        grandchild: RT_Container_v1 = load(self.path).containers[1].containers[1]
+        self.assertEqual(grandchild.properties[0].value, 0x5544332211)
+        self.assertEqual(grandchild.properties[-1].value, 0x1122334455)
+    
+    def test_compact(self):
+        patcher: RT_Patcher_v1 = RT_Patcher_v1(self.path)
+        patcher.set([], self.string, b"a much longer string than the original one")
+        patcher.set([], self.string, b"short")
+        patcher.set([], self.f32, 0.25)
+        self.assertGreater(patcher.compact(), 0)
+        
+        root: RT_Container_v1 = load(self.path)
+        self.assertEqual(root.get_property(self.string[0]).value, b"short")
+        self.assertEqual(root.get_property(self.f32[0]).value, 0.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
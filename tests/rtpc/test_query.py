@@ -0,0 +1,124 @@
+"""
+Path and predicate queries against the sample RTPC
+"""
+
+
+# imports
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from typing import List
+
+from formats.query import Query, query_file, query_files, run
+from misc.dehash import close_connections
+from misc.hash_functions import hash_jenkins
+from tests.misc import create_database
+from tests.rtpc import SAMPLE_BLO
+
+
+# config
+# Every container below the root of sample.xml, in file order
+CONTAINERS: List[str] = [
+    "radius_c64",
+    "radius_c64/speed_c84",
+    "radius_c64/position_c97",
+    "radius_c64/health_c0",
+    "speed_c8",
+    "speed_c8/name_c29",
+    "speed_c8/data_c28",
+]
+NAMES: List[str] = [name for path in CONTAINERS for name in path.split("/")] + ["health1", "tags3", "class6"]
+
+
+# functions
+def to_path(name_path: str) -> str:
+    """ A container path as query results show it without a database. """
+    return "/".join(f"#{hash_jenkins(name)[0] & 0xFFFFFFFF:08X}" for name in name_path.split("/") if name != "")
+
+
+# class
+class TestQuery(unittest.TestCase):
+    def paths(self, path: str, where: List[str] = ()) -> List[str]:
+        results = query_file(SAMPLE_BLO, Query.parse(path, where))
+        return [result["path"] for result in results]
+    
+    def test_any_depth(self):
+        self.assertEqual(self.paths("**"), [""] + [to_path(path) for path in CONTAINERS])
+        self.assertEqual(self.paths("**/speed_c84"), [to_path("radius_c64/speed_c84")])
+        self.assertEqual(self.paths("**/**/data_c28"), [to_path("speed_c8/data_c28")])
+    
+    def test_any(self):
+        self.assertEqual(self.paths("*"), [to_path("radius_c64"), to_path("speed_c8")])
+        self.assertEqual(self.paths("*/*"), [to_path(path) for path in CONTAINERS if "/" in path])
+        self.assertEqual(self.paths("*/*/*"), [])
+    
+    def test_names_and_hashes(self):
+        self.assertEqual(self.paths("radius_c64/#DF4FC2C3"), [to_path("radius_c64/speed_c84")])
+        self.assertEqual(self.paths("speed_c84"), [])
+        self.assertEqual(self.paths("radius_c64/speed_c84/"), [to_path("radius_c64/speed_c84")])
+    
+    def test_predicates(self):
+        # 'health1' is a vec2 of the root and a uint32 of speed_c84
+        self.assertEqual(self.paths("**", ["health1"]), ["", to_path("radius_c64/speed_c84")])
+        self.assertEqual(self.paths("**", ["health1=690095901"]), [to_path("radius_c64/speed_c84")])
+        self.assertEqual(self.paths("**", ["health1=1|690095901"]), [to_path("radius_c64/speed_c84")])
+        self.assertEqual(self.paths("**", ["health1!=690095901"]), [""])
+        self.assertEqual(self.paths("**", ["tags3~^C5,"]), [""])
+        self.assertEqual(self.paths("**", ["health1", "tags3"]), [""])
+        self.assertEqual(self.paths("**", ["class6=3BB54AD466DD0000"]), [to_path("radius_c64/position_c97")])
+    
+    def test_value_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            values: str = os.path.join(folder, "values.txt")
+            with open(values, "w") as f:
+                f.write("1\n690095901\n\n")
+            self.assertEqual(self.paths("**", [f"health1=@{values}"]), [to_path("radius_c64/speed_c84")])
+    
+    def test_select(self):
+        results = query_file(SAMPLE_BLO, Query.parse("radius_c64/speed_c84", select=["health1"]))
+        self.assertEqual(results[0]["properties"], [
+            {"name": f"#{hash_jenkins('health1')[0] & 0xFFFFFFFF:08X}", "type": "uint32", "value": "690095901"}
+        ])
+    
+    def test_query_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            shutil.copy(SAMPLE_BLO, os.path.join(folder, "a.blo"))
+            shutil.copy(SAMPLE_BLO, os.path.join(folder, "b.blo"))
+            with open(os.path.join(folder, "notes.txt"), "w") as f:
+                f.write("not an RTPC")
+            db: str = create_database(os.path.join(folder, "test.db"), {hash_jenkins(name)[0]: name for name in NAMES})
+            try:
+                # The text file is skipped, names come from the database
+                query: Query = Query.parse("**", ["health1"])
+                results = sorted(query_files([folder], query, db, processes=1))
+                self.assertEqual([os.path.basename(file_path) for file_path, _, _ in results], ["a.blo", "b.blo"])
+                for file_path, matches, error in results:
+                    self.assertEqual(error, "")
+                    self.assertEqual([match["path"] for match in matches], ["", "radius_c64/speed_c84"])
+                
+                query = Query.parse("**", ["health1=690095901"], ["health1"])
+                file_path, matches, error = next(query_files([os.path.join(folder, "a.blo")], query, db, processes=1))
+                self.assertEqual(matches, [{
+                    "file": file_path,
+                    "path": "radius_c64/speed_c84",
+                    "properties": [{"name": "health1", "type": "uint32", "value": "690095901"}],
+                }])
+            finally:
+                close_connections()
+    
+    def test_run(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            code: int = run([SAMPLE_BLO, "--path", "*", "--select", "class6", "--processes", "1"])
+        self.assertEqual(code, 0)
+        lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([line["path"] for line in lines], [to_path("radius_c64"), to_path("speed_c8")])
+        self.assertEqual([line["properties"] for line in lines], [[], []])
+
+
+if __name__ == "__main__":
+    unittest.main()